@@ -2,11 +2,45 @@ from __future__ import annotations
 
 from repatriants_app import create_app
 from repatriants_app.extensions import db
+from repatriants_app.services.schema import upgrade_schema
 
 
 app = create_app()
 
 
+def run_production():
+    """Боевой запуск: создаем таблицы в этом процессе и передаем управление gunicorn"""
+    import os
+    import shutil
+    import sys
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+    # Соединения, открытые для create_all, воркерам не нужны
+    db.engine.dispose()
+
+    gunicorn = shutil.which("gunicorn")
+    if gunicorn is None:
+        # gunicorn работает только на Linux/macOS; на Windows используем многопоточный waitress
+        try:
+            from waitress import serve
+        except ImportError:
+            print("Для SERVER_MODE=production требуется gunicorn (Linux) или waitress (Windows)")
+            sys.exit(1)
+        serve(
+            app,
+            host=app.config["SERVER_HOST"],
+            port=app.config["SERVER_PORT"],
+            threads=app.config["SERVER_WORKERS"] * app.config["SERVER_THREADS"],
+            channel_timeout=app.config["SERVER_TIMEOUT"],
+        )
+        return
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    os.execv(gunicorn, [gunicorn, "-c", os.path.join(base_dir, "gunicorn.conf.py"), "--chdir", base_dir, "wsgi:app"])
+
+
 if __name__ == "__main__":
     import socket
     import sys
@@ -23,7 +57,15 @@ if __name__ == "__main__":
             return "127.0.0.1"
 
     # Проверяем аргументы командной строки
-    if len(sys.argv) > 1 and sys.argv[1] == "--local":
+    if (len(sys.argv) > 1 and sys.argv[1] == "--production") or app.config["SERVER_MODE"] == "production":
+        print("=" * 60)
+        print("🚀 СИСТЕМА РЕПАТРИАНТОВ (боевой режим)")
+        print("=" * 60)
+        print(f"🔌 Порт: {app.config['SERVER_PORT']}")
+        print(f"⚙️  Воркеров: {app.config['SERVER_WORKERS']}, потоков в воркере: {app.config['SERVER_THREADS']}")
+        print("=" * 60)
+        run_production()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--local":
         # Запуск для локальной сети с подробной информацией
         local_ip = get_local_ip()
         port = 5000
@@ -46,6 +88,7 @@ if __name__ == "__main__":
 
         with app.app_context():
             db.create_all()
+            upgrade_schema()
         app.run(debug=True, host="0.0.0.0", port=port, threaded=True)
     else:
         # Обычный запуск с отображением локального IP
@@ -65,4 +108,5 @@ if __name__ == "__main__":
 
         with app.app_context():
             db.create_all()
+            upgrade_schema()
         app.run(debug=True, host="0.0.0.0", port=port, threaded=True)
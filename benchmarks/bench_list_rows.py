@@ -0,0 +1,147 @@
+"""Память и время загрузки одной страницы списка: сущности ORM против строк списка.
+
+Запуск на тестовом стенде с синтетической базой (см. docs/benchmarks.md):
+
+    python benchmarks/bench_list_rows.py --iterations 50
+
+Для каждого списка (страница /search, живой поиск, очередь жилищного отдела, таблица
+отчета) выполняется прежний способ загрузки ("до": полные сущности Repatriant, в очереди -
+запрос на каждую запись) и текущий ("после": строки RepatriantRow из read_models).
+Время меряется без tracemalloc, память - отдельным проходом с tracemalloc: пик выделенной
+памяти за загрузку и объем, который остается у готовой страницы.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from repatriants_app import create_app  # noqa: E402
+from repatriants_app.extensions import db  # noqa: E402
+from repatriants_app.models import HousingQueue, HousingRecord, Repatriant  # noqa: E402
+from repatriants_app.services.read_models import (  # noqa: E402
+    paginate_repatriant_rows,
+    records_with_repatriants,
+    repatriant_rows,
+)
+
+from run_benchmarks import git_commit, percentile  # noqa: E402
+
+
+def build_cases(sample: Repatriant, page: int) -> dict:
+    """Сценарий: (загрузка сущностями, загрузка строками); каждая возвращает готовую страницу"""
+
+    name_filter = Repatriant.f.ilike(f"%{sample.f}%")
+
+    def search_entities():
+        return Repatriant.query.order_by(Repatriant.id.desc()).paginate(page=page, per_page=20, error_out=False).items
+
+    def search_rows():
+        return paginate_repatriant_rows(Repatriant.query, [Repatriant.id.desc()], page, 20).items
+
+    def api_entities():
+        return Repatriant.query.filter(name_filter).limit(20).all()
+
+    def api_rows():
+        return repatriant_rows(Repatriant.query.filter(name_filter).limit(20))
+
+    def queue_entities():
+        items = HousingQueue.query.filter_by(is_active=True).order_by(
+            HousingQueue.total_score.desc(), HousingQueue.added_at.asc()).all()
+        return [(item, Repatriant.query.get(item.repatriant_id)) for item in items]
+
+    def queue_rows():
+        return db.session.query(HousingQueue, Repatriant.id, Repatriant.f, Repatriant.i, Repatriant.o).outerjoin(
+            Repatriant, HousingQueue.repatriant_id == Repatriant.id
+        ).filter(HousingQueue.is_active == True).order_by(  # noqa: E712
+            HousingQueue.total_score.desc(), HousingQueue.added_at.asc()).all()
+
+    def report_entities():
+        return db.session.query(HousingRecord, Repatriant).join(
+            Repatriant, HousingRecord.repatriant_id == Repatriant.id
+        ).order_by(HousingRecord.created_at.desc()).limit(100).all()
+
+    def report_rows():
+        return records_with_repatriants(HousingRecord, 100)
+
+    return {
+        "search_page": (search_entities, search_rows),
+        "api_search_repatriants": (api_entities, api_rows),
+        "housing_queue": (queue_entities, queue_rows),
+        "report_housing_records": (report_entities, report_rows),
+    }
+
+
+def measure(load, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        # Каждый запрос начинается с пустой сессии (как в отдельном запросе к приложению)
+        db.session.remove()
+        started = time.perf_counter()
+        items = load()
+        timings.append((time.perf_counter() - started) * 1000)
+    rows = len(items)
+
+    db.session.remove()
+    tracemalloc.start()
+    items = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    db.session.remove()
+    return {
+        "rows": rows,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сущности ORM против строк списка: память и время на страницу")
+    parser.add_argument("--iterations", type=int, default=30, help="Загрузок на сценарий")
+    parser.add_argument("--page", type=int, default=1, help="Страница списка поиска")
+    parser.add_argument("--json", help="Дописать результаты строкой JSON в файл")
+    args = parser.parse_args()
+
+    app = create_app()
+    results = {}
+    with app.app_context():
+        sample = Repatriant.query.with_entities(Repatriant.f).filter(Repatriant.f.isnot(None)).first()
+        if sample is None:
+            raise SystemExit("База пуста: сначала выполните flask --app wsgi generate-dataset")
+        for name, (entities, rows) in build_cases(sample, args.page).items():
+            # Прогрев: компиляция запросов и кэш метаданных не должны попасть в первый замер
+            entities()
+            rows()
+            before = measure(entities, args.iterations)
+            after = measure(rows, args.iterations)
+            results[name] = {"before": before, "after": after}
+            print(f"{name:<24} строк {after['rows']:>4}  "
+                  f"p50 {before['p50_ms']:>8.2f} -> {after['p50_ms']:>8.2f} мс  "
+                  f"пик {before['peak_kib']:>8.1f} -> {after['peak_kib']:>8.1f} КиБ  "
+                  f"страница {before['retained_kib']:>8.1f} -> {after['retained_kib']:>8.1f} КиБ")
+        database = db.engine.url.render_as_string(hide_password=True)
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as output:
+            output.write(json.dumps({
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "database": database,
+                "iterations": args.iterations,
+                "cases": results,
+            }, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
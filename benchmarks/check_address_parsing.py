@@ -0,0 +1,51 @@
+"""Проверка частей адреса жилищного отдела: строка ADDRESS, собранная из полей формы
+(format_address), должна разбираться (parse_address) в те же город, улицу, дом и квартиру,
+по которым потом ищет /search, в том числе когда часть полей не заполнена.
+
+    python benchmarks/check_address_parsing.py
+
+База не нужна. Код возврата 1, если хотя бы один адрес разобран не так.
+"""
+from __future__ import annotations
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from repatriants_app.utils.text import ADDRESS_PARTS, format_address, normalize_address_part, parse_address  # noqa: E402
+
+# Поля формы: город, улица, дом, квартира
+FORM_ADDRESSES = [
+    ("Сухум", "Лакоба", "5", "12"),
+    ("Сухум", "", "5", "12"),
+    ("Лыхны", "", "5", ""),
+    ("Лыхны", "", "", ""),
+    ("", "Лакоба", "5", ""),
+    ("", "", "5", "12"),
+    ("Новый Афон", "Д. Гулиа", "5 а", ""),
+    ("г. Гагра", "пр-т Мира", "д. 3", "кв.7"),
+    ("Гудаута", "ул. Ардзинба, угол Чанба", "17/2", "4"),
+    ("Очамчыра", "Ёлочная", "", "3"),
+]
+
+
+def main() -> int:
+    failed = 0
+    for form in FORM_ADDRESSES:
+        address = format_address(*form)
+        parsed = parse_address(address)
+        expected = {kind: normalize_address_part(value.replace(",", " "), kind) if value else None
+                    for kind, value in zip(ADDRESS_PARTS, form)}
+        ok = parsed == expected
+        failed += not ok
+        print(f"{'OK    ' if ok else 'ОШИБКА'} {address!r}")
+        if not ok:
+            print(f"       ожидалось {expected}\n       получено  {parsed}")
+    print(f"Адресов: {len(FORM_ADDRESSES)}, ошибок: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
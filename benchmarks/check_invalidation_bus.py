@@ -0,0 +1,122 @@
+"""Проверка шины сброса кэшей между воркерами: два процесса с приложением на одной базе.
+
+    python benchmarks/check_invalidation_bus.py                     # режим из INVALIDATION_BUS
+    INVALIDATION_BUS=poll python benchmarks/check_invalidation_bus.py --messages 20
+
+Воркер-получатель заполняет свой кэш поиска и слушает шину. Воркер-отправитель фиксирует
+транзакции с сообщениями о сбросе; получатель должен принять каждое сообщение (и очистить кэш
+поиска) не позже --timeout секунд. Данные в базе не изменяются; в режиме poll нужна таблица
+CACHE_INVALIDATIONS (flask --app wsgi init-db). Код возврата 1, если сообщения не дошли.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+TOPIC = "bus-check"
+
+
+def receiver(ready, received, stop):
+    from repatriants_app import create_app
+    from repatriants_app.services.invalidation import InvalidationListener, register_invalidation_handler
+    from repatriants_app.services.jobs import get_job
+    from repatriants_app.services.search_cache import get_search_cache
+
+    app = create_app()
+    app.config["SEARCH_CACHE_ENABLED"] = True
+    cache = get_search_cache(app)
+
+    def fill_cache():
+        cache.put(("check",), ([1], 1), cache.generation)
+
+    def on_message(app, key):
+        # В ключе - время отправки; кэш поиска к этому моменту должен быть очищен
+        # предыдущим сообщением, после проверки запись снова добавляется
+        received.put((key, time.time() - float(key.split(":")[1]), cache.stats()["entries"]))
+        fill_cache()
+
+    register_invalidation_handler(app, TOPIC, on_message)
+    listener = get_job(app, InvalidationListener)
+    listener.start(mode=app.extensions["invalidation_mode"])
+    while not listener.status().get("connected"):
+        if not listener.is_running():
+            ready.put(f"не удалось подключиться: {listener.status()}")
+            return
+        time.sleep(0.05)
+
+    fill_cache()
+    ready.put(app.extensions["invalidation_mode"])
+    stop.wait()
+    listener.stop()
+
+
+def sender(messages, interval):
+    from repatriants_app import create_app
+    from repatriants_app.extensions import db
+    from repatriants_app.services.invalidation import queue_invalidation
+
+    app = create_app()
+    with app.app_context():
+        for number in range(messages):
+            # Две транзакции, чтобы сброс кэша поиска гарантированно пришел раньше проверочного
+            queue_invalidation(db.session, "search")
+            db.session.commit()
+            queue_invalidation(db.session, TOPIC, f"{number}:{time.time()}")
+            db.session.commit()
+            time.sleep(interval)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка сброса кэшей между двумя воркерами")
+    parser.add_argument("--messages", type=int, default=10, help="Сколько сообщений отправить")
+    parser.add_argument("--interval", type=float, default=0.2, help="Пауза между сообщениями, секунд")
+    parser.add_argument("--timeout", type=float, default=10, help="Сколько ждать каждое сообщение, секунд")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ready, received, stop = context.Queue(), context.Queue(), context.Event()
+    worker = context.Process(target=receiver, args=(ready, received, stop), daemon=True)
+    worker.start()
+    mode = ready.get(timeout=60)
+    if mode not in ("notify", "poll"):
+        print(f"Воркер-получатель: {mode}")
+        return 1
+    print(f"Режим шины: {mode}")
+
+    started = time.monotonic()
+    sending = context.Process(target=sender, args=(args.messages, args.interval))
+    sending.start()
+
+    latencies = []
+    stale = 0
+    try:
+        while len(latencies) < args.messages:
+            key, latency, entries = received.get(timeout=args.timeout)
+            latencies.append(latency)
+            stale += entries > 0
+            print(f"сообщение {key.split(':')[0]:>3}: доставлено за {latency * 1000:7.1f} мс, "
+                  f"кэш поиска {'НЕ очищен' if entries else 'очищен'}")
+    except queue.Empty:
+        print(f"Сообщения не дошли за {args.timeout} с: получено {len(latencies)} из {args.messages}")
+    finally:
+        stop.set()
+        sending.join()
+        worker.join(timeout=10)
+
+    if not latencies:
+        return 1
+    latencies.sort()
+    print(f"Получено {len(latencies)} из {args.messages} за {time.monotonic() - started:.1f} с; "
+          f"задержка p50 {latencies[len(latencies) // 2] * 1000:.1f} мс, max {latencies[-1] * 1000:.1f} мс")
+    return 0 if len(latencies) == args.messages and not stale else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
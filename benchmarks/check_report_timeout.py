@@ -0,0 +1,74 @@
+"""Проверка лимита времени запросов в выгрузках: запрос выгрузки должен выполняться
+с REPORT_STATEMENT_TIMEOUT_MS, а не с лимитом обычных страниц (STATEMENT_TIMEOUT_MS).
+
+    python benchmarks/check_report_timeout.py
+
+Нужна база PostgreSQL (на других БД лимит не применяется) с пользователем bench_admin
+(flask --app wsgi generate-dataset). Выгрузка пользователей запрашивается через тестовый клиент
+Flask дважды: с пустым кэшем пользователей (пользователь читается из БД в той же транзакции
+до отчета) и с заполненным. Перед каждым запросом выгрузки в том же соединении читается
+текущий statement_timeout. Данные в базе не изменяются. Код возврата 1, если лимит не тот.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy import event  # noqa: E402
+
+from repatriants_app import create_app  # noqa: E402
+from repatriants_app.extensions import db  # noqa: E402
+
+from run_benchmarks import login  # noqa: E402
+
+EXPORT_MARK = 'FROM "USERS"'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Лимит времени запросов в выгрузках администратора")
+    parser.add_argument("--password", default="bench", help="Пароль пользователя bench_admin")
+    args = parser.parse_args()
+
+    app = create_app()
+    expected = app.config["REPORT_STATEMENT_TIMEOUT_MS"]
+    seen = []
+
+    def record_timeout(connection, cursor, statement, parameters, context, executemany):
+        if EXPORT_MARK not in statement:
+            return
+        check = connection.connection.cursor()
+        try:
+            check.execute("SELECT setting FROM pg_settings WHERE name = 'statement_timeout'")
+            seen.append(int(check.fetchone()[0]))
+        finally:
+            check.close()
+
+    with app.app_context():
+        engines = list(db.engines.values())
+        if db.engine.dialect.name != "postgresql":
+            print(f"Нужна база PostgreSQL, сейчас {db.engine.dialect.name}: лимит времени запросов не применяется")
+            return 1
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record_timeout)
+
+    client = login(app, "ADMIN", args.password)
+    failed = False
+    for user_cache in ("пустой", "заполнен"):
+        for export_format in ("json", "csv"):
+            if user_cache == "пустой" and "user_cache" in app.extensions:
+                app.extensions["user_cache"].forget(None)
+            seen.clear()
+            response = client.get(f"/admin/export/users/{export_format}")
+            ok = response.status_code == 200 and seen == [expected]
+            failed |= not ok
+            print(f"выгрузка {export_format:<4} кэш пользователей {user_cache:<8}: HTTP {response.status_code}, "
+                  f"statement_timeout {seen or 'не прочитан'} (нужно {expected}) - {'OK' if ok else 'ОШИБКА'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Проверка хранилища STORAGE_BACKEND = 's3' на S3-совместимом сервере (MinIO на стенде).
+
+    S3_ENDPOINT_URL=http://localhost:9000 S3_ACCESS_KEY=minioadmin S3_SECRET_KEY=minioadmin \\
+        python benchmarks/check_s3_backend.py --create-bucket
+
+Через S3Backend сохраняется файл больше S3_MULTIPART_CHUNK_SIZE: он должен уйти частями
+(multipart upload, ETag вида "...-N"). Затем проверяются stat, чтение (open), скачивание
+редиректом на подписанную ссылку и через приложение (S3_PRESIGNED_DOWNLOADS = false), удаление.
+Объекты пишутся под отдельным префиксом и удаляются в конце; база приложения не нужна.
+Код возврата 1, если какая-либо проверка не прошла.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import math
+import os
+import sys
+import urllib.request
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from botocore.exceptions import ClientError  # noqa: E402
+from flask import Flask  # noqa: E402
+
+from repatriants_app.config import Config  # noqa: E402
+from repatriants_app.services.storage_backends import S3Backend  # noqa: E402
+
+
+def make_app(presigned: bool, prefix: str) -> Flask:
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(STORAGE_BACKEND="s3", S3_PREFIX=prefix, S3_PRESIGNED_DOWNLOADS=presigned)
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка S3Backend на S3-совместимом сервере")
+    parser.add_argument("--parts", type=float, default=2.5, help="Размер файла в частях S3_MULTIPART_CHUNK_SIZE")
+    parser.add_argument("--create-bucket", action="store_true", help="Создать S3_BUCKET, если его нет")
+    args = parser.parse_args()
+
+    if not Config.S3_ENDPOINT_URL:
+        print("Не задан S3_ENDPOINT_URL (например http://localhost:9000 для MinIO)")
+        return 1
+
+    prefix = f"{Config.S3_PREFIX}check-{uuid.uuid4().hex[:8]}/"
+    app = make_app(True, prefix)
+    backend = S3Backend(app)
+    if args.create_bucket:
+        try:
+            backend.client.head_bucket(Bucket=backend.bucket)
+        except ClientError:
+            backend.client.create_bucket(Bucket=backend.bucket)
+
+    chunk_size = app.config["S3_MULTIPART_CHUNK_SIZE"]
+    data = os.urandom(int(chunk_size * args.parts))
+    expected_checksum = hashlib.sha256(data).hexdigest()
+    file_name = "check.pdf"
+    failed = 0
+
+    def check(name: str, ok: bool, details: str = "") -> None:
+        nonlocal failed
+        failed += not ok
+        print(f"{'OK    ' if ok else 'ОШИБКА'} {name}{': ' + details if details else ''}")
+
+    print(f"{Config.S3_ENDPOINT_URL}, корзина {backend.bucket}, префикс {prefix}, файл {len(data)} байт")
+    try:
+        size, checksum = backend.save(io.BytesIO(data), file_name)
+        check("save: размер и SHA-256", (size, checksum) == (len(data), expected_checksum), f"{size} байт")
+
+        parts = math.ceil(len(data) / chunk_size)
+        etag = backend.client.head_object(Bucket=backend.bucket, Key=backend._key(file_name))["ETag"].strip('"')
+        check("save: multipart upload", etag.endswith(f"-{parts}"), f"ETag {etag}, ожидалось частей {parts}")
+
+        stat = backend.stat(file_name)
+        check("stat", stat is not None and stat["size"] == len(data), str(stat))
+
+        body = backend.open(file_name)
+        check("open", hashlib.sha256(body.read()).hexdigest() == expected_checksum)
+        body.close()
+
+        with app.test_request_context():
+            response = backend.stream(file_name)
+        location = response.headers.get("Location", "")
+        check("stream: редирект на подписанную ссылку", response.status_code == 302 and "Signature" in location,
+              f"HTTP {response.status_code}")
+        if location:
+            with urllib.request.urlopen(location) as download:
+                check("stream: скачивание по ссылке",
+                      hashlib.sha256(download.read()).hexdigest() == expected_checksum)
+
+        proxy_app = make_app(False, prefix)
+        with proxy_app.test_request_context():
+            response = S3Backend(proxy_app).stream(file_name)
+            content = b"".join(response.response)
+        check("stream: через приложение", response.status_code == 200
+              and hashlib.sha256(content).hexdigest() == expected_checksum, f"HTTP {response.status_code}")
+
+        with app.test_request_context():
+            check("stream: нет файла", backend.stream("missing.pdf") is None)
+        check("open: нет файла", _raises(FileNotFoundError, backend.open, "missing.pdf"))
+
+        check("delete", backend.delete(file_name) is True)
+        check("delete: файла больше нет", backend.stat(file_name) is None and backend.delete(file_name) is False)
+    finally:
+        backend.client.delete_object(Bucket=backend.bucket, Key=backend._key(file_name))
+
+    print(f"Ошибок: {failed}")
+    return 1 if failed else 0
+
+
+def _raises(exception, func, *args) -> bool:
+    try:
+        func(*args)
+    except exception:
+        return True
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(main())
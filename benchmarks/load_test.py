@@ -0,0 +1,311 @@
+"""Нагрузочный тест запущенного экземпляра приложения (см. docs/benchmarks.md).
+
+Виртуальные пользователи входят под учетными записями bench_* (создаются командой
+generate-dataset) и повторяют типичные действия своей роли:
+
+    ADMIN               поиск, карточка, изменение состава семьи, очередь
+    SOCIAL_ADAPTATION   поиск, карточка соц. отдела, запись о помощи с PDF
+    HOUSING_DEPARTMENT  поиск, карточка жилищного отдела, очередь
+
+    python benchmarks/load_test.py --base-url http://127.0.0.1:5000 \\
+        --users ADMIN=2,SOCIAL_ADAPTATION=6,HOUSING_DEPARTMENT=6 --duration 120
+
+По каждому шагу выводятся пропускная способность, доля ошибок и перцентили времени.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from repatriants_app.services.synthetic import (  # noqa: E402
+    ABKHAZ_SURNAMES,
+    BENCH_USERS,
+    HELP_TYPES,
+    MALE_NAMES,
+    dummy_pdf,
+)
+
+# Доли шагов в сценарии каждой роли
+SCENARIOS = {
+    "ADMIN": [("search", 40), ("open_card", 30), ("edit_family", 15), ("view_queue", 15)],
+    "SOCIAL_ADAPTATION": [("search", 40), ("open_card", 35), ("add_social_record", 25)],
+    "HOUSING_DEPARTMENT": [("search", 40), ("open_card", 30), ("view_queue", 30)],
+}
+CARD_PAGES = {"ADMIN": "/view/{id}", "SOCIAL_ADAPTATION": "/socview/{id}", "HOUSING_DEPARTMENT": "/view-housing/{id}"}
+CARD_APIS = {"SOCIAL_ADAPTATION": "/api/social/{id}", "HOUSING_DEPARTMENT": "/api/housing-department/{id}"}
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    index = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Редиректы не выполняются: каждый запрос замеряется отдельно"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class StepError(Exception):
+    pass
+
+
+class Stats:
+    """Результаты шагов всех виртуальных пользователей"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.timings: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.error_samples: dict[str, str] = {}
+
+    def record(self, step: str, elapsed: float, error: str | None) -> None:
+        with self.lock:
+            self.timings.setdefault(step, []).append(elapsed)
+            if error:
+                self.errors[step] = self.errors.get(step, 0) + 1
+                self.error_samples.setdefault(step, error)
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url: str, role: str, args, stats: Stats, stop_at: float, seed: int) -> None:
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.role = role
+        self.args = args
+        self.stats = stats
+        self.stop_at = stop_at
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+        self.known_ids: list[int] = []
+        self.own_repatriant: tuple[int, dict] | None = None
+        self.pdf = dummy_pdf(args.pdf_size)
+
+    # --- HTTP ---
+
+    def request(self, method: str, path: str, data: bytes | None = None, headers: dict | None = None,
+                expect_redirect: bool = False) -> tuple[int, bytes, dict]:
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=self.args.timeout) as response:
+                status, body, response_headers = response.status, response.read(), dict(response.headers)
+        except urllib.error.HTTPError as error:
+            status, body, response_headers = error.code, error.read(), dict(error.headers)
+        location = response_headers.get("Location", "")
+        if status in (301, 302, 303) and "/login" in location:
+            raise StepError("сессия потеряна (редирект на /login)")
+        if status >= 400 or (status >= 300 and not expect_redirect):
+            raise StepError(f"{method} {path.split('?')[0]}: HTTP {status}")
+        return status, body, response_headers
+
+    def get(self, path: str, **params) -> bytes:
+        query = f"?{urllib.parse.urlencode(params)}" if params else ""
+        return self.request("GET", path + query)[1]
+
+    def post_form(self, path: str, fields: dict, files: dict | None = None) -> tuple[int, bytes, dict]:
+        if files:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for name, value in fields.items():
+                values = value if isinstance(value, list) else [value]
+                for item in values:
+                    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{item}\r\n'.encode())
+            for name, (filename, content) in files.items():
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                             f'Content-Type: application/pdf\r\n\r\n'.encode() + content + b"\r\n")
+            body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+            headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        else:
+            body = urllib.parse.urlencode(fields).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        return self.request("POST", path, data=body, headers=headers, expect_redirect=True)
+
+    # --- Шаги ---
+
+    def login(self) -> None:
+        username = next(name for name, role, _ in BENCH_USERS if role == self.role)
+        status, _, headers = self.post_form("/login", {"username": username, "password": self.args.password})
+        if status != 302:
+            raise StepError(f"не удалось войти как {username}")
+
+    def repatriant_id(self) -> int:
+        if self.known_ids:
+            return self.rng.choice(self.known_ids)
+        return self.rng.randint(1, self.args.max_id)
+
+    def step_search(self) -> None:
+        surname = self.rng.choice(ABKHAZ_SURNAMES)
+        self.get("/search", q=surname)
+        # Живой поиск в формах: из него берем идентификаторы для следующих шагов
+        found = json.loads(self.get("/api/search-repatriants", q=surname))
+        if isinstance(found, list) and found:
+            self.known_ids = [item["id"] for item in found]
+
+    def step_open_card(self) -> None:
+        rep_id = self.repatriant_id()
+        self.get(CARD_PAGES[self.role].format(id=rep_id))
+        if self.role in CARD_APIS:
+            self.get(CARD_APIS[self.role].format(id=rep_id))
+        self.get(f"/api/repatriant/{rep_id}/family")
+
+    def step_add_social_record(self) -> None:
+        rep_id = self.repatriant_id()
+        status, body, _ = self.post_form(f"/api/social/{rep_id}", {
+            "help_type": self.rng.choice(HELP_TYPES),
+            "custom_help_type": "нагрузочный тест",
+            "responsible": "НАГРУЗОЧНЫЙ ТЕСТ",
+            "help_date": time.strftime("%Y-%m-%d"),
+            "amount": str(self.rng.randint(1, 50) * 1000),
+            "description": "Запись создана нагрузочным тестом",
+        }, files={"documents": (f"scan_{uuid.uuid4().hex[:8]}.pdf", self.pdf)})
+        if status != 201:
+            raise StepError(f"запись о помощи не создана: HTTP {status}")
+
+    def _registration_form(self, surname: str) -> dict:
+        return {
+            "f": surname, "i": self.rng.choice(MALE_NAMES), "sex": "МУЖ", "date_r": "1980-01-01",
+            "strana_proj": "ТУРЦИЯ", "from_loc": "ТУРЦИЯ", "rezerv": "АБХАЗ", "sem_poloj": "ЖЕНАТ/ЗАМУЖЕМ",
+            "rep_status": time.strftime("%Y-%m-%d"), "adres": "СУХУМ",
+        }
+
+    def step_edit_family(self) -> None:
+        # Меняем состав семьи у собственного тестового репатрианта, чтобы не портить остальные данные
+        if self.own_repatriant is None:
+            surname = f"НАГРУЗКА{uuid.uuid4().hex[:6].upper()}"
+            form = self._registration_form(surname)
+            self.post_form("/register", form)
+            found = json.loads(self.get("/api/search-repatriants", q=surname))
+            if not isinstance(found, list) or not found:
+                raise StepError("зарегистрированный тестовый репатриант не найден")
+            self.own_repatriant = (found[0]["id"], form)
+
+        rep_id, form = self.own_repatriant
+        self.get(f"/api/repatriant/{rep_id}/family")
+        children = [{"step_rod": self.rng.choice(["СЫН", "ДОЧЬ"]), "fio": f"РЕБЕНОК {n}", "god_r": str(2005 + n)}
+                    for n in range(self.rng.randint(0, 4))]
+        family = [{"step_rod": "СУПРУГ(А)", "fio": "СУПРУГА", "god_r": 1982}]
+        status, _, headers = self.post_form(f"/edit/{rep_id}", {
+            **form, "children_data": json.dumps(children, ensure_ascii=False),
+            "family_data": json.dumps(family, ensure_ascii=False),
+        })
+        if status != 302:
+            raise StepError(f"изменения семьи не сохранены: HTTP {status}")
+
+    def step_view_queue(self) -> None:
+        self.get("/housing-queue")
+        self.get("/api/housing-queue")
+
+    # --- Цикл ---
+
+    def timed(self, step: str, action) -> None:
+        started = time.perf_counter()
+        error = None
+        try:
+            action()
+        except StepError as e:
+            error = str(e)
+        except (OSError, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+        self.stats.record(step, time.perf_counter() - started, error)
+
+    def run(self) -> None:
+        self.timed("login", self.login)
+        steps, weights = zip(*SCENARIOS[self.role])
+        while time.time() < self.stop_at:
+            step = self.rng.choices(steps, weights=weights)[0]
+            self.timed(f"{self.role}:{step}", getattr(self, f"step_{step}"))
+            if self.args.think_time:
+                time.sleep(min(self.rng.expovariate(1 / self.args.think_time), self.args.think_time * 5))
+
+
+def parse_users(value: str) -> dict[str, int]:
+    users = {}
+    for part in value.split(","):
+        role, _, count = part.partition("=")
+        if role.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"неизвестная роль: {role}")
+        users[role.strip()] = int(count or 1)
+    return users
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест по сценариям ролей")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=parse_users, default=parse_users("ADMIN=1,SOCIAL_ADAPTATION=3,HOUSING_DEPARTMENT=3"),
+                        help="Виртуальных пользователей по ролям, например ADMIN=2,SOCIAL_ADAPTATION=5")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность, секунд")
+    parser.add_argument("--ramp-up", type=float, default=5, help="За сколько секунд запускаются все пользователи")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Средняя пауза между шагами, секунд (0 - без пауз)")
+    parser.add_argument("--password", default="bench", help="Пароль пользователей bench_*")
+    parser.add_argument("--max-id", type=int, default=1000, help="Диапазон ID карточек, пока поиск ничего не вернул")
+    parser.add_argument("--pdf-size", type=int, default=200 * 1024, help="Размер PDF в записи о помощи, байт")
+    parser.add_argument("--timeout", type=float, default=60, help="Тайм-аут одного HTTP-запроса, секунд")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Дописать сводку строкой JSON в файл")
+    args = parser.parse_args()
+
+    stats = Stats()
+    roles = [role for role, count in args.users.items() for _ in range(count)]
+    started = time.time()
+    stop_at = started + args.ramp_up + args.duration
+    users = []
+    for number, role in enumerate(roles):
+        user = VirtualUser(args.base_url, role, args, stats, stop_at, args.seed + number)
+        users.append(user)
+        user.start()
+        time.sleep(args.ramp_up / max(len(roles), 1))
+    for user in users:
+        user.join()
+    elapsed = time.time() - started
+
+    summary = {}
+    print(f"\n{len(roles)} пользователей, {elapsed:.0f} с, {args.base_url}\n")
+    print(f"{'шаг':<38}{'число':>7}{'в сек':>8}{'ошибок':>9}{'p50 мс':>9}{'p90 мс':>9}{'p95 мс':>9}{'p99 мс':>9}")
+    total_steps = total_errors = 0
+    for step in sorted(stats.timings):
+        timings = [value * 1000 for value in stats.timings[step]]
+        errors = stats.errors.get(step, 0)
+        total_steps += len(timings)
+        total_errors += errors
+        summary[step] = {
+            "count": len(timings),
+            "per_second": round(len(timings) / elapsed, 2),
+            "error_rate": round(errors / len(timings), 4),
+            "p50_ms": round(percentile(timings, 0.50), 1),
+            "p90_ms": round(percentile(timings, 0.90), 1),
+            "p95_ms": round(percentile(timings, 0.95), 1),
+            "p99_ms": round(percentile(timings, 0.99), 1),
+        }
+        row = summary[step]
+        print(f"{step:<38}{row['count']:>7}{row['per_second']:>8.2f}{row['error_rate'] * 100:>8.1f}%"
+              f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    print(f"\nВсего шагов: {total_steps} ({total_steps / elapsed:.1f} в секунду), ошибок: {total_errors}")
+    for step, sample in sorted(stats.error_samples.items()):
+        print(f"  {step}: {sample}")
+
+    if args.json_path:
+        with open(args.json_path, "a", encoding="utf-8") as output:
+            output.write(json.dumps({
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"), "base_url": args.base_url, "users": args.users,
+                "duration": args.duration, "think_time": args.think_time, "steps": summary,
+            }, ensure_ascii=False) + "\n")
+    return 0 if total_steps else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Повторяемые замеры времени ответа основных страниц и API.
+
+Запуск на тестовом стенде с синтетической базой (см. docs/benchmarks.md):
+
+    flask --app wsgi generate-dataset --repatriants 100000 --log-rows 2000000
+    python benchmarks/run_benchmarks.py --iterations 30
+
+Запросы выполняются внутри процесса через тестовый клиент Flask, поэтому в замер
+входят маршрут, SQL и шаблон, но не сеть и не gunicorn. Результаты (p50/p95 по каждому
+сценарию) дописываются строкой JSON в benchmarks/results.jsonl и сравниваются
+с предыдущим запуском на той же базе.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy import func, text  # noqa: E402
+
+from repatriants_app import create_app  # noqa: E402
+from repatriants_app.extensions import db  # noqa: E402
+from repatriants_app.models import Child, FamilyMember, HousingDepartmentRecord, Repatriant  # noqa: E402
+from repatriants_app.services.synthetic import BENCH_USERS  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(BASE_DIR, "benchmarks", "results.jsonl")
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+
+    ordered = sorted(values)
+    index = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample_values(rng: random.Random) -> dict:
+    """Значения фильтров, взятые из самой базы, чтобы поиск что-то находил"""
+
+    sample = Repatriant.query.order_by(Repatriant.id).offset(
+        rng.randint(0, max(Repatriant.query.count() - 1, 0))).first()
+    if sample is None:
+        raise SystemExit("База пуста: сначала выполните flask --app wsgi generate-dataset")
+    housing = HousingDepartmentRecord.query.filter(HousingDepartmentRecord.address.isnot(None)).first()
+    max_id = db.session.query(func.max(Repatriant.id)).scalar()
+    return {"repatriant": sample, "housing": housing, "max_id": max_id}
+
+
+def build_cases(values: dict, rng: random.Random) -> list[dict]:
+    """Сценарии: имя, роль, метод и адрес (или функция, возвращающая адрес и данные формы)"""
+
+    rep = values["repatriant"]
+    housing = values["housing"]
+    max_id = values["max_id"]
+    rep_status = rep.rep_status.isoformat() if rep.rep_status else "2020-01-01"
+
+    search_filters = {
+        "q_one_word": {"q": rep.f},
+        "q_full_name": {"q": f"{rep.f} {rep.i}"},
+        "f": {"f": rep.f},
+        "i": {"i": rep.i},
+        "o": {"o": rep.o or "АСЛАНОВИЧ"},
+        "f_hist": {"f_hist": rep.f_hist or rep.f},
+        "sex": {"sex": rep.sex},
+        "date_r": {"date_r_from": "1960-01-01", "date_r_to": "1970-12-31"},
+        "kod": {"kod": rep.kod or "А-000001"},
+        "strana_proj": {"strana_proj": rep.strana_proj},
+        "from_loc": {"from_loc": rep.from_loc},
+        "sem_poloj": {"sem_poloj": rep.sem_poloj},
+        "rep_status": {"rep_status_from": rep_status, "rep_status_to": rep_status},
+        "rezerv": {"rezerv": rep.rezerv},
+        "doc_lichn": {"doc_lichn": rep.doc_lichn},
+        "n_doc_lichn": {"n_doc_lichn": rep.n_doc_lichn},
+        "tel": {"tel": (rep.tel or "940").split()[-1]},
+        "mail": {"mail": rep.mail or "example"},
+        "adres": {"adres": (rep.adres or "СУХУМ").split(",")[0]},
+        "rojd_loc": {"rojd_loc": rep.rojd_loc},
+        "children_count": {"children_count": "2"},
+        "dop_info": {"dop_info": rep.dop_info or "ВРАЧ"},
+        "housing_category": {"housing_category": (housing.category if housing else "пенсионер")},
+        "housing_received": {"housing_received_housing": "true"},
+        "housing_status": {"housing_status": (housing.housing_acquisition if housing else "передано")},
+        "housing_address_city": {"housing_address_city": (housing.address.split(", ")[0] if housing else "СУХУМ")},
+        "housing_has_warrant": {"housing_has_warrant": "true"},
+        "housing_created_at": {"housing_created_at_from": "2023-01-01", "housing_created_at_to": "2023-12-31"},
+        "page_10": {"page": "10"},
+    }
+
+    cases = []
+    for name, params in search_filters.items():
+        role = "HOUSING_DEPARTMENT" if name.startswith("housing_") else "ADMIN"
+        cases.append({"name": f"search:{name}", "role": role, "method": "GET", "path": "/search", "params": params})
+
+    cases += [
+        {"name": "api_search_repatriants", "role": "HOUSING_DEPARTMENT", "method": "GET",
+         "path": "/api/search-repatriants", "params": {"q": rep.f}},
+        {"name": "view_repatriant", "role": "ADMIN", "method": "GET",
+         "path": lambda: f"/view/{rng.randint(1, max_id)}"},
+        {"name": "register", "role": "ADMIN", "method": "POST", "path": "/register", "form": lambda: register_form(rng)},
+    ]
+    for export in ("repatriants", "logs", "users", "families"):
+        for fmt in ("csv", "json"):
+            cases.append({"name": f"export:{export}:{fmt}", "role": "ADMIN", "method": "GET",
+                          "path": f"/admin/export/{export}/{fmt}", "slow": True})
+    for report in ("social-adaptation", "repatriants", "user-activity", "time-stats", "family-stats", "system"):
+        cases.append({"name": f"report:{report}", "role": "ADMIN", "method": "GET",
+                      "path": f"/admin/reports/{report}", "slow": True})
+    return cases
+
+
+def register_form(rng: random.Random) -> dict:
+    """Анкета нового репатрианта с двумя детьми и супругом"""
+
+    suffix = rng.randint(100000, 999999)
+    return {
+        "f": f"ЗАМЕР{suffix}", "i": "АСЛАН", "o": "ДАУРОВИЧ", "sex": "МУЖ", "date_r": "1985-04-12",
+        "strana_proj": "ТУРЦИЯ", "from_loc": "ТУРЦИЯ", "rojd_loc": "СТАМБУЛ", "sem_poloj": "ЖЕНАТ/ЗАМУЖЕМ",
+        "rep_status": datetime.now().strftime("%Y-%m-%d"), "rezerv": "АБХАЗ", "doc_lichn": "ПАСПОРТ",
+        "n_doc_lichn": f"12 {suffix}", "adres": "СУХУМ, УЛ. ЛАКОБА, 1", "tel": "+7 940 000-00-00",
+        "children_data": json.dumps([
+            {"step_rod": "СЫН", "fio": "ЗАМЕР ТИМУР", "god_r": "2012"},
+            {"step_rod": "ДОЧЬ", "fio": "ЗАМЕР АМРА", "god_r": "15.06.2015Г."},
+        ], ensure_ascii=False),
+        "family_data": json.dumps([{"step_rod": "СУПРУГ(А)", "fio": "ЗАМЕР МАДИНА", "god_r": 1988}], ensure_ascii=False),
+    }
+
+
+def login(app, role: str, password: str):
+    username = next(name for name, user_role, _ in BENCH_USERS if user_role == role)
+    client = app.test_client()
+    response = client.post("/login", data={"username": username, "password": password})
+    if response.status_code != 302 or "/login" in response.headers.get("Location", ""):
+        raise SystemExit(f"Не удалось войти как {username}: пользователи bench_* создаются командой generate-dataset")
+    return client
+
+
+def run_case(client, case: dict, iterations: int, warmup: int) -> dict:
+    timings, errors, statuses = [], 0, {}
+    for number in range(warmup + iterations):
+        path = case["path"]() if callable(case["path"]) else case["path"]
+        form = case["form"]() if "form" in case else None
+        started = time.perf_counter()
+        if case["method"] == "POST":
+            response = client.post(path, data=form)
+        else:
+            response = client.get(path, query_string=case.get("params"))
+        response.get_data()  # Потоковые ответы (выгрузки) дочитываем до конца
+        elapsed = (time.perf_counter() - started) * 1000
+        response.close()
+        if number < warmup:
+            continue
+        timings.append(elapsed)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code >= 400:
+            errors += 1
+    return {
+        "n": len(timings),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "max_ms": round(max(timings), 2),
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def dataset_size() -> dict:
+    counts = {
+        "MAIN": db.session.query(func.count(Repatriant.id)).scalar(),
+        "CHILDREN": db.session.query(func.count(Child.id_child)).scalar(),
+        "FAMILY": db.session.query(func.count(FamilyMember.id_family)).scalar(),
+    }
+    try:
+        counts["LOG"] = db.session.execute(text('SELECT COUNT(*) FROM "LOG"')).scalar()
+    except Exception:
+        db.session.rollback()
+        counts["LOG"] = None
+    return counts
+
+
+def previous_run(results_path: str, database: str) -> dict | None:
+    if not os.path.exists(results_path):
+        return None
+    last = None
+    with open(results_path, encoding="utf-8") as results:
+        for line in results:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("database") == database:
+                    last = entry
+    return last
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Замеры p50/p95 основных страниц и API")
+    parser.add_argument("--iterations", type=int, default=20, help="Запросов на сценарий")
+    parser.add_argument("--slow-iterations", type=int, default=5, help="Запросов на отчет/выгрузку")
+    parser.add_argument("--warmup", type=int, default=2, help="Прогревочных запросов (не учитываются)")
+    parser.add_argument("--only", help="Только сценарии, в имени которых есть подстрока")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно выбора значений фильтров")
+    parser.add_argument("--password", default="bench", help="Пароль пользователей bench_*")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="Файл результатов (JSON Lines)")
+    parser.add_argument("--fail-over", type=float, default=None,
+                        help="Код возврата 1, если p95 вырос больше чем на N процентов к прошлому запуску")
+    parser.add_argument("--search-cache", action="store_true",
+                        help="Не отключать кэш результатов поиска (замер повторных запросов)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    # Сценарий повторяет один и тот же запрос: с кэшем поиска замерялись бы только попадания
+    app.config["SEARCH_CACHE_ENABLED"] = args.search_cache
+    with app.app_context():
+        database = db.engine.url.render_as_string(hide_password=True)
+        values = sample_values(rng)
+        cases = build_cases(values, rng)
+        size = dataset_size()
+    if args.only:
+        cases = [case for case in cases if args.only in case["name"]]
+
+    clients = {}
+    results = {}
+    print(f"База: {database}, размер: {size}")
+    for case in cases:
+        if case["role"] not in clients:
+            clients[case["role"]] = login(app, case["role"], args.password)
+        iterations = args.slow_iterations if case.get("slow") else args.iterations
+        warmup = min(args.warmup, 1) if case.get("slow") else args.warmup
+        results[case["name"]] = run_case(clients[case["role"]], case, iterations, warmup)
+        result = results[case["name"]]
+        print(f"{case['name']:<40} p50 {result['p50_ms']:>9.1f} мс  p95 {result['p95_ms']:>9.1f} мс"
+              f"  ошибок {result['errors']}/{result['n']}")
+
+    previous = previous_run(args.results, database)
+    regressions = []
+    if previous:
+        print(f"\nСравнение с запуском {previous['at']} ({previous.get('commit')}):")
+        for name, result in results.items():
+            before = previous["cases"].get(name)
+            if not before or not before["p95_ms"]:
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            marker = ""
+            if args.fail_over is not None and change > args.fail_over:
+                regressions.append(name)
+                marker = "  <-- регрессия"
+            print(f"{name:<40} p95 {before['p95_ms']:>9.1f} -> {result['p95_ms']:>9.1f} мс ({change:+.0f}%){marker}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as output:
+        output.write(json.dumps({
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "database": database,
+            "dataset": size,
+            "iterations": args.iterations,
+            "cases": results,
+        }, ensure_ascii=False) + "\n")
+    print(f"\nРезультаты записаны в {args.results}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
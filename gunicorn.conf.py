@@ -0,0 +1,61 @@
+"""Настройки gunicorn для боевого запуска (значения берутся из Config / переменных окружения).
+
+Запуск:           gunicorn -c gunicorn.conf.py wsgi:app
+Плавный перезапуск (новый код, без обрыва текущих запросов):  kill -HUP $(cat gunicorn.pid)
+Остановка с завершением текущих запросов:                    kill -TERM $(cat gunicorn.pid)
+"""
+
+import os
+import shutil
+import tempfile
+
+# Метрики Prometheus собираются со всех воркеров через общий каталог;
+# переменная должна быть задана до импорта приложения (и prometheus_client)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "repatriants_metrics"))
+
+from repatriants_app.config import Config  # noqa: E402
+
+
+bind = f"{Config.SERVER_HOST}:{Config.SERVER_PORT}"
+
+# Предварительно запущенные процессы, в каждом - пул потоков
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = "gthread"
+
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS_JITTER
+
+pidfile = Config.SERVER_PIDFILE
+
+# Приложение загружается в каждом воркере после fork, поэтому HUP подхватывает новый код
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Значения прошлого запуска не должны попадать в новые метрики
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Пул соединений с БД не должен переходить из мастер-процесса в воркеры
+    # (при preload_app или если приложение импортировано до fork)
+    from repatriants_app.extensions import dispose_engines
+    from wsgi import app
+
+    dispose_engines(app)
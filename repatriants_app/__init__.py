@@ -4,8 +4,17 @@ from flask import Flask
 
 from .config import Config
 from .extensions import db
+from .services.compression import init_compression
+from .services.invalidation import init_invalidation_bus
+from .services.metrics import init_metrics
+from .services.profiling import init_profiling
+from .services.search_cache import init_search_cache
+from .services.sessions import init_sessions
+from .services.sql_diagnostics import init_sql_diagnostics
 from .services.storage import create_disk_folders
-from .utils.status import check_repatriant_status
+from .services.user_cache import init_user_cache
+from .utils.db import register_session_events
+from .utils.status import check_repatriant_status, check_repatriant_statuses
 
 
 def create_app(config_object=Config) -> Flask:
@@ -13,6 +22,33 @@ def create_app(config_object=Config) -> Flask:
     app.config.from_object(config_object)
 
     db.init_app(app)
+    register_session_events()
+
+    # Сессии пользователей на сервере (SESSION_BACKEND)
+    init_sessions(app)
+
+    # Замеры времени запросов, SQL и пула соединений для /metrics
+    init_metrics(app)
+
+    # Диагностика SQL (N+1, медленные запросы) для разработки и тестового стенда
+    init_sql_diagnostics(app)
+
+    # Профилирование отдельных запросов по требованию администратора
+    init_profiling(app)
+
+    # Сброс кэшей в памяти во всех воркерах после изменения данных
+    init_invalidation_bus(app)
+
+    # Кэш результатов поиска с очисткой при изменении данных
+    init_search_cache(app)
+
+    # Кэш пользователей для проверок доступа (сбрасывается при отключении и удалении)
+    init_user_cache(app)
+
+    # Сжатие ответов. Flask вызывает after_request в обратном порядке регистрации, поэтому
+    # подключенное последним сжатие выполняется первым, а замеры метрик, профилирования
+    # и диагностики SQL, выполняемые после него, включают время сжатия
+    init_compression(app)
 
     # Импортируем модели, чтобы зарегистрировались слушатели событий SQLAlchemy
     from . import models as _models  # noqa: F401
@@ -24,20 +60,30 @@ def create_app(config_object=Config) -> Flask:
     from .routes.admin import register_admin_routes
     from .routes.api_housing import register_api_housing_routes
     from .routes.api_social import register_api_social_routes
+    from .routes.api_uploads import register_api_upload_routes
     from .routes.auth import register_auth_routes
     from .routes.main import register_main_routes
+    from .routes.metrics import register_metrics_routes
     from .routes.repatriants import register_repatriant_routes
 
     register_main_routes(app)
     register_api_social_routes(app)
     register_api_housing_routes(app)
+    register_api_upload_routes(app)
     register_repatriant_routes(app)
     register_auth_routes(app)
     register_admin_routes(app)
+    register_metrics_routes(app)
+
+    # Регистрируем команды flask CLI
+    from .cli import register_cli_commands
+
+    register_cli_commands(app)
 
-    # Добавляем функцию в контекст шаблонов
+    # Добавляем функции в контекст шаблонов (для списков - check_repatriant_statuses один раз на страницу)
     @app.context_processor
     def utility_processor():
-        return dict(check_repatriant_status=check_repatriant_status)
+        return dict(check_repatriant_status=check_repatriant_status,
+                    check_repatriant_statuses=check_repatriant_statuses)
 
     return app
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import click
+
+from .extensions import db
+from .models import Repatriant
+from .services.backfill import (
+    backfill_children_birth_years,
+    backfill_housing_addresses,
+    backfill_status_expiration,
+)
+from .services.compression import precompress_static
+from .services.disk_stats import sample_disk_usage
+from .services.jobs import get_job
+from .services.schema import upgrade_schema
+from .services.scrubber import StorageScrubber
+from .services.synthetic import DatasetGenerator
+
+
+def register_cli_commands(app):
+    """Регистрирует команды flask CLI на переданном Flask-приложении."""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Создает недостающие таблицы, столбцы и индексы (выполняется перед запуском воркеров, а не в них)"""
+        db.create_all()
+        for change in upgrade_schema():
+            click.echo(f"Добавлено: {change}")
+        click.echo("Таблицы базы данных созданы/проверены")
+
+    @app.cli.command('backfill-birth-years')
+    @click.option('--batch-size', default=5000, show_default=True, help='Строк в одной транзакции')
+    @click.option('--pause', default=0.0, show_default=True, help='Пауза между порциями, секунд')
+    def backfill_birth_years(batch_size, pause):
+        """Заполняет BIRTH_YEAR/BIRTH_DATE детей из GOD_R (после init-db, добавившей столбцы)"""
+        updated = backfill_children_birth_years(batch_size=batch_size, pause=pause, progress=click.echo)
+        click.echo(f"Изменено строк CHILDREN: {updated}")
+
+    @app.cli.command('backfill-housing-addresses')
+    @click.option('--batch-size', default=5000, show_default=True, help='Строк в одной транзакции')
+    @click.option('--pause', default=0.0, show_default=True, help='Пауза между порциями, секунд')
+    def backfill_addresses(batch_size, pause):
+        """Заполняет части адреса записей жилищного отдела из ADDRESS (после init-db, добавившей столбцы)"""
+        updated = backfill_housing_addresses(batch_size=batch_size, pause=pause, progress=click.echo)
+        click.echo(f"Изменено строк HOUSING_DEPARTMENT_RECORDS: {updated}")
+
+    @app.cli.command('backfill-status-expiry')
+    @click.option('--batch-size', default=5000, show_default=True, help='Строк в одной транзакции')
+    @click.option('--pause', default=0.0, show_default=True, help='Пауза между порциями, секунд')
+    def backfill_status_expiry(batch_size, pause):
+        """Заполняет REP_STATUS_EXPIRES репатриантов из REP_STATUS (после init-db, добавившей столбец)"""
+        updated = backfill_status_expiration(batch_size=batch_size, pause=pause, progress=click.echo)
+        click.echo(f"Изменено строк MAIN: {updated}")
+
+    @app.cli.command('scrub-storage')
+    @click.option('--no-repair', is_flag=True, help='Только проверка, без восстановления с резервного диска')
+    def scrub_storage(no_repair):
+        """Проверяет целостность файлов хранилища (для запуска по расписанию)"""
+        scrubber = get_job(app, StorageScrubber)
+        scrubber.run(repair=not no_repair)
+        status = scrubber.status()
+        click.echo(f"Проверено файлов: {status.get('files_checked', 0)}, "
+                   f"проблем: {status.get('problems', 0)}, восстановлено: {status.get('repaired', 0)}")
+
+    @app.cli.command('sample-disk-stats')
+    def sample_disk_stats():
+        """Записывает замер заполнения дисков (для ежедневного запуска по расписанию)"""
+        for sample in sample_disk_usage(app):
+            click.echo(f"{sample.disk_name}: занято {sample.used_bytes // 1024 ** 3} ГБ, "
+                       f"файлов {sample.file_count}, записано за день {sample.bytes_written // 1024 ** 2} МБ")
+
+    @app.cli.command('compress-static')
+    def compress_static():
+        """Заранее создает сжатые копии статических файлов (выполняется при обновлении)"""
+        count = precompress_static(app)
+        click.echo(f"Сжатых копий статических файлов: {count} (папка {app.config['COMPRESSION_STATIC_CACHE']})")
+
+    @app.cli.command('generate-dataset')
+    @click.option('--repatriants', default=10000, show_default=True, help='Число записей MAIN')
+    @click.option('--log-rows', default=1000000, show_default=True, help='Число строк журнала LOG')
+    @click.option('--files', default=200, show_default=True, help='Число PDF-файлов на дисках хранения')
+    @click.option('--file-size', default=256 * 1024, show_default=True, help='Размер одного файла, байт')
+    @click.option('--seed', default=42, show_default=True, help='Зерно генератора (одинаковое - одинаковые данные)')
+    @click.option('--password', default='bench', show_default=True, help='Пароль пользователей bench_*')
+    @click.option('--yes', is_flag=True, help='Не спрашивать подтверждение, если база не пустая')
+    def generate_dataset(repatriants, log_rows, files, file_size, seed, password, yes):
+        """Наполняет базу синтетическими данными для замеров (только для тестового стенда!)"""
+        existing = db.session.query(db.func.count(Repatriant.id)).scalar()
+        if existing and not yes:
+            click.confirm(f"В базе уже {existing} репатриантов. Добавить синтетические данные?", abort=True)
+
+        generator = DatasetGenerator(app, repatriants=repatriants, log_rows=log_rows, files=files,
+                                     file_size=file_size, seed=seed, password=password)
+        counts = generator.run(progress=click.echo)
+        for table, count in counts.items():
+            click.echo(f"{table}: {count}")
@@ -24,3 +24,131 @@ class Config:
     # Старая папка для совместимости (временные файлы)
     UPLOAD_FOLDER = "uploads"
     MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200MB для сканов документов
+
+    # Перенос файлов между дисками (выравнивание заполнения)
+    REBALANCE_TOLERANCE = 0.05  # Допустимое отклонение от целевого заполнения (доля объема диска)
+    REBALANCE_MAX_BYTES_PER_SEC = int(os.environ.get("REBALANCE_MAX_BYTES_PER_SEC", 20 * 1024 * 1024))
+    REBALANCE_PAUSE_SECONDS = 0.2  # Пауза между файлами, чтобы не мешать работе пользователей
+    REBALANCE_DELETE_GRACE_SECONDS = 300  # Сколько ждать до удаления исходной копии (идущие скачивания)
+
+    # Хранилище файлов documents/ и avatars/: "local" (диски STORAGE_DISKS) или "s3"
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+
+    # S3-совместимое хранилище (AWS S3, MinIO); требуется пакет boto3
+    S3_BUCKET = os.environ.get("S3_BUCKET", "repatriants-files")
+    S3_PREFIX = os.environ.get("S3_PREFIX", "")
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # Например http://localhost:9000 для MinIO
+    S3_ACCESS_KEY = os.environ.get("S3_ACCESS_KEY")
+    S3_SECRET_KEY = os.environ.get("S3_SECRET_KEY")
+    S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+    S3_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024  # Размер части при потоковой multipart-загрузке
+    S3_PRESIGNED_DOWNLOADS = os.environ.get("S3_PRESIGNED_DOWNLOADS", "true").lower() == "true"
+    S3_PRESIGN_EXPIRES = 300  # Время жизни подписанной ссылки на скачивание, секунд
+
+    # Фоновая проверка целостности файлов (не должна мешать работе пользователей)
+    SCRUB_IO_BYTES_PER_SEC = int(os.environ.get("SCRUB_IO_BYTES_PER_SEC", 5 * 1024 * 1024))
+    SCRUB_PAUSE_SECONDS = 0.05  # Пауза между файлами
+
+    # Статистика дисков: страница строится по таблице ежедневных замеров
+    DISK_STATS_MAX_AGE_SECONDS = 3600  # Новый замер при открытии страницы, если последний старше
+    DISK_STATS_HISTORY_DAYS = 90  # Период истории для графика и прогноза заполнения
+
+    # Поблочная (возобновляемая) загрузка больших сканов через /api/uploads
+    UPLOAD_CHUNK_MAX_BYTES = 8 * 1024 * 1024  # Максимальный размер одного блока
+    UPLOAD_MAX_FILE_SIZE = int(os.environ.get("UPLOAD_MAX_FILE_SIZE", 2 * 1024 * 1024 * 1024))
+    UPLOAD_SESSION_TTL_HOURS = 48  # Через сколько часов без активности удаляется незавершенная или не прикрепленная к записи загрузка
+
+    # Режим запуска app.py: "development" (встроенный сервер Flask с отладчиком) или
+    # "production" (gunicorn: несколько процессов-воркеров, см. gunicorn.conf.py)
+    SERVER_MODE = os.environ.get("SERVER_MODE", "development")
+    SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.environ.get("SERVER_PORT", 5000))
+    SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", (os.cpu_count() or 1) * 2 + 1))
+    SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 4))  # Потоков в каждом воркере
+    SERVER_TIMEOUT = int(os.environ.get("SERVER_TIMEOUT", 120))  # Зависший воркер перезапускается через N секунд
+    SERVER_GRACEFUL_TIMEOUT = 30  # Сколько ждать завершения текущих запросов при перезапуске
+    SERVER_MAX_REQUESTS = 2000  # Плановый перезапуск воркера (защита от утечек памяти)
+    SERVER_MAX_REQUESTS_JITTER = 200
+    SERVER_PIDFILE = os.environ.get("SERVER_PIDFILE", "gunicorn.pid")  # Для kill -HUP при обновлении
+
+    # Пул соединений SQLAlchemy (отдельный в каждом процессе-воркере)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),  # Ожидание свободного соединения, секунд
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),  # Переоткрывать соединения старше N секунд
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+    # Лимит времени одного SQL-запроса (PostgreSQL statement_timeout), миллисекунд
+    STATEMENT_TIMEOUT_MS = int(os.environ.get("STATEMENT_TIMEOUT_MS", 15000))  # Обычные страницы и API
+    REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get("REPORT_STATEMENT_TIMEOUT_MS", 300000))  # Отчеты и выгрузки
+    REPORT_MAX_CONCURRENCY = int(os.environ.get("REPORT_MAX_CONCURRENCY", 2))  # Одновременных отчетов на воркер
+    REPORT_QUEUE_TIMEOUT_SECONDS = 10  # Сколько отчет ждет своей очереди
+
+    # Реплика только для чтения (необязательно): отчеты, выгрузки и поиск читают с нее.
+    # Для локальной проверки подойдет копия базы SQLite: sqlite:///replica.sqlite
+    REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+    SQLALCHEMY_BINDS = {"replica": {"url": REPLICA_DATABASE_URL, **SQLALCHEMY_ENGINE_OPTIONS}} if REPLICA_DATABASE_URL else {}
+    REPLICA_MAX_LAG_SECONDS = int(os.environ.get("REPLICA_MAX_LAG_SECONDS", 30))  # При большем отставании читаем с основной БД
+    REPLICA_CHECK_INTERVAL_SECONDS = 10  # Как часто проверять доступность и отставание реплики
+
+    # Метрики Prometheus на /metrics (доступ: сессия администратора или заголовок
+    # "Authorization: Bearer <METRICS_TOKEN>" для сборщика метрик)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+    # Диагностика SQL для разработки и тестового стенда: заголовок X-SQL-Diagnostics,
+    # поиск N+1 и журнал медленных запросов с параметрами (/admin/sql-diagnostics)
+    SQL_DIAGNOSTICS = os.environ.get("SQL_DIAGNOSTICS", "false").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+    N_PLUS_ONE_THRESHOLD = 5  # Сколько одинаковых запросов из одного места кода считать повтором
+
+    # Профилирование одного запроса администратором: заголовок "X-Profile: 1" или ?_profile=1.
+    # Профили (cProfile + SQL) сохраняются в PROFILE_DIR и доступны на /admin/profiles
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "true").lower() == "true"
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")  # Общая папка для всех воркеров
+    PROFILE_MAX_CONCURRENT = 1  # Одновременно профилируемых запросов на воркер (остальные выполняются без профиля)
+    PROFILE_KEEP = 50  # Сколько последних профилей хранить
+
+    # Сжатие текстовых ответов (HTML, JSON, CSV): gzip и brotli (если установлен пакет brotli).
+    # PDF и изображения из хранилища не сжимаются; статические файлы сжимаются один раз
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_ALGORITHMS = [name.strip() for name in os.environ.get("COMPRESSION_ALGORITHMS", "br,gzip").split(",")]
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))  # Меньшие ответы не сжимаются, байт
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))  # 0-11, для динамических ответов 4-5
+    COMPRESSION_MIMETYPES = {
+        "text/html", "text/plain", "text/css", "text/csv", "text/javascript", "application/javascript",
+        "application/json", "application/x-ndjson", "application/xml", "image/svg+xml",
+    }
+    COMPRESSION_STATIC_CACHE = os.environ.get("COMPRESSION_STATIC_CACHE", "static_compressed")  # Сжатые копии статики
+
+    # Кэш результатов /search в памяти воркера: ID найденных записей по набору фильтров, роли и странице.
+    # Очищается после изменения репатриантов, детей, членов семьи и записей жилищного отдела
+    SEARCH_CACHE_ENABLED = os.environ.get("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 1000))
+    SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 120))  # Ограничивает и отставание реплики
+
+    # JSON API поиска /api/search: страницы по курсору (не больше SEARCH_API_MAX_LIMIT строк) и выгрузка
+    # NDJSON, которая читает курсор на сервере БД порциями по SEARCH_API_STREAM_CHUNK строк
+    SEARCH_API_MAX_LIMIT = int(os.environ.get("SEARCH_API_MAX_LIMIT", 1000))
+    SEARCH_API_STREAM_CHUNK = int(os.environ.get("SEARCH_API_STREAM_CHUNK", 2000))
+
+    # Шина сброса кэшей между воркерами: "notify" (PostgreSQL LISTEN/NOTIFY), "poll" (опрос таблицы
+    # CACHE_INVALIDATIONS, например за PgBouncer в режиме transaction), "off" (один воркер),
+    # "auto" - notify для PostgreSQL, иначе poll
+    INVALIDATION_BUS = os.environ.get("INVALIDATION_BUS", "auto").lower()
+    INVALIDATION_POLL_SECONDS = float(os.environ.get("INVALIDATION_POLL_SECONDS", 2))  # Период опроса в режиме poll
+    INVALIDATION_RECONNECT_SECONDS = 5  # Пауза перед переподключением, если канал прервался
+
+    # Кэш пользователей для login_required/admin_required и журнала действий (в памяти воркера).
+    # Отключение и удаление пользователя сбрасывают запись сразу во всех воркерах
+    USER_CACHE_TTL_SECONDS = int(os.environ.get("USER_CACHE_TTL_SECONDS", 300))
+
+    # Хранилище сессий: "database" (таблица USER_SESSIONS, в cookie только идентификатор; позволяет
+    # завершить все сессии пользователя), "memory" (память процесса, для проверок), "cookie" (стандартные
+    # подписанные cookie Flask, завершить сессию на сервере нельзя)
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "database").lower()
+    SESSION_LIFETIME_HOURS = int(os.environ.get("SESSION_LIFETIME_HOURS", 24))  # Сессия истекает после N часов без активности
+    SESSION_ACTIVITY_UPDATE_SECONDS = int(os.environ.get("SESSION_ACTIVITY_UPDATE_SECONDS", 60))  # Как часто записывать время активности
@@ -1,6 +1,46 @@
 from __future__ import annotations
 
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextClause
 
 
-db = SQLAlchemy()
+def _is_read_only(clause) -> bool:
+    """Проверяет, что выражение только читает данные"""
+
+    if isinstance(clause, Select):
+        return True
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return False
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтение на реплику в маршрутах с декоратором read_replica.
+
+    Запись, а также любое чтение после записи в той же сессии, идут на основную БД.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get("use_replica"):
+            if self._flushing or not _is_read_only(clause):
+                self.info["wrote_to_primary"] = True
+            elif not self.info.get("wrote_to_primary"):
+                from .utils.db import get_replica_engine
+
+                engine = get_replica_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def dispose_engines(app) -> None:
+    """Сбрасывает пулы соединений, унаследованные при fork: каждый процесс открывает свои"""
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -3,10 +3,11 @@ from __future__ import annotations
 import json
 from datetime import datetime
 
-from sqlalchemy import event
+from sqlalchemy import DDL, event
 
 from .extensions import db
-from .utils.text import uppercase_string_fields
+from .utils.status import status_expiration_date
+from .utils.text import parse_address, parse_birth_date, uppercase_string_fields
 
 # Модель для основной таблицы репатриантов
 class Repatriant(db.Model):
@@ -29,6 +30,8 @@ class Repatriant(db.Model):
     rojd_loc = db.Column('ROJD_LOC', db.String(255))
     sem_poloj = db.Column('SEM_POLOJ', db.String(100))
     rep_status = db.Column('REP_STATUS', db.Date)
+    # Дата истечения статуса (REP_STATUS + 5 лет, заполняется при записи, см. status_expiration_date)
+    rep_status_expires = db.Column('REP_STATUS_EXPIRES', db.Date, index=True)
     rep_status_reg = db.Column('REP_STATUS_REG', db.Date)
     date_registration = db.Column('DATE_REGISTRATION', db.Date)  # Дата регистрации репатрианта
     dop_info = db.Column('DOP_INFO', db.String(255))
@@ -59,12 +62,16 @@ class Repatriant(db.Model):
     # Модель для таблицы детей (только СЫН и ДОЧЬ)
 class Child(db.Model):
     __tablename__ = 'CHILDREN'
+    # Фильтр "количество детей до 18 лет": диапазон по году и группировка по LIST_ID только по индексу
+    __table_args__ = (db.Index('IX_CHILDREN_BIRTH_YEAR_LIST_ID', 'BIRTH_YEAR', 'LIST_ID'),)
     
     id_child = db.Column('ID_CHILD', db.Integer, primary_key=True)
     list_id = db.Column('LIST_ID', db.Integer, db.ForeignKey('MAIN.ID'), nullable=False)
     step_rod = db.Column('STEP_ROD', db.String(50))  # Только 'СЫН' или 'ДОЧЬ'
     fio = db.Column('FIO', db.String(255))
     god_r = db.Column('GOD_R', db.String(10))
+    birth_year = db.Column('BIRTH_YEAR', db.Integer)  # Год из GOD_R (заполняется при записи, см. parse_birth_date)
+    birth_date = db.Column('BIRTH_DATE', db.Date)  # Полная дата из GOD_R, если она указана
     mesto_r = db.Column('MESTO_R', db.String(255))
     grajdanstvo = db.Column('GRAJDANSTVO', db.String(100))  # Гражданство
     nacionalnost = db.Column('NACIONALNOST', db.String(100))  # Национальность
@@ -258,6 +265,16 @@ class OtherRecord(db.Model):
 class HousingDepartmentRecord(db.Model):
     """Модель для записей жилищного отдела"""
     __tablename__ = 'HOUSING_DEPARTMENT_RECORDS'
+    __table_args__ = (
+        # Наличие записей у репатриантов страницы поиска - только по индексу
+        db.Index('IX_HOUSING_DEPARTMENT_RECORDS_REPATRIANT_ID', 'REPATRIANT_ID', 'IS_DELETED'),
+        db.Index('IX_HOUSING_DEPARTMENT_RECORDS_ADDRESS_HOUSE', 'ADDRESS_HOUSE', 'ADDRESS_APARTMENT'),
+        # Поиск по части названия города и улицы; на PostgreSQL - триграммы (pg_trgm), на остальных БД - обычный индекс
+        db.Index('IX_HOUSING_DEPARTMENT_RECORDS_ADDRESS_CITY_TRGM', 'ADDRESS_CITY',
+                 postgresql_using='gin', postgresql_ops={'ADDRESS_CITY': 'gin_trgm_ops'}),
+        db.Index('IX_HOUSING_DEPARTMENT_RECORDS_ADDRESS_STREET_TRGM', 'ADDRESS_STREET',
+                 postgresql_using='gin', postgresql_ops={'ADDRESS_STREET': 'gin_trgm_ops'}),
+    )
     
     id = db.Column('ID', db.Integer, primary_key=True, autoincrement=True)
     repatriant_id = db.Column('REPATRIANT_ID', db.Integer, db.ForeignKey('MAIN.ID'), nullable=False)
@@ -265,7 +282,12 @@ class HousingDepartmentRecord(db.Model):
     received_housing = db.Column('RECEIVED_HOUSING', db.Boolean)  # Получил жилье (да/нет)
     housing_type = db.Column('HOUSING_TYPE', db.String(100))  # ведомственное/частное
     housing_acquisition = db.Column('HOUSING_ACQUISITION', db.String(200))  # Выкуплено/Передано
-    address = db.Column('ADDRESS', db.String(500))  # Адрес
+    address = db.Column('ADDRESS', db.String(500))  # Адрес (для отображения)
+    # Части адреса для поиска (заполняются при записи из ADDRESS, см. parse_address)
+    address_city = db.Column('ADDRESS_CITY', db.String(200))
+    address_street = db.Column('ADDRESS_STREET', db.String(300))
+    address_house = db.Column('ADDRESS_HOUSE', db.String(50))
+    address_apartment = db.Column('ADDRESS_APARTMENT', db.String(50))
     # family_composition удален - данные хранятся только в таблицах CHILDREN и FAMILY
     has_warrant = db.Column('HAS_WARRANT', db.Boolean)  # Ордер (да/нет)
     repair_amount = db.Column('REPAIR_AMOUNT', db.Numeric(10, 2))  # Ремонт жилья (сумма)
@@ -303,6 +325,10 @@ class HousingDepartmentRecord(db.Model):
             'housing_type': self.housing_type,
             'housing_acquisition': self.housing_acquisition,
             'address': self.address,
+            'address_city': self.address_city,
+            'address_street': self.address_street,
+            'address_house': self.address_house,
+            'address_apartment': self.address_apartment,
             # 'family_composition' удален из базы данных - данные в CHILDREN и FAMILY
             'has_warrant': self.has_warrant,
             'repair_amount': float(self.repair_amount) if self.repair_amount else None,
@@ -362,22 +388,149 @@ class HousingQueue(db.Model):
             'is_active': self.is_active
         }
 
+# Каталог файлов на дисках хранения
+class StoredFile(db.Model):
+    """Модель каталога файлов: на каком диске физически лежит файл"""
+    __tablename__ = 'STORED_FILES'
+
+    id = db.Column('ID', db.Integer, primary_key=True, autoincrement=True)
+    file_name = db.Column('FILE_NAME', db.String(255), unique=True, nullable=False)  # Имя файла на диске (doc_1_ab12cd34.pdf)
+    disk_path = db.Column('DISK_PATH', db.String(500), nullable=False)  # Корневая папка диска из STORAGE_DISKS
+    size = db.Column('SIZE', db.BigInteger)  # Размер в байтах
+    checksum = db.Column('CHECKSUM', db.String(64))  # SHA-256
+    created_at = db.Column('CREATED_AT', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UPDATED_AT', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StoredFile {self.file_name} @ {self.disk_path}>'
+
+class UploadSession(db.Model):
+    """Модель сессии поблочной (возобновляемой) загрузки файла"""
+    __tablename__ = 'UPLOAD_SESSIONS'
+
+    id = db.Column('ID', db.String(32), primary_key=True)  # Идентификатор загрузки (uuid4 hex)
+    user_id = db.Column('USER_ID', db.Integer, db.ForeignKey('USERS.ID'), nullable=False)
+    original_name = db.Column('ORIGINAL_NAME', db.String(255))  # Имя файла у пользователя
+    folder = db.Column('FOLDER', db.String(20), nullable=False)  # documents / avatars
+    file_name = db.Column('FILE_NAME', db.String(255), unique=True, nullable=False)  # Итоговое имя на диске
+    disk_path = db.Column('DISK_PATH', db.String(500), nullable=False)  # Диск, на который пишутся блоки
+    total_size = db.Column('TOTAL_SIZE', db.BigInteger, nullable=False)
+    checksum = db.Column('CHECKSUM', db.String(64), nullable=False)  # Ожидаемый SHA-256 всего файла
+    received_bytes = db.Column('RECEIVED_BYTES', db.BigInteger, default=0, nullable=False)
+    status = db.Column('STATUS', db.String(20), default='uploading', nullable=False)  # uploading / completed / attached
+    created_at = db.Column('CREATED_AT', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UPDATED_AT', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def relative_path(self):
+        return f'{self.folder}/{self.file_name}'
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.original_name,
+            'size': self.total_size,
+            'offset': self.received_bytes,
+            'status': self.status,
+            'path': self.relative_path if self.status != 'uploading' else None
+        }
+
+class DiskUsageSample(db.Model):
+    """Модель ежедневных замеров заполнения дисков хранения"""
+    __tablename__ = 'DISK_USAGE_SAMPLES'
+    __table_args__ = (db.UniqueConstraint('DISK_PATH', 'SAMPLE_DATE', name='UQ_DISK_USAGE_SAMPLES_DISK_DATE'),)
+
+    id = db.Column('ID', db.Integer, primary_key=True, autoincrement=True)
+    disk_name = db.Column('DISK_NAME', db.String(100), nullable=False)
+    disk_path = db.Column('DISK_PATH', db.String(500), nullable=False)
+    sample_date = db.Column('SAMPLE_DATE', db.Date, nullable=False)  # Один замер на диск в день (последний за день)
+    total_bytes = db.Column('TOTAL_BYTES', db.BigInteger)
+    used_bytes = db.Column('USED_BYTES', db.BigInteger)
+    free_bytes = db.Column('FREE_BYTES', db.BigInteger)
+    file_count = db.Column('FILE_COUNT', db.Integer)  # Количество файлов на диске
+    bytes_written = db.Column('BYTES_WRITTEN', db.BigInteger)  # Записано новых файлов за день
+    sampled_at = db.Column('SAMPLED_AT', db.DateTime, default=datetime.utcnow)
+
+class ScrubFinding(db.Model):
+    """Модель результатов проверки целостности файлов хранилища"""
+    __tablename__ = 'STORAGE_SCRUB_FINDINGS'
+
+    id = db.Column('ID', db.Integer, primary_key=True, autoincrement=True)
+    run_started_at = db.Column('RUN_STARTED_AT', db.DateTime, nullable=False, index=True)  # Запуск проверки
+    file_name = db.Column('FILE_NAME', db.String(255), nullable=False)
+    disk_path = db.Column('DISK_PATH', db.String(500))
+    problem = db.Column('PROBLEM', db.String(50), nullable=False)  # missing / size_mismatch / checksum_mismatch / relocated
+    details = db.Column('DETAILS', db.String(1000))
+    repaired = db.Column('REPAIRED', db.Boolean, default=False, nullable=False)  # Восстановлен с резервного диска
+    created_at = db.Column('CREATED_AT', db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'run_started_at': self.run_started_at.strftime('%Y-%m-%d %H:%M:%S') if self.run_started_at else None,
+            'file_name': self.file_name,
+            'disk_path': self.disk_path,
+            'problem': self.problem,
+            'details': self.details,
+            'repaired': self.repaired,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
+
+class UserSession(db.Model):
+    """Модель сессий пользователей на сервере (в cookie хранится только идентификатор)"""
+    __tablename__ = 'USER_SESSIONS'
+
+    id = db.Column('ID', db.String(64), primary_key=True)  # SHA-256 идентификатора из cookie
+    user_id = db.Column('USER_ID', db.Integer, index=True)  # Пусто - сессия до входа (сообщения flash)
+    data = db.Column('DATA', db.Text, nullable=False)  # Содержимое сессии (JSON)
+    created_at = db.Column('CREATED_AT', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UPDATED_AT', db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column('EXPIRES_AT', db.DateTime, nullable=False, index=True)
+
+class CacheInvalidation(db.Model):
+    """Модель сообщений о сбросе кэшей для воркеров без LISTEN/NOTIFY (режим опроса)"""
+    __tablename__ = 'CACHE_INVALIDATIONS'
+
+    id = db.Column('ID', db.Integer, primary_key=True, autoincrement=True)
+    topic = db.Column('TOPIC', db.String(50), nullable=False)  # Какой кэш сбросить: search, user, ...
+    cache_key = db.Column('CACHE_KEY', db.String(200))  # Ключ записи; пусто - весь кэш
+    origin = db.Column('ORIGIN', db.String(50), nullable=False)  # Воркер-отправитель (у себя он уже сбросил)
+    created_at = db.Column('CREATED_AT', db.DateTime, default=datetime.utcnow, index=True)
+
 
 # События SQLAlchemy для автоматического преобразования в верхний регистр
 @event.listens_for(Repatriant, 'before_insert')
 @event.listens_for(Repatriant, 'before_update')
 def receive_before_insert_update_repatriant(mapper, connection, target):
-    """Автоматически преобразует текстовые поля Repatriant в верхний регистр"""
+    """Автоматически преобразует текстовые поля Repatriant в верхний регистр и заполняет дату истечения статуса"""
     # Исключаем технические поля: пароли, бинарные данные, пути к файлам, email
     exclude_fields = {'password_hash', 'avatar_path', 'documents_path', 'file', 'photo', 'file_jil', 'f_name', 'f_name_jil', 'mail'}
     uppercase_string_fields(target, exclude_fields)
+    target.rep_status_expires = status_expiration_date(target.rep_status)
 
 @event.listens_for(Child, 'before_insert')
 @event.listens_for(Child, 'before_update')
 def receive_before_insert_update_child(mapper, connection, target):
-    """Автоматически преобразует текстовые поля Child в верхний регистр"""
+    """Автоматически преобразует текстовые поля Child в верхний регистр и заполняет год/дату рождения"""
     exclude_fields = {}
     uppercase_string_fields(target, exclude_fields)
+    target.birth_year, target.birth_date = parse_birth_date(target.god_r)
+
+@event.listens_for(HousingDepartmentRecord, 'before_insert')
+@event.listens_for(HousingDepartmentRecord, 'before_update')
+def receive_before_insert_update_housing_department(mapper, connection, target):
+    """Заполняет части адреса для поиска из ADDRESS"""
+    parsed = parse_address(target.address)
+    target.address_city = parsed['city']
+    target.address_street = parsed['street']
+    target.address_house = parsed['house']
+    target.address_apartment = parsed['apartment']
+
+# Расширение для триграммного индекса по улице (до создания таблицы в новой базе)
+event.listen(
+    HousingDepartmentRecord.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
 
 @event.listens_for(FamilyMember, 'before_insert')
 @event.listens_for(FamilyMember, 'before_update')
@@ -30,12 +30,21 @@ from ..models import (
     HousingRecord,
     OtherRecord,
     Repatriant,
+    ScrubFinding,
     SocialHelpRecord,
     User,
 )
 from ..services.audit import log_user_action
+from ..services.jobs import get_job
+from ..services.profiling import list_profiles, load_profile, profile_file
+from ..services.read_models import records_with_repatriants
+from ..services.scrubber import StorageScrubber
+from ..services.sessions import revoke_user_sessions
+from ..services.sql_diagnostics import get_sql_diagnostics
 from ..services.storage import allowed_file, delete_file, get_best_disk, save_file
+from ..services.user_cache import forget_user
 from ..utils.auth import admin_required, login_required
+from ..utils.db import get_pool_status, read_replica, report_query
 from ..utils.status import check_repatriant_status
 from ..utils.text import normalize_nationality_value, uppercase_string_fields
 
@@ -99,7 +108,11 @@ def register_admin_routes(app):
             return redirect(url_for('admin_users'))
 
         user.is_active = not user.is_active
+        # Отключенный пользователь теряет доступ сразу во всех воркерах
+        forget_user(db.session, user.id)
         db.session.commit()
+        if not user.is_active:
+            revoke_user_sessions(app, user.id)
 
         status = 'активирован' if user.is_active else 'деактивирован'
         log_user_action(f'Пользователь {user.username} {status}')
@@ -118,14 +131,32 @@ def register_admin_routes(app):
             return redirect(url_for('admin_users'))
 
         username = user.username
+        forget_user(db.session, user.id)
         db.session.delete(user)
         db.session.commit()
+        revoke_user_sessions(app, user_id)
 
         log_user_action(f'Удален пользователь: {username}')
         flash(f'Пользователь {username} удален', 'success')
 
         return redirect(url_for('admin_users'))
 
+    @app.route('/admin/users/<int:user_id>/sessions/revoke', methods=['POST'])
+    @admin_required
+    def revoke_sessions(user_id):
+        """Завершение всех сессий пользователя (на всех устройствах)"""
+        user = User.query.get_or_404(user_id)
+
+        revoked = revoke_user_sessions(app, user.id)
+        if revoked is None:
+            flash('Сессии хранятся в cookie (SESSION_BACKEND=cookie) и не могут быть завершены на сервере', 'error')
+            return redirect(url_for('admin_users'))
+
+        log_user_action(f'Завершены сессии пользователя {user.username}')
+        flash(f'Завершено сессий пользователя {user.username}: {revoked}', 'success')
+
+        return redirect(url_for('admin_users'))
+
     @app.route('/admin/logs')
     @admin_required
     def admin_logs():
@@ -189,6 +220,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/social-adaptation')
     @admin_required
+    @report_query
+    @read_replica
     def report_social_adaptation():
         """Отчет по данным социально адаптационного отдела"""
         # Статистика по записям
@@ -197,22 +230,11 @@ def register_admin_routes(app):
         total_events = EventRecord.query.count()
         total_other = OtherRecord.query.count()
 
-        # Получаем все записи с информацией о репатриантах
-        housing_records = db.session.query(HousingRecord, Repatriant).join(
-            Repatriant, HousingRecord.repatriant_id == Repatriant.id
-        ).order_by(HousingRecord.created_at.desc()).limit(100).all()
-
-        social_records = db.session.query(SocialHelpRecord, Repatriant).join(
-            Repatriant, SocialHelpRecord.repatriant_id == Repatriant.id
-        ).order_by(SocialHelpRecord.created_at.desc()).limit(100).all()
-
-        event_records = db.session.query(EventRecord, Repatriant).join(
-            Repatriant, EventRecord.repatriant_id == Repatriant.id
-        ).order_by(EventRecord.created_at.desc()).limit(100).all()
-
-        other_records = db.session.query(OtherRecord, Repatriant).join(
-            Repatriant, OtherRecord.repatriant_id == Repatriant.id
-        ).order_by(OtherRecord.created_at.desc()).limit(100).all()
+        # Последние записи с информацией о репатриантах (репатриант - строка списка, см. read_models)
+        housing_records = records_with_repatriants(HousingRecord, 100)
+        social_records = records_with_repatriants(SocialHelpRecord, 100)
+        event_records = records_with_repatriants(EventRecord, 100)
+        other_records = records_with_repatriants(OtherRecord, 100)
 
         # Статистика по типам помощи
         help_type_stats = db.session.execute(text("""
@@ -251,6 +273,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/repatriants')
     @admin_required
+    @report_query
+    @read_replica
     def report_repatriants():
         """Отчет по статистике репатриантов"""
         # Общая статистика
@@ -320,6 +344,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/user-activity')
     @admin_required
+    @report_query
+    @read_replica
     def report_user_activity():
         """Отчет по активности пользователей"""
         # Активность пользователей по количеству действий
@@ -358,6 +384,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/time-stats')
     @admin_required
+    @report_query
+    @read_replica
     def report_time_stats():
         """Отчет по временной статистике"""
         # Регистрации по дням (последние 30 дней)
@@ -401,6 +429,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/family-stats')
     @admin_required
+    @report_query
+    @read_replica
     def report_family_stats():
         """Отчет по семейной статистике"""
         # Общее количество семей
@@ -455,6 +485,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/reports/system')
     @admin_required
+    @report_query
+    @read_replica
     def report_system():
         """Системные отчеты"""
         # Общая статистика системы
@@ -508,7 +540,105 @@ def register_admin_routes(app):
                              total_logs=total_logs,
                              action_types=action_types,
                              weekday_activity=weekday_activity,
-                             top_users=top_users)
+                             top_users=top_users,
+                             pool_status=get_pool_status(app))
+
+    @app.route('/admin/reports/db-pool')
+    @admin_required
+    def report_db_pool():
+        """Заполнение пулов соединений с БД в этом процессе-воркере (JSON)"""
+        return jsonify({'pid': os.getpid(), 'pools': get_pool_status(app)})
+
+    @app.route('/admin/sql-diagnostics')
+    @admin_required
+    def sql_diagnostics():
+        """Диагностика SQL этого процесса-воркера: число запросов, повторы (N+1), медленные запросы"""
+        if not app.config['SQL_DIAGNOSTICS']:
+            return jsonify({'enabled': False, 'error': 'Диагностика выключена (SQL_DIAGNOSTICS=true)'}), 404
+        return jsonify({'enabled': True, 'pid': os.getpid(), **get_sql_diagnostics()})
+
+    @app.route('/admin/profiles')
+    @admin_required
+    def admin_profiles():
+        """Сохраненные профили запросов (заголовок X-Profile: 1 или параметр ?_profile=1)"""
+        profiles = list_profiles()
+        # По умолчанию - JSON; страница (?format=html) - только если шаблоны
+        # admin/profiles.html и admin/profile_view.html есть среди шаблонов развертывания
+        if request.args.get('format') != 'html':
+            return jsonify({'enabled': app.config['PROFILING_ENABLED'], 'profiles': profiles})
+        return render_template('admin/profiles.html',
+                             profiles=profiles,
+                             profiling_enabled=app.config['PROFILING_ENABLED'])
+
+    @app.route('/admin/profiles/<profile_id>')
+    @admin_required
+    def admin_profile_view(profile_id):
+        """Просмотр профиля: функции по суммарному времени и SQL-запросы по длительности"""
+        profile = load_profile(profile_id, sort=request.args.get('sort', 'cumulative'))
+        if profile is None:
+            if request.args.get('format') != 'html':
+                return jsonify({'error': 'Профиль не найден'}), 404
+            flash('Профиль не найден', 'error')
+            return redirect(url_for('admin_profiles', format='html'))
+        if request.args.get('format') != 'html':
+            return jsonify(profile)
+        return render_template('admin/profile_view.html', profile=profile)
+
+    @app.route('/admin/profiles/<profile_id>/download')
+    @admin_required
+    def admin_profile_download(profile_id):
+        """Скачивание профиля в формате pstats (snakeviz, python -m pstats)"""
+        path = profile_file(profile_id)
+        if path is None:
+            return jsonify({'error': 'Профиль не найден'}), 404
+        return send_file(os.path.abspath(path), as_attachment=True, download_name=f'{profile_id}.prof')
+
+    @app.route('/admin/reports/storage-integrity')
+    @admin_required
+    def report_storage_integrity():
+        """Отчет о проверке целостности файлов хранилища"""
+        scrub_status = get_job(app, StorageScrubber).status()
+
+        # Находки последнего запуска проверки
+        last_run = db.session.query(db.func.max(ScrubFinding.run_started_at)).scalar()
+        findings = []
+        if last_run:
+            findings = ScrubFinding.query.filter_by(run_started_at=last_run).order_by(ScrubFinding.id).all()
+
+        problem_stats = db.session.query(
+            ScrubFinding.problem,
+            db.func.count(ScrubFinding.id)
+        ).filter(ScrubFinding.run_started_at == last_run).group_by(ScrubFinding.problem).all() if last_run else []
+
+        # По умолчанию - JSON; страница (?format=html) - только если шаблон
+        # admin/report_storage_integrity.html есть среди шаблонов развертывания
+        if request.args.get('format') != 'html':
+            return jsonify({
+                'status': scrub_status,
+                'last_run': last_run.isoformat() if last_run else None,
+                'problems': {problem: count for problem, count in problem_stats},
+                'findings': [finding.to_dict() for finding in findings]
+            })
+
+        return render_template('admin/report_storage_integrity.html',
+                             scrub_status=scrub_status,
+                             last_run=last_run,
+                             findings=findings,
+                             problem_stats=problem_stats)
+
+    @app.route('/admin/reports/storage-integrity/run', methods=['POST'])
+    @admin_required
+    def run_storage_scrub():
+        """Запуск проверки целостности файлов хранилища"""
+        if app.config['STORAGE_BACKEND'] != 'local':
+            flash('Проверка доступна только для локальных дисков', 'error')
+        elif get_job(app, StorageScrubber).start(repair=request.form.get('repair', 'true') == 'true'):
+            log_user_action('Запущена проверка целостности файлов хранилища')
+            flash('Проверка целостности файлов запущена', 'success')
+        else:
+            flash('Проверка уже выполняется', 'warning')
+
+        return redirect(url_for('report_storage_integrity', format=request.form.get('format')))
 
     @app.route('/admin/reports/export')
     @admin_required
@@ -518,6 +648,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/export/repatriants/<format>')
     @admin_required
+    @report_query
+    @read_replica
     def export_repatriants(format):
         """Экспорт данных репатриантов"""
         from flask import make_response
@@ -575,6 +707,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/export/logs/<format>')
     @admin_required
+    @report_query
+    @read_replica
     def export_logs(format):
         """Экспорт логов системы"""
         from flask import make_response
@@ -628,6 +762,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/export/users/<format>')
     @admin_required
+    @report_query
+    @read_replica
     def export_users(format):
         """Экспорт пользователей"""
         from flask import make_response
@@ -683,6 +819,8 @@ def register_admin_routes(app):
 
     @app.route('/admin/export/families/<format>')
     @admin_required
+    @report_query
+    @read_replica
     def export_families(format):
         """Экспорт семейных данных"""
         from flask import make_response
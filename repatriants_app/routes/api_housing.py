@@ -34,10 +34,21 @@ from ..models import (
     User,
 )
 from ..services.audit import log_user_action
+from ..services.read_models import repatriant_rows
 from ..services.storage import allowed_file, delete_file, get_best_disk, save_file
+from ..services.uploads import claim_named_uploads
 from ..utils.auth import admin_required, login_required
+from ..utils.db import read_replica
 from ..utils.status import check_repatriant_status
-from ..utils.text import normalize_nationality_value, uppercase_string_fields
+from ..utils.text import ADDRESS_PARTS, format_address, normalize_nationality_value, uppercase_string_fields
+
+
+def address_from_form(form_data):
+    """Адрес записи жилищного отдела из формы: отдельные поля address_city/street/house/apartment
+    или одна строка address; None, если в форме адреса нет"""
+    if any(f'address_{kind}' in form_data for kind in ADDRESS_PARTS):
+        return format_address(*(form_data.get(f'address_{kind}', '').strip() for kind in ADDRESS_PARTS))
+    return form_data.get('address')
 
 
 def register_api_housing_routes(app):
@@ -47,6 +58,7 @@ def register_api_housing_routes(app):
 
     @app.route('/api/search-repatriants')
     @login_required
+    @read_replica
     def api_search_repatriants():
         """API для поиска репатриантов"""
         query = request.args.get('q', '').strip()
@@ -54,13 +66,13 @@ def register_api_housing_routes(app):
             return jsonify([])
 
         try:
-            # Поиск по ФИО или коду
-            results = Repatriant.query.filter(
+            # Поиск по ФИО или коду (только столбцы списка, см. read_models)
+            results = repatriant_rows(Repatriant.query.filter(
                 db.or_(
                     db.func.concat(Repatriant.f, ' ', Repatriant.i, ' ', Repatriant.o).ilike(f'%{query}%'),
                     Repatriant.kod.ilike(f'%{query}%')
                 )
-            ).limit(20).all()
+            ).limit(20))
 
             return jsonify([{
                 'id': r.id,
@@ -123,7 +135,7 @@ def register_api_housing_routes(app):
                 # Валидация: если жилье не получено, статус жилья и адрес должны быть пустыми
                 received_housing = form_data.get('received_housing') == 'true'
                 housing_acquisition = form_data.get('housing_acquisition') if received_housing else None
-                address = form_data.get('address') if received_housing else None
+                address = address_from_form(form_data) if received_housing else None
 
                 # Сначала создаем запись без файлов, чтобы получить ID
                 # family_composition удален из базы - данные хранятся только в таблицах CHILDREN и FAMILY
@@ -167,6 +179,9 @@ def register_api_housing_routes(app):
                                         'name': doc_name
                                     })
 
+                # Большие сканы, загруженные поблочно через /api/uploads, с их названиями
+                document_list.extend(claim_named_uploads(form_data, session.get('user_id')))
+
                 # Обновляем запись с путями к файлам и названиями
                 if document_list:
                     record.documents_path = json.dumps(document_list)
@@ -266,10 +281,11 @@ def register_api_housing_routes(app):
                         record.housing_acquisition = form_data.get('housing_acquisition')
                     else:
                         record.housing_acquisition = None
-                if form_data.get('address') is not None:
+                if 'address' in form_data or any(f'address_{kind}' in form_data for kind in ADDRESS_PARTS):
                     # Валидация: адрес можно установить только если жилье получено
+                    # (части адреса для поиска пересчитываются из него при сохранении)
                     if record.received_housing:
-                        record.address = form_data.get('address')
+                        record.address = address_from_form(form_data)
                     else:
                         record.address = None
                 # НЕ обновляем family_composition при редактировании - это только снимок на момент создания записи
@@ -311,6 +327,8 @@ def register_api_housing_routes(app):
                                         'name': doc_name
                                     })
 
+                new_documents.extend(claim_named_uploads(form_data, session.get('user_id')))
+
                 # Объединяем существующие и новые документы
                 all_documents = existing_documents + new_documents
                 if all_documents:
@@ -422,21 +440,22 @@ def register_api_housing_routes(app):
 
                 db.session.commit()
 
-                # Сортируем по баллам (убывание) и времени добавления
-                queue_items = HousingQueue.query.filter_by(is_active=True).order_by(
+                # Сортируем по баллам (убывание) и времени добавления; ФИО репатриантов - тем же
+                # запросом, только нужные столбцы (раньше - отдельный запрос на каждую запись)
+                queue_items = db.session.query(HousingQueue, Repatriant.id, Repatriant.f, Repatriant.i, Repatriant.o).outerjoin(
+                    Repatriant, HousingQueue.repatriant_id == Repatriant.id
+                ).filter(HousingQueue.is_active == True).order_by(
                     HousingQueue.total_score.desc(),
                     HousingQueue.added_at.asc()
                 ).all()
 
-                # Получаем информацию о репатриантах
                 result = []
-                for idx, item in enumerate(queue_items):
+                for idx, (item, found_id, f, i, o) in enumerate(queue_items):
                     item.queue_position = idx + 1
-                    repatriant = Repatriant.query.get(item.repatriant_id)
                     result.append({
                         'id': item.id,
                         'repatriant_id': item.repatriant_id,
-                        'repatriant_name': f"{repatriant.f} {repatriant.i} {repatriant.o}" if repatriant else f"Репатриант #{item.repatriant_id}",
+                        'repatriant_name': f"{f} {i} {o}" if found_id is not None else f"Репатриант #{item.repatriant_id}",
                         'has_children': item.has_children,
                         'has_work': item.has_work,
                         'has_law_violations': item.has_law_violations,
@@ -35,6 +35,7 @@ from ..models import (
 )
 from ..services.audit import log_user_action
 from ..services.storage import allowed_file, delete_file, get_best_disk, save_file
+from ..services.uploads import claim_uploaded_files
 from ..utils.auth import admin_required, login_required
 from ..utils.status import check_repatriant_status
 from ..utils.text import normalize_nationality_value, uppercase_string_fields
@@ -136,6 +137,9 @@ def register_api_social_routes(app):
                                 if saved_path:
                                     document_paths.append(saved_path)
 
+                # Большие сканы, загруженные поблочно через /api/uploads
+                document_paths.extend(claim_uploaded_files(form_data.getlist('uploaded_documents'), session.get('user_id')))
+
                 # Обрабатываем стоимость
                 cost = None
                 if form_data.get('cost'):
@@ -195,8 +199,9 @@ def register_api_social_routes(app):
                 if form_data.get('notes') is not None:
                     record.notes = form_data.get('notes')
 
-                # Обрабатываем новые файлы
-                if files:
+                # Обрабатываем новые файлы (в том числе загруженные поблочно через /api/uploads)
+                uploaded_documents = form_data.getlist('uploaded_documents')
+                if files or uploaded_documents:
                     existing_docs = json.loads(record.documents_path) if record.documents_path else []
                     for file in files:
                         if file and file.filename:
@@ -204,6 +209,7 @@ def register_api_social_routes(app):
                                 saved_path = save_file(file, 'documents', f'housing_{record.repatriant_id}_{uuid.uuid4().hex[:8]}')
                                 if saved_path:
                                     existing_docs.append(saved_path)
+                    existing_docs.extend(claim_uploaded_files(uploaded_documents, session.get('user_id')))
                     record.documents_path = json.dumps(existing_docs) if existing_docs else None
 
                 db.session.commit()
@@ -318,6 +324,9 @@ def register_api_social_routes(app):
                                 if saved_path:
                                     document_paths.append(saved_path)
 
+                # Большие сканы, загруженные поблочно через /api/uploads
+                document_paths.extend(claim_uploaded_files(form_data.getlist('uploaded_documents'), session.get('user_id')))
+
                 # Определяем тип помощи для отображения
                 help_type = form_data.get('help_type')
                 custom_help_type = form_data.get('custom_help_type') if help_type == 'другое' else None
@@ -370,8 +379,9 @@ def register_api_social_routes(app):
                 if form_data.get('description') is not None:
                     record.description = form_data.get('description')
 
-                # Обрабатываем новые файлы
-                if files:
+                # Обрабатываем новые файлы (в том числе загруженные поблочно через /api/uploads)
+                uploaded_documents = form_data.getlist('uploaded_documents')
+                if files or uploaded_documents:
                     existing_docs = json.loads(record.documents_path) if record.documents_path else []
                     for file in files:
                         if file and file.filename:
@@ -379,6 +389,7 @@ def register_api_social_routes(app):
                                 saved_path = save_file(file, 'documents', f'social_{record.repatriant_id}_{uuid.uuid4().hex[:8]}')
                                 if saved_path:
                                     existing_docs.append(saved_path)
+                    existing_docs.extend(claim_uploaded_files(uploaded_documents, session.get('user_id')))
                     record.documents_path = json.dumps(existing_docs) if existing_docs else None
 
                 db.session.commit()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from flask import jsonify, request, session
+
+from ..services.storage import delete_file
+from ..services.uploads import (
+    UploadError,
+    abort_upload,
+    append_chunk,
+    complete_upload,
+    get_upload,
+    init_upload,
+    sync_offset,
+)
+from ..utils.auth import login_required
+
+
+def register_api_upload_routes(app):
+    """Регистрирует маршруты на переданном Flask-приложении."""
+
+    # API поблочной загрузки больших сканов: блоки пишутся сразу на диск хранения,
+    # после обрыва связи клиент узнает принятый объем (GET) и продолжает с него (PUT)
+
+    @app.errorhandler(UploadError)
+    def handle_upload_error(e):
+        response = {'success': False, 'error': str(e)}
+        if e.status_code == 409 and request.view_args and 'upload_id' in request.view_args:
+            try:
+                response['offset'] = get_upload(request.view_args['upload_id'], session.get('user_id')).received_bytes
+            except UploadError:
+                pass
+        return jsonify(response), e.status_code
+
+    @app.route('/api/uploads', methods=['POST'])
+    @login_required
+    def api_upload_init():
+        """Начинает загрузку: {filename, size, sha256, folder?, prefix?}"""
+        data = request.get_json(silent=True) or {}
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Не указан размер файла'}), 400
+
+        upload = init_upload(
+            session.get('user_id'),
+            data.get('filename'),
+            size,
+            data.get('sha256'),
+            folder=data.get('folder') or 'documents',
+            prefix=data.get('prefix') or 'upload'
+        )
+        return jsonify({'success': True, 'upload': upload.to_dict(),
+                        'chunk_size': app.config['UPLOAD_CHUNK_MAX_BYTES']}), 201
+
+    @app.route('/api/uploads/<upload_id>', methods=['GET'])
+    @login_required
+    def api_upload_status(upload_id):
+        """Состояние загрузки: сколько байт уже принято (для возобновления)"""
+        upload = get_upload(upload_id, session.get('user_id'))
+        sync_offset(upload)
+        return jsonify({'success': True, 'upload': upload.to_dict()})
+
+    @app.route('/api/uploads/<upload_id>', methods=['PUT'])
+    @login_required
+    def api_upload_chunk(upload_id):
+        """Принимает очередной блок; смещение передается в заголовке Upload-Offset"""
+        upload = get_upload(upload_id, session.get('user_id'))
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Не указан заголовок Upload-Offset'}), 400
+
+        append_chunk(upload, offset, request.stream, request.content_length)
+        return jsonify({'success': True, 'upload': upload.to_dict()})
+
+    @app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+    @login_required
+    def api_upload_complete(upload_id):
+        """Завершает загрузку после проверки SHA-256, возвращает путь для формы записи"""
+        upload = get_upload(upload_id, session.get('user_id'))
+        path = complete_upload(upload)
+        return jsonify({'success': True, 'path': path, 'upload': upload.to_dict()})
+
+    @app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+    @login_required
+    def api_upload_abort(upload_id):
+        """Отменяет загрузку"""
+        upload = get_upload(upload_id, session.get('user_id'))
+        if upload.status == 'attached':
+            return jsonify({'success': False, 'error': 'Файл уже прикреплен к записи'}), 409
+        if upload.status == 'completed':
+            # Собранный, но не прикрепленный файл удаляем из хранилища
+            delete_file(upload.relative_path)
+        abort_upload(upload)
+        return jsonify({'success': True})
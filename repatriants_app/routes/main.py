@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 
 from flask import (
     flash,
+    g,
     jsonify,
     make_response,
     redirect,
@@ -16,6 +17,7 @@ from flask import (
     send_file,
     send_from_directory,
     session,
+    stream_with_context,
     url_for,
 )
 from sqlalchemy import text
@@ -34,10 +36,355 @@ from ..models import (
     User,
 )
 from ..services.audit import log_user_action
-from ..services.storage import allowed_file, delete_file, get_best_disk, save_file
+from ..services.disk_stats import ensure_fresh_samples, get_disk_stats
+from ..services.facets import cached_search_facets
+from ..services.jobs import get_job
+from ..services.read_models import REPATRIANT_ROW_COLUMNS, RepatriantRow, repatriant_rows, repatriant_rows_by_id
+from ..services.rebalancer import StorageRebalancer
+from ..services.search_cache import cached_paginate, search_cache_key
+from ..services.storage import allowed_file, delete_file, save_file
+from ..services.storage_backends import get_storage_backend
+from ..services.uploads import claim_uploaded_file
 from ..utils.auth import admin_required, login_required
-from ..utils.status import check_repatriant_status
-from ..utils.text import normalize_nationality_value, uppercase_string_fields
+from ..utils.db import get_replica_engine, read_replica, report_slots, set_statement_timeout
+from ..utils.status import check_repatriant_status, check_repatriant_statuses
+from ..utils.text import normalize_address_part, normalize_nationality_value, uppercase_string_fields
+
+
+def housing_record_flags(repatriant_ids):
+    """{repatriant_id: True} для репатриантов, у которых есть записи жилищного отдела"""
+    if not repatriant_ids:
+        return {}
+    rows = db.session.query(HousingDepartmentRecord.repatriant_id).filter(
+        HousingDepartmentRecord.repatriant_id.in_(repatriant_ids),
+        HousingDepartmentRecord.is_deleted == False
+    ).distinct()
+    return {repatriant_id: True for repatriant_id, in rows}
+
+
+def build_search_query(args, user_role):
+    """Запрос поиска репатриантов по параметрам страницы /search (q, расширенный поиск, жилищный отдел).
+
+    Возвращает (запрос Repatriant.query без сортировки, q, advanced_params, housing_params, has_advanced_params)
+    """
+    query = args.get('q', '')
+
+    # Получаем параметры расширенного поиска
+    advanced_params = {
+        'f': args.get('f', '').strip(),
+        'i': args.get('i', '').strip(),
+        'o': args.get('o', '').strip(),
+        'f_hist': args.get('f_hist', '').strip(),
+        'sex': args.get('sex', '').strip(),
+        'date_r_from': args.get('date_r_from', '').strip(),
+        'date_r_to': args.get('date_r_to', '').strip(),
+        'kod': args.get('kod', '').strip(),
+        'strana_proj': args.get('strana_proj', '').strip(),
+        'from_loc': args.get('from_loc', '').strip(),
+        'sem_poloj': args.get('sem_poloj', '').strip(),
+        'rep_status_from': args.get('rep_status_from', '').strip(),
+        'rep_status_to': args.get('rep_status_to', '').strip(),
+        'rezerv': args.get('rezerv', '').strip(),
+        'doc_lichn': args.get('doc_lichn', '').strip(),
+        'n_doc_lichn': args.get('n_doc_lichn', '').strip(),
+        'tel': args.get('tel', '').strip(),
+        'mail': args.get('mail', '').strip(),
+        'adres': args.get('adres', '').strip(),
+        'rojd_loc': args.get('rojd_loc', '').strip(),
+        'children_count': args.get('children_count', '').strip(),
+        'dop_info': args.get('dop_info', '').strip(),
+        'status': args.get('status', '').strip(),  # active / expired / expiring / not_set
+        'status_days': args.get('status_days', '').strip(),  # Для expiring: истекает в ближайшие N дней
+    }
+
+    # Параметры поиска по жилищному отделу (только для HOUSING_DEPARTMENT и ADMIN)
+    housing_params = {}
+    if user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN':
+        housing_params = {
+            'category': args.get('housing_category', '').strip(),
+            'received_housing': args.get('housing_received_housing', '').strip(),
+            'housing_status': args.get('housing_status', '').strip(),  # Статус жилья (было housing_type)
+            'address_city': args.get('housing_address_city', '').strip(),
+            'address_street': args.get('housing_address_street', '').strip(),
+            'address_house': args.get('housing_address_house', '').strip(),
+            'address_apartment': args.get('housing_address_apartment', '').strip(),
+            'has_warrant': args.get('housing_has_warrant', '').strip(),
+            'repair_amount': args.get('housing_repair_amount', '').strip(),
+            'protocol_number': args.get('housing_protocol_number', '').strip(),
+            'notes': args.get('housing_notes', '').strip(),
+            'created_at_from': args.get('housing_created_at_from', '').strip(),
+            'created_at_to': args.get('housing_created_at_to', '').strip(),
+        }
+
+    # Проверяем, есть ли параметры расширенного поиска
+    has_advanced_params = any(value for value in advanced_params.values()) or any(value for value in housing_params.values())
+
+    if has_advanced_params:
+        # Расширенный поиск
+        conditions = []
+
+        # Личные данные (без учета регистра)
+        if advanced_params['f']:
+            conditions.append(Repatriant.f.op('~*')(rf'\y{advanced_params["f"]}\y'))
+        if advanced_params['i']:
+            conditions.append(Repatriant.i.op('~*')(rf'\y{advanced_params["i"]}\y'))
+        if advanced_params['o']:
+            conditions.append(Repatriant.o.op('~*')(rf'\y{advanced_params["o"]}\y'))
+        if advanced_params['f_hist']:
+            conditions.append(Repatriant.f_hist.op('~*')(rf'\y{advanced_params["f_hist"]}\y'))
+
+        # Точные совпадения
+        if advanced_params['sex']:
+            conditions.append(Repatriant.sex == advanced_params['sex'])
+        if advanced_params['kod']:
+            kod_value = advanced_params['kod'].strip()
+            # Точное совпадение кода (без учета регистра, но без подстановочных символов)
+            conditions.append(db.func.upper(db.cast(Repatriant.kod, db.String)) == db.func.upper(kod_value))
+
+        # Даты (интервалы)
+        if advanced_params['date_r_from']:
+            try:
+                date_r_from = datetime.strptime(advanced_params['date_r_from'], '%Y-%m-%d').date()
+                conditions.append(Repatriant.date_r >= date_r_from)
+            except ValueError:
+                pass
+
+        if advanced_params['date_r_to']:
+            try:
+                date_r_to = datetime.strptime(advanced_params['date_r_to'], '%Y-%m-%d').date()
+                conditions.append(Repatriant.date_r <= date_r_to)
+            except ValueError:
+                pass
+
+        if advanced_params['rep_status_from']:
+            try:
+                rep_status_from = datetime.strptime(advanced_params['rep_status_from'], '%Y-%m-%d').date()
+                conditions.append(Repatriant.rep_status >= rep_status_from)
+            except ValueError:
+                pass
+
+        if advanced_params['rep_status_to']:
+            try:
+                rep_status_to = datetime.strptime(advanced_params['rep_status_to'], '%Y-%m-%d').date()
+                conditions.append(Repatriant.rep_status <= rep_status_to)
+            except ValueError:
+                pass
+
+        # Состояние статуса - по индексированной дате истечения REP_STATUS_EXPIRES
+        if advanced_params['status']:
+            today = datetime.now().date()
+            if advanced_params['status'] == 'active':
+                conditions.append(Repatriant.rep_status_expires >= today)
+            elif advanced_params['status'] == 'expired':
+                conditions.append(Repatriant.rep_status_expires < today)
+            elif advanced_params['status'] == 'expiring':
+                # От 1 дня до 10 лет: большее значение не помещается в дату
+                try:
+                    status_days = min(max(int(advanced_params['status_days'] or 60), 1), 3650)
+                except (ValueError, OverflowError):
+                    status_days = 60
+                conditions.append(Repatriant.rep_status_expires.between(today, today + timedelta(days=status_days)))
+            elif advanced_params['status'] == 'not_set':
+                conditions.append(Repatriant.rep_status.is_(None))
+
+        # Текстовые поля (без учета регистра)
+        if advanced_params['strana_proj']:
+            conditions.append(Repatriant.strana_proj.op('~*')(rf'\y{advanced_params["strana_proj"]}\y'))
+        if advanced_params['from_loc']:
+            conditions.append(Repatriant.from_loc.op('~*')(rf'\y{advanced_params["from_loc"]}\y'))
+        if advanced_params['sem_poloj']:
+            conditions.append(Repatriant.sem_poloj == advanced_params['sem_poloj'])
+        if advanced_params['rezerv']:
+            conditions.append(Repatriant.rezerv.op('~*')(rf'\y{advanced_params["rezerv"]}\y'))
+        if advanced_params['doc_lichn']:
+            conditions.append(Repatriant.doc_lichn.op('~*')(rf'\y{advanced_params["doc_lichn"]}\y'))
+        if advanced_params['n_doc_lichn']:
+            conditions.append(Repatriant.n_doc_lichn.op('~*')(rf'\y{advanced_params["n_doc_lichn"]}\y'))
+        if advanced_params['tel']:
+            conditions.append(Repatriant.tel.op('~*')(rf'\y{advanced_params["tel"]}\y'))
+        if advanced_params['mail']:
+            conditions.append(Repatriant.mail.op('~*')(rf'\y{advanced_params["mail"]}\y'))
+        if advanced_params['adres']:
+            conditions.append(Repatriant.adres.op('~*')(rf'\y{advanced_params["adres"]}\y'))
+        if advanced_params['rojd_loc']:
+            conditions.append(Repatriant.rojd_loc.op('~*')(rf'\y{advanced_params["rojd_loc"]}\y'))
+        if advanced_params['dop_info']:
+            conditions.append(Repatriant.dop_info.op('~*')(rf'\y{advanced_params["dop_info"]}\y'))
+
+        # Создаем базовый запрос
+        base_query = Repatriant.query
+
+        # Фильтр по количеству детей (до 18 лет)
+        if advanced_params['children_count']:
+            try:
+                target_count = int(advanced_params['children_count'])
+                current_year = datetime.now().year
+
+                # Подзапрос для подсчета детей до 18 лет: диапазон по BIRTH_YEAR (год из GOD_R,
+                # заполняется при записи) выполняется по индексу (BIRTH_YEAR, LIST_ID)
+                children_subquery = db.session.query(
+                    Child.list_id,
+                    db.func.count(Child.id_child).label('children_count')
+                ).filter(
+                    Child.birth_year.between(current_year - 17, current_year)  # От 0 до 17 лет включительно
+                ).group_by(Child.list_id).having(
+                    db.func.count(Child.id_child) == target_count
+                ).subquery()
+
+                # Используем join для фильтрации по количеству детей
+                base_query = base_query.join(
+                    children_subquery,
+                    Repatriant.id == children_subquery.c.list_id
+                )
+            except (ValueError, TypeError) as e:
+                # Если не удалось преобразовать в число, игнорируем этот фильтр
+                print(f"Ошибка при фильтрации по количеству детей: {e}")
+                pass
+
+        # Фильтрация по записям жилищного отдела (только для HOUSING_DEPARTMENT и ADMIN)
+        if (user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN') and any(value for value in housing_params.values()):
+            housing_conditions = [HousingDepartmentRecord.is_deleted == False]
+
+            # Текстовые поля (без учета регистра)
+            if housing_params['category']:
+                housing_conditions.append(HousingDepartmentRecord.category.op('~*')(rf'\y{housing_params["category"]}\y'))
+            if housing_params['protocol_number']:
+                housing_conditions.append(HousingDepartmentRecord.protocol_number.op('~*')(rf'\y{housing_params["protocol_number"]}\y'))
+            if housing_params['notes']:
+                housing_conditions.append(HousingDepartmentRecord.notes.op('~*')(rf'\y{housing_params["notes"]}\y'))
+
+            # Булевы поля
+            if housing_params['received_housing']:
+                housing_conditions.append(HousingDepartmentRecord.received_housing == (housing_params['received_housing'] == 'true'))
+            if housing_params['has_warrant']:
+                housing_conditions.append(HousingDepartmentRecord.has_warrant == (housing_params['has_warrant'] == 'true'))
+
+            # Статус жилья (используем housing_acquisition, где хранятся значения: ведомственное, выкуплено, передано)
+            if housing_params['housing_status']:
+                housing_conditions.append(HousingDepartmentRecord.housing_acquisition == housing_params['housing_status'])
+
+            # Поиск по адресу: части хранятся в отдельных индексированных столбцах
+            # (ADDRESS_CITY/STREET/HOUSE/APARTMENT) и приводятся к одному виду при записи,
+            # поэтому введенные значения нормализуются так же. Город и улица - по части
+            # названия ("АФОН" находит "НОВЫЙ АФОН"), дом и квартира - по точному совпадению
+            address_city = normalize_address_part(housing_params['address_city'], 'city')
+            if address_city:
+                # Часть названия (триграммный индекс на PostgreSQL)
+                housing_conditions.append(HousingDepartmentRecord.address_city.contains(address_city, autoescape=True))
+            address_street = normalize_address_part(housing_params['address_street'], 'street')
+            if address_street:
+                housing_conditions.append(HousingDepartmentRecord.address_street.contains(address_street, autoescape=True))
+            address_house = normalize_address_part(housing_params['address_house'], 'house')
+            if address_house:
+                housing_conditions.append(HousingDepartmentRecord.address_house == address_house)
+            address_apartment = normalize_address_part(housing_params['address_apartment'], 'apartment')
+            if address_apartment:
+                housing_conditions.append(HousingDepartmentRecord.address_apartment == address_apartment)
+
+            # Числовое поле
+            if housing_params['repair_amount']:
+                try:
+                    repair_amount = float(housing_params['repair_amount'])
+                    housing_conditions.append(HousingDepartmentRecord.repair_amount == repair_amount)
+                except (ValueError, TypeError):
+                    pass
+
+            # Даты
+            if housing_params['created_at_from']:
+                try:
+                    created_at_from = datetime.strptime(housing_params['created_at_from'], '%Y-%m-%d')
+                    housing_conditions.append(db.cast(HousingDepartmentRecord.created_at, db.Date) >= created_at_from.date())
+                except ValueError:
+                    pass
+
+            if housing_params['created_at_to']:
+                try:
+                    created_at_to = datetime.strptime(housing_params['created_at_to'], '%Y-%m-%d')
+                    housing_conditions.append(db.cast(HousingDepartmentRecord.created_at, db.Date) <= created_at_to.date())
+                except ValueError:
+                    pass
+
+            # Создаем подзапрос для получения ID репатриантов с подходящими записями
+            housing_subquery = db.session.query(
+                HousingDepartmentRecord.repatriant_id
+            ).filter(
+                db.and_(*housing_conditions)
+            ).distinct().subquery()
+
+            # Используем join для фильтрации по записям жилищного отдела
+            base_query = base_query.join(
+                housing_subquery,
+                Repatriant.id == housing_subquery.c.repatriant_id
+            )
+
+        # Применяем остальные условия
+        if conditions:
+            base_query = base_query.filter(db.and_(*conditions))
+
+        search_query = base_query
+
+    elif query:
+        # Обычный поиск по ФИО и исторической фамилии (без учета регистра)
+        search_words = query.strip().split()
+
+        if len(search_words) == 1:
+            # Поиск по одному слову
+            word = search_words[0]
+            word_pattern = rf'\y{word}\y'
+            search_query = Repatriant.query.filter(
+                db.or_(
+                    Repatriant.f.op('~*')(word_pattern),
+                    Repatriant.i.op('~*')(word_pattern),
+                    Repatriant.o.op('~*')(word_pattern),
+                    Repatriant.f_hist.op('~*')(word_pattern)  # Добавлена историческая фамилия
+                )
+            )
+        else:
+            # Поиск по нескольким словам - ищем записи, где все слова найдены в ФИО или исторической фамилии
+            conditions = []
+            for word in search_words:
+                word_pattern = rf'\y{word}\y'
+                word_condition = db.or_(
+                    Repatriant.f.op('~*')(word_pattern),
+                    Repatriant.i.op('~*')(word_pattern),
+                    Repatriant.o.op('~*')(word_pattern),
+                    Repatriant.f_hist.op('~*')(word_pattern)  # Добавлена историческая фамилия
+                )
+                conditions.append(word_condition)
+
+            # Все условия должны выполняться одновременно (AND)
+            search_query = Repatriant.query.filter(
+                db.and_(*conditions)
+            )
+    else:
+        # Показать всех репатриантов
+        search_query = Repatriant.query
+
+    return search_query, query, advanced_params, housing_params, has_advanced_params
+
+
+def search_cache_params(query, advanced_params, housing_params):
+    """Все параметры поиска одним словарем (для ключей кэша результатов и счетчиков)"""
+    cache_params = {'q': query, **advanced_params}
+    cache_params.update({f'housing_{name}': value for name, value in housing_params.items()})
+    return cache_params
+
+
+def search_order_by(user_role):
+    """Возвращает порядок сортировки: для SOCIAL_ADAPTATION сначала репатрианты со статусом"""
+    if user_role == 'SOCIAL_ADAPTATION':
+        # Сначала репатрианты со статусом (rep_status IS NOT NULL), потом остальные
+        # Затем сортировка по id в порядке убывания
+        return [
+            db.case(
+                (Repatriant.rep_status.isnot(None), 0),
+                else_=1
+            ),
+            Repatriant.id.desc()
+        ]
+    else:
+        # Обычная сортировка по id в порядке убывания
+        return [Repatriant.id.desc()]
 
 
 def register_main_routes(app):
@@ -114,25 +461,23 @@ def register_main_routes(app):
 
                 # Проверяем, есть ли предварительно загруженный PDF
                 uploaded_pdf_path = request.form.get('uploaded_pdf_path')
-                if uploaded_pdf_path:
+                if uploaded_pdf_path and uploaded_pdf_path.startswith('documents/'):
+                    # Большой скан загружен поблочно через /api/uploads и уже лежит в хранилище
+                    documents_path = claim_uploaded_file(uploaded_pdf_path, session.get('user_id'))
+                elif uploaded_pdf_path:
                     # Перемещаем файл из временной папки на диски D/E
                     temp_full_path = os.path.join(app.config['UPLOAD_FOLDER'], uploaded_pdf_path)
                     if os.path.exists(temp_full_path):
                         # Создаем постоянное имя файла
                         permanent_filename = f"doc_{next_id}_{uuid.uuid4().hex[:8]}.pdf"
 
-                        # Выбираем лучший диск для сохранения
-                        best_disk_path = get_best_disk()
-                        permanent_path = os.path.join(best_disk_path, permanent_filename)
-
-                        # Создаем папку если не существует
-                        os.makedirs(best_disk_path, exist_ok=True)
-
-                        # Перемещаем файл на диск (используем shutil.move для междискового перемещения)
-                        shutil.move(temp_full_path, permanent_path)
+                        # Переносим файл в хранилище (наименее заполненный диск или объектное хранилище)
+                        with open(temp_full_path, 'rb') as temp_file:
+                            get_storage_backend().save(temp_file, permanent_filename)
+                        os.remove(temp_full_path)
                         documents_path = f"documents/{permanent_filename}"
 
-                        print(f"PDF перемещен с {temp_full_path} на {permanent_path}")
+                        print(f"PDF перемещен из {temp_full_path} в хранилище: {documents_path}")
                 else:
                     # Загружаем PDF документы (если новый файл загружен)
                     if 'documents' in request.files:
@@ -277,376 +622,30 @@ def register_main_routes(app):
     # Страница поиска репатриантов
     @app.route('/search')
     @login_required
+    @read_replica
     def search():
-        query = request.args.get('q', '')
         page = request.args.get('page', 1, type=int)
 
-        # Получаем роль пользователя для определения порядка сортировки
+        # Роль пользователя определяет порядок сортировки и доступ к фильтрам жилищного отдела
         user_role = session.get('role', '')
-        is_social_adaptation = (user_role == 'SOCIAL_ADAPTATION')
-
-        # Получаем параметры расширенного поиска
-        advanced_params = {
-            'f': request.args.get('f', '').strip(),
-            'i': request.args.get('i', '').strip(),
-            'o': request.args.get('o', '').strip(),
-            'f_hist': request.args.get('f_hist', '').strip(),
-            'sex': request.args.get('sex', '').strip(),
-            'date_r_from': request.args.get('date_r_from', '').strip(),
-            'date_r_to': request.args.get('date_r_to', '').strip(),
-            'kod': request.args.get('kod', '').strip(),
-            'strana_proj': request.args.get('strana_proj', '').strip(),
-            'from_loc': request.args.get('from_loc', '').strip(),
-            'sem_poloj': request.args.get('sem_poloj', '').strip(),
-            'rep_status_from': request.args.get('rep_status_from', '').strip(),
-            'rep_status_to': request.args.get('rep_status_to', '').strip(),
-            'rezerv': request.args.get('rezerv', '').strip(),
-            'doc_lichn': request.args.get('doc_lichn', '').strip(),
-            'n_doc_lichn': request.args.get('n_doc_lichn', '').strip(),
-            'tel': request.args.get('tel', '').strip(),
-            'mail': request.args.get('mail', '').strip(),
-            'adres': request.args.get('adres', '').strip(),
-            'rojd_loc': request.args.get('rojd_loc', '').strip(),
-            'children_count': request.args.get('children_count', '').strip(),
-            'dop_info': request.args.get('dop_info', '').strip(),
-        }
-
-        # Параметры поиска по жилищному отделу (только для HOUSING_DEPARTMENT и ADMIN)
-        housing_params = {}
-        if user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN':
-            housing_params = {
-                'category': request.args.get('housing_category', '').strip(),
-                'received_housing': request.args.get('housing_received_housing', '').strip(),
-                'housing_status': request.args.get('housing_status', '').strip(),  # Статус жилья (было housing_type)
-                'address_city': request.args.get('housing_address_city', '').strip(),
-                'address_street': request.args.get('housing_address_street', '').strip(),
-                'address_house': request.args.get('housing_address_house', '').strip(),
-                'address_apartment': request.args.get('housing_address_apartment', '').strip(),
-                'has_warrant': request.args.get('housing_has_warrant', '').strip(),
-                'repair_amount': request.args.get('housing_repair_amount', '').strip(),
-                'protocol_number': request.args.get('housing_protocol_number', '').strip(),
-                'notes': request.args.get('housing_notes', '').strip(),
-                'created_at_from': request.args.get('housing_created_at_from', '').strip(),
-                'created_at_to': request.args.get('housing_created_at_to', '').strip(),
-            }
-
-        # Проверяем, есть ли параметры расширенного поиска
-        has_advanced_params = any(value for value in advanced_params.values()) or any(value for value in housing_params.values())
-
-        # Функция для получения порядка сортировки в зависимости от роли
-        def get_order_by():
-            """Возвращает порядок сортировки: для SOCIAL_ADAPTATION сначала репатрианты со статусом"""
-            if is_social_adaptation:
-                # Сначала репатрианты со статусом (rep_status IS NOT NULL), потом остальные
-                # Затем сортировка по id в порядке убывания
-                return [
-                    db.case(
-                        [(Repatriant.rep_status.isnot(None), 0)],
-                        else_=1
-                    ),
-                    Repatriant.id.desc()
-                ]
-            else:
-                # Обычная сортировка по id в порядке убывания
-                return [Repatriant.id.desc()]
-
-        if has_advanced_params:
-            # Расширенный поиск
-            conditions = []
-
-            # Личные данные (без учета регистра)
-            if advanced_params['f']:
-                conditions.append(Repatriant.f.op('~*')(rf'\y{advanced_params["f"]}\y'))
-            if advanced_params['i']:
-                conditions.append(Repatriant.i.op('~*')(rf'\y{advanced_params["i"]}\y'))
-            if advanced_params['o']:
-                conditions.append(Repatriant.o.op('~*')(rf'\y{advanced_params["o"]}\y'))
-            if advanced_params['f_hist']:
-                conditions.append(Repatriant.f_hist.op('~*')(rf'\y{advanced_params["f_hist"]}\y'))
-
-            # Точные совпадения
-            if advanced_params['sex']:
-                conditions.append(Repatriant.sex == advanced_params['sex'])
-            if advanced_params['kod']:
-                kod_value = advanced_params['kod'].strip()
-                # Точное совпадение кода (без учета регистра, но без подстановочных символов)
-                conditions.append(db.func.upper(db.cast(Repatriant.kod, db.String)) == db.func.upper(kod_value))
-
-            # Даты (интервалы)
-            if advanced_params['date_r_from']:
-                try:
-                    date_r_from = datetime.strptime(advanced_params['date_r_from'], '%Y-%m-%d').date()
-                    conditions.append(Repatriant.date_r >= date_r_from)
-                except ValueError:
-                    pass
+        search_query, query, advanced_params, housing_params, has_advanced_params = build_search_query(
+            request.args, user_role)
 
-            if advanced_params['date_r_to']:
-                try:
-                    date_r_to = datetime.strptime(advanced_params['date_r_to'], '%Y-%m-%d').date()
-                    conditions.append(Repatriant.date_r <= date_r_to)
-                except ValueError:
-                    pass
-
-            if advanced_params['rep_status_from']:
-                try:
-                    rep_status_from = datetime.strptime(advanced_params['rep_status_from'], '%Y-%m-%d').date()
-                    conditions.append(Repatriant.rep_status >= rep_status_from)
-                except ValueError:
-                    pass
+        # Выполняем поиск (ID найденных записей берутся из кэша, если такой запрос уже выполнялся)
+        cache_params = search_cache_params(query, advanced_params, housing_params)
+        repatriants = cached_paginate(search_cache_key(user_role, page, cache_params),
+                                      search_query, search_order_by(user_role), page, per_page=20)
 
-            if advanced_params['rep_status_to']:
-                try:
-                    rep_status_to = datetime.strptime(advanced_params['rep_status_to'], '%Y-%m-%d').date()
-                    conditions.append(Repatriant.rep_status <= rep_status_to)
-                except ValueError:
-                    pass
-
-            # Текстовые поля (без учета регистра)
-            if advanced_params['strana_proj']:
-                conditions.append(Repatriant.strana_proj.op('~*')(rf'\y{advanced_params["strana_proj"]}\y'))
-            if advanced_params['from_loc']:
-                conditions.append(Repatriant.from_loc.op('~*')(rf'\y{advanced_params["from_loc"]}\y'))
-            if advanced_params['sem_poloj']:
-                conditions.append(Repatriant.sem_poloj == advanced_params['sem_poloj'])
-            if advanced_params['rezerv']:
-                conditions.append(Repatriant.rezerv.op('~*')(rf'\y{advanced_params["rezerv"]}\y'))
-            if advanced_params['doc_lichn']:
-                conditions.append(Repatriant.doc_lichn.op('~*')(rf'\y{advanced_params["doc_lichn"]}\y'))
-            if advanced_params['n_doc_lichn']:
-                conditions.append(Repatriant.n_doc_lichn.op('~*')(rf'\y{advanced_params["n_doc_lichn"]}\y'))
-            if advanced_params['tel']:
-                conditions.append(Repatriant.tel.op('~*')(rf'\y{advanced_params["tel"]}\y'))
-            if advanced_params['mail']:
-                conditions.append(Repatriant.mail.op('~*')(rf'\y{advanced_params["mail"]}\y'))
-            if advanced_params['adres']:
-                conditions.append(Repatriant.adres.op('~*')(rf'\y{advanced_params["adres"]}\y'))
-            if advanced_params['rojd_loc']:
-                conditions.append(Repatriant.rojd_loc.op('~*')(rf'\y{advanced_params["rojd_loc"]}\y'))
-            if advanced_params['dop_info']:
-                conditions.append(Repatriant.dop_info.op('~*')(rf'\y{advanced_params["dop_info"]}\y'))
-
-            # Создаем базовый запрос
-            base_query = Repatriant.query
-
-            # Фильтр по количеству детей (до 18 лет)
-            if advanced_params['children_count']:
-                try:
-                    target_count = int(advanced_params['children_count'])
-                    current_year = datetime.now().year
-
-                    # Подзапрос для подсчета детей до 18 лет
-                    # Учитываем, что god_r может содержать дату в формате "04.05.2001Г." или просто год
-                    # Используем регулярное выражение PostgreSQL для извлечения 4-значного года из строки
-
-                    # Извлекаем год из строки: используем regexp_replace для удаления всех нецифровых символов,
-                    # затем берем последние 4 символа (год), или первые 4, если строка короткая
-                    # Более безопасный подход: используем CASE WHEN для обработки ошибок преобразования
-                    god_r_text = db.cast(Child.god_r, db.String)
-                    # Удаляем все нецифровые символы, оставляем только цифры
-                    digits_only = db.func.regexp_replace(god_r_text, r'[^0-9]', '', 'g')
-                    # Берем последние 4 цифры (год) или все, если меньше 4
-                    year_str = db.func.right(digits_only, 4)
-                    # Преобразуем в число, используя CASE WHEN для безопасного преобразования
-                    year_extract = db.case(
-                        [
-                            (db.func.length(year_str) == 4, db.cast(year_str, db.Integer))
-                        ],
-                        else_=None
-                    )
-
-                    children_subquery = db.session.query(
-                        Child.list_id,
-                        db.func.count(Child.id_child).label('children_count')
-                    ).filter(
-                        # Проверяем, что год рождения указан и ребенок младше 18 лет
-                        db.and_(
-                            Child.god_r.isnot(None),
-                            Child.god_r != '',
-                            # Извлекаем год и проверяем, что он валидный
-                            year_extract.isnot(None),
-                            year_extract >= (current_year - 17),  # От 0 до 17 лет включительно
-                            year_extract <= current_year,
-                            # Дополнительная проверка: год должен быть разумным (не раньше 1900)
-                            year_extract >= 1900
-                        )
-                    ).group_by(Child.list_id).having(
-                        db.func.count(Child.id_child) == target_count
-                    ).subquery()
-
-                    # Используем join для фильтрации по количеству детей
-                    base_query = base_query.join(
-                        children_subquery,
-                        Repatriant.id == children_subquery.c.list_id
-                    )
-                except (ValueError, TypeError) as e:
-                    # Если не удалось преобразовать в число, игнорируем этот фильтр
-                    print(f"Ошибка при фильтрации по количеству детей: {e}")
-                    pass
-
-            # Фильтрация по записям жилищного отдела (только для HOUSING_DEPARTMENT и ADMIN)
-            if (user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN') and any(value for value in housing_params.values()):
-                housing_conditions = [HousingDepartmentRecord.is_deleted == False]
-
-                # Текстовые поля (без учета регистра)
-                if housing_params['category']:
-                    housing_conditions.append(HousingDepartmentRecord.category.op('~*')(rf'\y{housing_params["category"]}\y'))
-                if housing_params['protocol_number']:
-                    housing_conditions.append(HousingDepartmentRecord.protocol_number.op('~*')(rf'\y{housing_params["protocol_number"]}\y'))
-                if housing_params['notes']:
-                    housing_conditions.append(HousingDepartmentRecord.notes.op('~*')(rf'\y{housing_params["notes"]}\y'))
-
-                # Булевы поля
-                if housing_params['received_housing']:
-                    housing_conditions.append(HousingDepartmentRecord.received_housing == (housing_params['received_housing'] == 'true'))
-                if housing_params['has_warrant']:
-                    housing_conditions.append(HousingDepartmentRecord.has_warrant == (housing_params['has_warrant'] == 'true'))
-
-                # Статус жилья (используем housing_acquisition, где хранятся значения: ведомственное, выкуплено, передано)
-                if housing_params['housing_status']:
-                    housing_conditions.append(HousingDepartmentRecord.housing_acquisition == housing_params['housing_status'])
-
-                # Поиск по адресу (разбит на части: город, улица, дом, квартира)
-                # Адрес в базе хранится как "Город, Улица, Дом, Квартира"
-                address_parts = []
-                if housing_params['address_city']:
-                    address_parts.append((0, housing_params['address_city']))  # Первая часть - город
-                if housing_params['address_street']:
-                    address_parts.append((1, housing_params['address_street']))  # Вторая часть - улица
-                if housing_params['address_house']:
-                    address_parts.append((2, housing_params['address_house']))  # Третья часть - дом
-                if housing_params['address_apartment']:
-                    address_parts.append((3, housing_params['address_apartment']))  # Четвертая часть - квартира
-
-                if address_parts:
-                    # Для каждого указанного компонента адреса проверяем соответствующую часть
-                    for part_index, part_value in address_parts:
-                        # Используем split_part для извлечения нужной части адреса (индекс начинается с 1)
-                        # Ищем без учета регистра
-                        housing_conditions.append(
-                            db.func.split_part(HousingDepartmentRecord.address, ', ', part_index + 1).op('~*')(rf'\y{part_value}\y')
-                        )
-
-                # Числовое поле
-                if housing_params['repair_amount']:
-                    try:
-                        repair_amount = float(housing_params['repair_amount'])
-                        housing_conditions.append(HousingDepartmentRecord.repair_amount == repair_amount)
-                    except (ValueError, TypeError):
-                        pass
-
-                # Даты
-                if housing_params['created_at_from']:
-                    try:
-                        created_at_from = datetime.strptime(housing_params['created_at_from'], '%Y-%m-%d')
-                        housing_conditions.append(db.cast(HousingDepartmentRecord.created_at, db.Date) >= created_at_from.date())
-                    except ValueError:
-                        pass
-
-                if housing_params['created_at_to']:
-                    try:
-                        created_at_to = datetime.strptime(housing_params['created_at_to'], '%Y-%m-%d')
-                        housing_conditions.append(db.cast(HousingDepartmentRecord.created_at, db.Date) <= created_at_to.date())
-                    except ValueError:
-                        pass
-
-                # Создаем подзапрос для получения ID репатриантов с подходящими записями
-                housing_subquery = db.session.query(
-                    HousingDepartmentRecord.repatriant_id
-                ).filter(
-                    db.and_(*housing_conditions)
-                ).distinct().subquery()
-
-                # Используем join для фильтрации по записям жилищного отдела
-                base_query = base_query.join(
-                    housing_subquery,
-                    Repatriant.id == housing_subquery.c.repatriant_id
-                )
-
-            # Применяем остальные условия
-            if conditions:
-                base_query = base_query.filter(db.and_(*conditions))
-
-            # Выполняем поиск
-            repatriants = base_query.order_by(*get_order_by()).paginate(page=page, per_page=20, error_out=False)
-
-        elif query:
-            # Обычный поиск по ФИО и исторической фамилии (без учета регистра)
-            search_words = query.strip().split()
-
-            if len(search_words) == 1:
-                # Поиск по одному слову
-                word = search_words[0]
-                word_pattern = rf'\y{word}\y'
-                repatriants = Repatriant.query.filter(
-                    db.or_(
-                        Repatriant.f.op('~*')(word_pattern),
-                        Repatriant.i.op('~*')(word_pattern),
-                        Repatriant.o.op('~*')(word_pattern),
-                        Repatriant.f_hist.op('~*')(word_pattern)  # Добавлена историческая фамилия
-                    )
-                ).order_by(*get_order_by()).paginate(page=page, per_page=20, error_out=False)
-            else:
-                # Поиск по нескольким словам - ищем записи, где все слова найдены в ФИО или исторической фамилии
-                conditions = []
-                for word in search_words:
-                    word_pattern = rf'\y{word}\y'
-                    word_condition = db.or_(
-                        Repatriant.f.op('~*')(word_pattern),
-                        Repatriant.i.op('~*')(word_pattern),
-                        Repatriant.o.op('~*')(word_pattern),
-                        Repatriant.f_hist.op('~*')(word_pattern)  # Добавлена историческая фамилия
-                    )
-                    conditions.append(word_condition)
-
-                # Все условия должны выполняться одновременно (AND)
-                repatriants = Repatriant.query.filter(
-                    db.and_(*conditions)
-                ).order_by(*get_order_by()).paginate(page=page, per_page=20, error_out=False)
-        else:
-            # Показать всех репатриантов
-            repatriants = Repatriant.query.order_by(*get_order_by()).paginate(page=page, per_page=20, error_out=False)
-
-        # Для жилищного отдела проверяем наличие записей для каждого репатрианта
-        housing_records_map = {}
-        if user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN':
-            if query or has_advanced_params:
-                # Получаем ID всех найденных репатриантов
-                repatriant_ids = [r.id for r in repatriants.items]
-                if repatriant_ids:
-                    # Проверяем наличие записей жилищного отдела
-                    housing_records = HousingDepartmentRecord.query.filter(
-                        HousingDepartmentRecord.repatriant_id.in_(repatriant_ids),
-                        HousingDepartmentRecord.is_deleted == False
-                    ).all()
-                    # Создаем словарь: repatriant_id -> True/False
-                    for record in housing_records:
-                        housing_records_map[record.repatriant_id] = True
-
-        # Для жилищного отдела проверяем наличие записей для каждого репатрианта
+        # Дополнения для роли считаются один раз для ID на текущей странице:
+        # жилищному отделу - есть ли у репатрианта запись отдела (один запрос только по ID)
         housing_records_map = {}
         if user_role == 'HOUSING_DEPARTMENT' or user_role == 'ADMIN':
-            if query or has_advanced_params:
-                # Получаем ID всех найденных репатриантов
-                repatriant_ids = [r.id for r in repatriants.items]
-                if repatriant_ids:
-                    # Проверяем наличие записей жилищного отдела
-                    housing_records = HousingDepartmentRecord.query.filter(
-                        HousingDepartmentRecord.repatriant_id.in_(repatriant_ids),
-                        HousingDepartmentRecord.is_deleted == False
-                    ).all()
-                    # Создаем словарь: repatriant_id -> True/False
-                    for record in housing_records:
-                        housing_records_map[record.repatriant_id] = True
-            else:
-                # Если нет поиска, проверяем для всех репатриантов на странице
-                repatriant_ids = [r.id for r in repatriants.items]
-                if repatriant_ids:
-                    housing_records = HousingDepartmentRecord.query.filter(
-                        HousingDepartmentRecord.repatriant_id.in_(repatriant_ids),
-                        HousingDepartmentRecord.is_deleted == False
-                    ).all()
-                    for record in housing_records:
-                        housing_records_map[record.repatriant_id] = True
+            housing_records_map = housing_record_flags([r.id for r in repatriants.items])
+
+        # Количество найденных по вариантам полей панели расширенного поиска (один запрос, кэшируется)
+        facets = cached_search_facets(cache_params, search_query)
+        # Статусы всех репатриантов страницы одним вызовом (по готовой дате истечения)
+        statuses = check_repatriant_statuses(repatriants.items)
 
         return render_template('search.html', 
                              repatriants=repatriants, 
@@ -654,7 +653,96 @@ def register_main_routes(app):
                              advanced_params=advanced_params,
                              housing_params=housing_params,
                              user_role=user_role,
-                             housing_records_map=housing_records_map)
+                             housing_records_map=housing_records_map,
+                             facets=facets,
+                             statuses=statuses)
+
+    @app.route('/api/search-facets')
+    @login_required
+    @read_replica
+    def api_search_facets():
+        """Количество найденных по вариантам полей панели поиска для текущих параметров (без результатов)"""
+        user_role = session.get('role', '')
+        search_query, query, advanced_params, housing_params, _ = build_search_query(request.args, user_role)
+        cache_params = search_cache_params(query, advanced_params, housing_params)
+        facets = cached_search_facets(cache_params, search_query)
+        return jsonify({name: [{'value': value, 'count': count} for value, count in values]
+                        for name, values in facets.items()})
+
+    @app.route('/api/search')
+    @login_required
+    @read_replica
+    def api_search():
+        """Поиск репатриантов в JSON для внешних систем: те же параметры, что у /search.
+
+        Страница по курсору: ?limit=N&cursor=<next_cursor предыдущей страницы> (порядок - по убыванию ID).
+        ?format=ndjson - все найденные строки потоком, по строке JSON на репатрианта.
+        """
+        user_role = session.get('role', '')
+        search_query = build_search_query(request.args, user_role)[0]
+
+        cursor = request.args.get('cursor', '').strip()
+        if cursor:
+            try:
+                search_query = search_query.filter(Repatriant.id < int(cursor))
+            except ValueError:
+                return jsonify({'error': 'Неверный cursor'}), 400
+
+        if request.args.get('format') == 'ndjson':
+            return stream_search_ndjson(search_query)
+
+        limit = min(max(request.args.get('limit', 100, type=int), 1), app.config['SEARCH_API_MAX_LIMIT'])
+        # Лишняя строка показывает, есть ли следующая страница (без подсчета общего числа)
+        rows = repatriant_rows(search_query.order_by(Repatriant.id.desc()).limit(limit + 1))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        statuses = check_repatriant_statuses(rows)
+        return jsonify({
+            'items': [{**row.to_dict(), 'status': statuses[row.id]['status']} for row in rows],
+            'next_cursor': str(rows[-1].id) if has_more else None,
+        })
+
+    def stream_search_ndjson(search_query):
+        """Ответ NDJSON: строки читаются курсором на сервере БД порциями по SEARCH_API_STREAM_CHUNK"""
+        slots = report_slots(app)
+        if not slots.acquire(timeout=app.config['REPORT_QUEUE_TIMEOUT_SECONDS']):
+            return jsonify({'error': 'Сервер занят формированием других выгрузок, повторите позже'}), 503
+
+        # Генератор выполняется после выхода из маршрута (и из read_replica), поэтому соединение
+        # и его база выбираются здесь, а не через db.session
+        engine = (get_replica_engine() if g.get('use_replica') else None) or db.engine
+        statement = search_query.with_entities(*REPATRIANT_ROW_COLUMNS).order_by(Repatriant.id.desc()).statement
+        chunk = app.config['SEARCH_API_STREAM_CHUNK']
+        timeout_ms = app.config['REPORT_STATEMENT_TIMEOUT_MS']
+
+        def generate():
+            with engine.connect() as connection:
+                set_statement_timeout(connection, timeout_ms)
+                result = connection.execution_options(stream_results=True, yield_per=chunk).execute(statement)
+                for partition in result.partitions():
+                    rows = [RepatriantRow._make(row) for row in partition]
+                    statuses = check_repatriant_statuses(rows)
+                    yield ''.join(
+                        json.dumps({**row.to_dict(), 'status': statuses[row.id]['status']}, ensure_ascii=False) + '\n'
+                        for row in rows
+                    )
+
+        response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+        # Место освобождается, когда ответ закрыт: дочитан, прерван клиентом или не начат
+        response.call_on_close(slots.release)
+        return response
+
+    @app.route('/api/repatriant-statuses')
+    @login_required
+    @read_replica
+    def api_repatriant_statuses():
+        """Статусы нескольких репатриантов одним запросом: ?ids=1,2,3 -> {id: статус}"""
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()][:500]
+        except ValueError:
+            return jsonify({'error': 'ids - список чисел через запятую'}), 400
+        rows = repatriant_rows_by_id(ids).values()
+        return jsonify({str(repatriant_id): status for repatriant_id, status in check_repatriant_statuses(rows).items()})
 
     # Маршрут для предварительной загрузки PDF
     @app.route('/upload_pdf_preview', methods=['POST'])
@@ -749,16 +837,13 @@ def register_main_routes(app):
 
             print(f"Ищем файл: {file_name} в папке: {folder_name}")
 
-            # Ищем файл на всех дисках
-            for disk in app.config['STORAGE_DISKS']:
-                file_path = os.path.join(disk['path'], file_name)
-                print(f"Проверяем путь: {file_path}")
-                if os.path.exists(file_path):
-                    print(f"Файл найден на {disk['name']}: {file_path}")
-                    return send_from_directory(disk['path'], file_name)
+            # Отдаем файл из хранилища (для объектного хранилища - редирект на подписанную ссылку)
+            response = get_storage_backend().stream(file_name)
+            if response is not None:
+                return response
 
-            # Если файл не найден на дисках, возвращаем ошибку
-            print(f"Файл не найден на дисках: {file_name}")
+            # Если файл не найден в хранилище, возвращаем ошибку
+            print(f"Файл не найден в хранилище: {file_name}")
             return "Файл не найден", 404
         else:
             # Старые файлы из папки uploads
@@ -769,34 +854,43 @@ def register_main_routes(app):
     @app.route('/admin/disk-stats')
     @admin_required
     def disk_stats():
-        """Показывает статистику использования дисков"""
-        import shutil
+        """Показывает статистику использования дисков по таблице ежедневных замеров"""
+        ensure_fresh_samples(app)
+        disk_stats = get_disk_stats(app)
 
-        disk_stats = []
-        for disk in app.config['STORAGE_DISKS']:
-            try:
-                total, used, free = shutil.disk_usage(disk['path'])
-                total_gb = total // (1024**3)
-                used_gb = used // (1024**3)
-                free_gb = free // (1024**3)
-                usage_percent = (used / total) * 100
-
-                disk_stats.append({
-                    'name': disk['name'],
-                    'path': disk['path'],
-                    'total_gb': total_gb,
-                    'used_gb': used_gb,
-                    'free_gb': free_gb,
-                    'usage_percent': round(usage_percent, 1)
-                })
-            except Exception as e:
-                disk_stats.append({
-                    'name': disk['name'],
-                    'path': disk['path'],
-                    'error': str(e)
-                })
+        rebalance_status = get_job(app, StorageRebalancer).status()
+
+        return render_template('disk_stats.html', disk_stats=disk_stats, rebalance_status=rebalance_status)
+
+    @app.route('/admin/disk-stats/rebalance', methods=['GET', 'POST'])
+    @admin_required
+    def disk_rebalance():
+        """Запуск переноса файлов между дисками и просмотр его прогресса"""
+        rebalancer = get_job(app, StorageRebalancer)
 
-        return render_template('disk_stats.html', disk_stats=disk_stats)
+        if request.method == 'POST':
+            if app.config['STORAGE_BACKEND'] != 'local':
+                return jsonify({'success': False, 'error': 'Перенос доступен только для локальных дисков'}), 400
+
+            target_ratio = request.form.get('target_ratio', type=float)
+            if target_ratio is not None and not 0 < target_ratio < 1:
+                return jsonify({'success': False, 'error': 'Целевое заполнение должно быть между 0 и 1'}), 400
+
+            if not rebalancer.start(target_ratio=target_ratio):
+                return jsonify({'success': False, 'error': 'Перенос уже выполняется'}), 409
+
+            log_user_action('Запущен перенос файлов между дисками')
+
+        return jsonify({'success': True, 'status': rebalancer.status()})
+
+    @app.route('/admin/disk-stats/rebalance/stop', methods=['POST'])
+    @admin_required
+    def disk_rebalance_stop():
+        """Остановка переноса файлов между дисками"""
+        rebalancer = get_job(app, StorageRebalancer)
+        rebalancer.stop()
+        log_user_action('Остановлен перенос файлов между дисками')
+        return jsonify({'success': True, 'status': rebalancer.status()})
 
     # Просмотр детальной информации о репатрианте
     @app.route('/view/<int:id>')
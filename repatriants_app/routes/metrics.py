@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import hmac
+
+from flask import request
+
+from ..services.metrics import render_metrics
+from ..services.user_cache import get_current_user
+
+
+def register_metrics_routes(app):
+    """Регистрирует маршруты на переданном Flask-приложении."""
+
+    @app.route('/metrics')
+    def metrics():
+        """Метрики в формате Prometheus: для администратора или по токену METRICS_TOKEN"""
+        token = app.config['METRICS_TOKEN']
+        authorization = request.headers.get('Authorization', '')
+        if not (token and hmac.compare_digest(authorization, f'Bearer {token}')):
+            user = get_current_user()
+            if not user or not user.is_active or user.role != 'ADMIN':
+                return 'Доступ запрещен', 403
+
+        body, content_type = render_metrics()
+        return body, 200, {'Content-Type': content_type}
@@ -6,18 +6,22 @@ from flask import session
 from sqlalchemy import text
 
 from ..extensions import db
-from ..models import User
+from ..utils.db import use_primary
+from .user_cache import get_current_user
 
 
 def log_user_action(action, repatriant_id=None) -> None:
     """Логирует действие пользователя"""
 
-    if "user_id" in session:
-        user = User.query.get(session["user_id"])
-        username = user.username if user else "Unknown"
+    if "user_id" not in session:
+        return
 
-        action_upper = action.upper() if action else ""
+    user = get_current_user()
+    username = user.username if user else "Unknown"
+    action_upper = action.upper() if action else ""
 
+    # MAX(ID_LOG) должен читаться с основной БД, даже если маршрут читает с реплики
+    with use_primary():
         # Получаем следующий ID_LOG
         max_log_id = db.session.execute(text('SELECT MAX("ID_LOG") FROM "LOG"')).scalar()
         next_log_id = (max_log_id or 0) + 1
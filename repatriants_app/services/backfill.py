@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import bindparam, select
+
+from ..extensions import db
+from ..models import Child, HousingDepartmentRecord, Repatriant
+from ..utils.status import status_expiration_date
+from ..utils.text import parse_address, parse_birth_date
+from .invalidation import queue_invalidation
+
+
+# Заполнение вычисляемых столбцов у уже существующих строк (после flask init-db, добавившей
+# столбцы). Строки обрабатываются порциями по первичному ключу, каждая порция - отдельная
+# короткая транзакция, поэтому команду можно запускать на работающей базе и прерывать:
+# повторный запуск пересчитает только отличающиеся значения
+
+
+def _backfill(table, key_column, source_columns, compute, batch_size: int, pause: float, progress) -> int:
+    """Пересчитывает столбцы по compute(row) -> dict; возвращает число измененных строк"""
+
+    statement = None
+    last_key = None
+    checked = updated = 0
+    while True:
+        query = select(key_column, *source_columns).order_by(key_column).limit(batch_size)
+        if last_key is not None:
+            query = query.where(key_column > last_key)
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+        last_key = rows[-1][0]
+
+        changes = []
+        for row in rows:
+            values = compute(row)
+            if any(getattr(row, name) != value for name, value in values.items()):
+                changes.append({"backfill_key": row[0], **{f"new_{name}": value for name, value in values.items()}})
+        if changes:
+            if statement is None:
+                statement = table.update().where(key_column == bindparam("backfill_key")).values(
+                    {name: bindparam(f"new_{name}") for name in values}
+                )
+            db.session.execute(statement, changes)
+            # Результаты поиска по этим столбцам в кэшах воркеров устарели
+            queue_invalidation(db.session, "search")
+        db.session.commit()
+
+        checked += len(rows)
+        updated += len(changes)
+        progress(f"{table.name}: проверено {checked}, изменено {updated}")
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+def backfill_children_birth_years(batch_size: int = 5000, pause: float = 0, progress=print) -> int:
+    """BIRTH_YEAR и BIRTH_DATE детей из текстового GOD_R"""
+
+    table = Child.__table__
+
+    def compute(row):
+        year, born = parse_birth_date(row.GOD_R)
+        return {"BIRTH_YEAR": year, "BIRTH_DATE": born}
+
+    return _backfill(table, table.c.ID_CHILD, [table.c.GOD_R, table.c.BIRTH_YEAR, table.c.BIRTH_DATE],
+                     compute, batch_size, pause, progress)
+
+
+def backfill_housing_addresses(batch_size: int = 5000, pause: float = 0, progress=print) -> int:
+    """ADDRESS_CITY/STREET/HOUSE/APARTMENT записей жилищного отдела из ADDRESS"""
+
+    table = HousingDepartmentRecord.__table__
+
+    def compute(row):
+        parsed = parse_address(row.ADDRESS)
+        return {
+            "ADDRESS_CITY": parsed["city"],
+            "ADDRESS_STREET": parsed["street"],
+            "ADDRESS_HOUSE": parsed["house"],
+            "ADDRESS_APARTMENT": parsed["apartment"],
+        }
+
+    return _backfill(table, table.c.ID, [table.c.ADDRESS, table.c.ADDRESS_CITY, table.c.ADDRESS_STREET,
+                                         table.c.ADDRESS_HOUSE, table.c.ADDRESS_APARTMENT],
+                     compute, batch_size, pause, progress)
+
+
+def backfill_status_expiration(batch_size: int = 5000, pause: float = 0, progress=print) -> int:
+    """REP_STATUS_EXPIRES репатриантов из REP_STATUS"""
+
+    table = Repatriant.__table__
+
+    def compute(row):
+        return {"REP_STATUS_EXPIRES": status_expiration_date(row.REP_STATUS)}
+
+    return _backfill(table, table.c.ID, [table.c.REP_STATUS, table.c.REP_STATUS_EXPIRES],
+                     compute, batch_size, pause, progress)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+import threading
+
+from flask import current_app, request, send_file
+from werkzeug.security import safe_join
+
+try:  # brotli необязателен: без него ответы сжимаются только gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Сжатие текстовых ответов (HTML, JSON, CSV) для филиалов с медленными каналами.
+# Файлы из хранилища (PDF, JPEG) уже сжаты и отдаются как есть; статические файлы
+# сжимаются один раз и берутся из кэша на диске
+
+# Маршруты, отдающие загруженные файлы
+SKIP_ENDPOINTS = {"uploaded_file"}
+
+_static_lock = threading.Lock()
+
+
+def available_encodings(app) -> list[str]:
+    """Включенные алгоритмы в порядке предпочтения сервера"""
+
+    return [name for name in app.config["COMPRESSION_ALGORITHMS"] if name == "gzip" or (name == "br" and brotli)]
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    if encoding == "br":
+        quality = current_app.config["COMPRESSION_BROTLI_QUALITY"] if level is None else level
+        return brotli.compress(data, quality=quality)
+    level = current_app.config["COMPRESSION_GZIP_LEVEL"] if level is None else level
+    # mtime=0: одинаковое содержимое дает одинаковый результат (важно для кэшей и ETag)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _choose_encoding(app) -> str | None:
+    return request.accept_encodings.best_match(available_encodings(app))
+
+
+def _static_variant(app, filename: str, encoding: str) -> str | None:
+    """Путь к сжатой копии статического файла; создается при первом обращении или после изменения"""
+
+    source = safe_join(app.static_folder, filename)
+    if source is None or not os.path.isfile(source):
+        return None
+
+    extension = ".br" if encoding == "br" else ".gz"
+    target = safe_join(app.config["COMPRESSION_STATIC_CACHE"], filename + extension)
+    if target is None:
+        return None
+    source_mtime = os.path.getmtime(source)
+    if os.path.exists(target) and os.path.getmtime(target) == source_mtime:
+        return target
+
+    with _static_lock:
+        if os.path.exists(target) and os.path.getmtime(target) == source_mtime:
+            return target
+        with open(source, "rb") as src:
+            # Для статики - максимальная степень сжатия: считается один раз
+            data = compress(src.read(), encoding, level=11 if encoding == "br" else 9)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as out:
+            out.write(data)
+        os.utime(temp_path, (source_mtime, source_mtime))
+        os.replace(temp_path, target)
+    return target
+
+
+def _compress_static(app, response):
+    filename = (request.view_args or {}).get("filename")
+    encoding = _choose_encoding(app)
+    if not filename or encoding is None:
+        return response
+
+    target = _static_variant(app, filename, encoding)
+    if target is None or os.path.getsize(target) >= (response.content_length or 0):
+        return response
+
+    compressed = send_file(target, mimetype=response.mimetype, conditional=True,
+                           max_age=app.get_send_file_max_age(filename))
+    compressed.headers["Content-Encoding"] = encoding
+    compressed.vary.add("Accept-Encoding")
+    response.close()
+    return compressed
+
+
+def _compress_response(response):
+    app = current_app
+    vary_needed = response.mimetype in app.config["COMPRESSION_MIMETYPES"]
+    if (
+        request.method == "HEAD"
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+        or request.endpoint in SKIP_ENDPOINTS
+    ):
+        return response
+
+    if request.endpoint == "static":
+        return _compress_static(app, response) if vary_needed and not request.range else response
+
+    # Файлы (send_file) и потоковые ответы не буферизуем
+    if not vary_needed or response.direct_passthrough or response.is_streamed:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if (response.content_length or 0) < app.config["COMPRESSION_MIN_SIZE"]:
+        return response
+    encoding = _choose_encoding(app)
+    if encoding is None:
+        return response
+
+    data = compress(response.get_data(), encoding)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    if response.headers.get("ETag"):
+        # Сжатое представление отличается побайтно - сильный ETag становится слабым
+        etag, _ = response.get_etag()
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app) -> None:
+    """Включает сжатие ответов, если COMPRESSION_ENABLED = True"""
+
+    if not app.config["COMPRESSION_ENABLED"]:
+        return
+    if "br" in app.config["COMPRESSION_ALGORITHMS"] and brotli is None:
+        print("Пакет brotli не установлен: ответы сжимаются только gzip")
+    app.after_request(_compress_response)
+
+
+def precompress_static(app) -> int:
+    """Создает сжатые копии всех статических файлов (для запуска при обновлении)"""
+
+    if not app.static_folder or not os.path.isdir(app.static_folder):
+        return 0
+    count = 0
+    with app.app_context():
+        for root, _, files in os.walk(app.static_folder):
+            for name in files:
+                filename = os.path.relpath(os.path.join(root, name), app.static_folder).replace(os.sep, "/")
+                if mimetypes.guess_type(filename)[0] not in app.config["COMPRESSION_MIMETYPES"]:
+                    continue
+                for encoding in available_encodings(app):
+                    if _static_variant(app, filename, encoding):
+                        count += 1
+    return count
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import shutil
+from datetime import datetime, timedelta, timezone
+
+from ..extensions import db
+from ..models import DiskUsageSample, StoredFile
+from .rebalancer import list_disk_files
+
+
+GB = 1024 ** 3
+
+
+def sample_disk_usage(app) -> list[DiskUsageSample]:
+    """Записывает замер заполнения каждого диска за сегодня (повторный замер обновляет строку)"""
+
+    today = datetime.now().date()
+    # Начало местных суток в UTC: StoredFile.created_at записывается через datetime.utcnow
+    day_start = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc).replace(tzinfo=None)
+    samples = []
+
+    for disk in app.config["STORAGE_DISKS"]:
+        try:
+            total, used, free = shutil.disk_usage(disk["path"])
+        except OSError as e:
+            print(f"Ошибка проверки диска {disk['name']}: {e}")
+            continue
+
+        # Новые файлы за день берем из каталога (перенос между дисками не считается записью)
+        bytes_written = db.session.query(db.func.coalesce(db.func.sum(StoredFile.size), 0)).filter(
+            StoredFile.disk_path == disk["path"],
+            StoredFile.created_at >= day_start
+        ).scalar()
+
+        sample = DiskUsageSample.query.filter_by(disk_path=disk["path"], sample_date=today).first()
+        if sample is None:
+            sample = DiskUsageSample(disk_path=disk["path"], sample_date=today)
+            db.session.add(sample)
+        sample.disk_name = disk["name"]
+        sample.total_bytes = total
+        sample.used_bytes = used
+        sample.free_bytes = free
+        sample.file_count = len(list_disk_files(disk["path"]))
+        sample.bytes_written = int(bytes_written)
+        sample.sampled_at = datetime.utcnow()
+        samples.append(sample)
+
+    db.session.commit()
+    return samples
+
+
+def ensure_fresh_samples(app) -> None:
+    """Делает замер, если последний старше DISK_STATS_MAX_AGE_SECONDS"""
+
+    last_sampled_at = db.session.query(db.func.max(DiskUsageSample.sampled_at)).scalar()
+    max_age = timedelta(seconds=app.config["DISK_STATS_MAX_AGE_SECONDS"])
+    if last_sampled_at is None or datetime.utcnow() - last_sampled_at > max_age:
+        try:
+            sample_disk_usage(app)
+        except Exception as e:
+            # Параллельный замер из другого процесса - используем уже записанные данные
+            db.session.rollback()
+            print(f"Ошибка записи замера дисков: {e}")
+
+
+def forecast_growth(samples: list[DiskUsageSample]) -> tuple[float | None, float | None]:
+    """Оценивает рост (байт в день) по методу наименьших квадратов и дни до заполнения"""
+
+    if len(samples) < 2:
+        return None, None
+
+    first_date = samples[0].sample_date
+    xs = [(sample.sample_date - first_date).days for sample in samples]
+    ys = [sample.used_bytes for sample in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return None, None
+
+    growth_per_day = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+    if growth_per_day <= 0:
+        return growth_per_day, None
+    return growth_per_day, samples[-1].free_bytes / growth_per_day
+
+
+def get_disk_stats(app) -> list[dict]:
+    """Возвращает статистику дисков по таблице замеров: текущее заполнение, история и прогноз"""
+
+    since = datetime.now().date() - timedelta(days=app.config["DISK_STATS_HISTORY_DAYS"])
+    history = DiskUsageSample.query.filter(
+        DiskUsageSample.sample_date >= since
+    ).order_by(DiskUsageSample.sample_date).all()
+
+    stats = []
+    for disk in app.config["STORAGE_DISKS"]:
+        samples = [sample for sample in history if sample.disk_path == disk["path"]]
+        if not samples:
+            stats.append({
+                "name": disk["name"],
+                "path": disk["path"],
+                "error": "Нет данных о заполнении диска"
+            })
+            continue
+
+        latest = samples[-1]
+        growth_per_day, days_until_full = forecast_growth(samples)
+        stats.append({
+            "name": disk["name"],
+            "path": disk["path"],
+            "total_gb": latest.total_bytes // GB,
+            "used_gb": latest.used_bytes // GB,
+            "free_gb": latest.free_bytes // GB,
+            "usage_percent": round(latest.used_bytes / latest.total_bytes * 100, 1) if latest.total_bytes else 0,
+            "file_count": latest.file_count,
+            "sampled_at": latest.sampled_at,
+            "growth_gb_per_day": round(growth_per_day / GB, 3) if growth_per_day is not None else None,
+            "days_until_full": int(days_until_full) if days_until_full is not None else None,
+            "history": [{
+                "date": sample.sample_date.isoformat(),
+                "used_gb": round(sample.used_bytes / GB, 2),
+                "free_gb": round(sample.free_bytes / GB, 2),
+                "file_count": sample.file_count,
+                "written_mb": round((sample.bytes_written or 0) / 1024 ** 2, 1)
+            } for sample in samples]
+        })
+    return stats
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from flask import current_app
+from sqlalchemy import func, literal, tuple_, union_all
+
+from ..extensions import db
+from ..models import Repatriant
+from .search_cache import get_search_cache, search_cache_key
+
+
+# Количество найденных репатриантов по значениям полей панели расширенного поиска
+# (пол, страна проживания, откуда прибыл, семейное положение, национальность) для текущего
+# фильтра: сотрудник видит размер каждого варианта до того, как выберет его.
+# Все поля считаются одним запросом (на PostgreSQL - GROUPING SETS, на остальных БД -
+# UNION ALL группировок), результат хранится в кэше поиска и сбрасывается вместе с ним
+
+FACET_FIELDS = ("sex", "strana_proj", "from_loc", "sem_poloj", "rezerv")
+
+# Вариантов одного поля в ответе (самые частые)
+MAX_FACET_VALUES = 30
+
+
+def _facet_rows(query):
+    columns = [getattr(Repatriant, name) for name in FACET_FIELDS]
+    if db.session.get_bind().dialect.name == "postgresql":
+        # GROUPING() - битовая маска столбцов, не участвующих в группировке строки:
+        # по ней видно, к какому полю относится строка
+        statement = query.with_entities(
+            func.grouping(*columns).label("facet_mask"), *columns, func.count().label("facet_count")
+        ).group_by(func.grouping_sets(*(tuple_(column) for column in columns))).order_by(None)
+        full_mask = (1 << len(columns)) - 1
+        field_by_mask = {full_mask ^ (1 << (len(columns) - 1 - index)): index for index in range(len(columns))}
+        rows = []
+        for row in statement:
+            index = field_by_mask[row.facet_mask]
+            rows.append((FACET_FIELDS[index], row[1 + index], row.facet_count))
+        return rows
+
+    filtered = query.with_entities(*columns).order_by(None).subquery()
+    statement = union_all(*(
+        db.select(literal(name).label("facet"), column.label("value"), func.count().label("facet_count"))
+        .group_by(column)
+        for name, column in zip(FACET_FIELDS, filtered.c)
+    ))
+    return [tuple(row) for row in db.session.execute(statement)]
+
+
+def search_facets(query) -> dict[str, list[tuple[str, int]]]:
+    """{поле: [(значение, число найденных), ...]} по убыванию числа; пустые значения не учитываются"""
+
+    facets = {name: [] for name in FACET_FIELDS}
+    for name, value, count in _facet_rows(query):
+        if value is not None and str(value).strip():
+            facets[name].append((value, count))
+    for name, values in facets.items():
+        values.sort(key=lambda item: (-item[1], str(item[0])))
+        del values[MAX_FACET_VALUES:]
+    return facets
+
+
+def cached_search_facets(params: dict, query) -> dict[str, list[tuple[str, int]]]:
+    """search_facets() с кэшем по параметрам поиска (не зависят от роли и страницы)"""
+
+    cache = get_search_cache(current_app)
+    if cache is None:
+        return search_facets(query)
+
+    key = search_cache_key("facets", 0, params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    generation = cache.generation
+    facets = search_facets(query)
+    cache.put(key, facets, generation)
+    return facets
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import os
+import select
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import create_engine, event, func, text
+from sqlalchemy.pool import NullPool
+
+from ..extensions import db
+from ..models import CacheInvalidation
+from .jobs import BackgroundJob, get_job
+
+
+# Шина сброса кэшей между воркерами. Каждый воркер держит кэши в памяти (результаты
+# поиска, пользователи); после фиксации транзакции, изменившей данные, воркер сбрасывает
+# свой кэш сразу, а остальным рассылает сообщение "тема + ключ":
+#   notify - PostgreSQL NOTIFY, у каждого воркера поток с LISTEN на отдельном соединении;
+#   poll   - строка в CACHE_INVALIDATIONS, воркеры опрашивают таблицу (SQLite, PgBouncer
+#            в режиме transaction, где LISTEN не работает);
+#   off    - только свой процесс (один воркер).
+
+CHANNEL = "repatriants_cache_invalidation"
+
+_PENDING_KEY = "pending_invalidations"
+
+
+def worker_origin(app) -> str:
+    """Идентификатор воркера в сообщениях (свои сообщения не применяются повторно)"""
+
+    origin = app.extensions.get("invalidation_origin")
+    if origin is None:
+        origin = app.extensions.setdefault("invalidation_origin", f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    return origin
+
+
+def bus_mode(app) -> str:
+    mode = app.config["INVALIDATION_BUS"]
+    if mode == "auto":
+        with app.app_context():
+            mode = "notify" if db.engine.dialect.name == "postgresql" else "poll"
+    return mode
+
+
+def register_invalidation_handler(app, topic: str, handler) -> None:
+    """Подписывает кэш на тему; handler(app, key) вызывается с key=None для сброса всего кэша"""
+
+    app.extensions.setdefault("invalidation_handlers", {}).setdefault(topic, []).append(handler)
+
+
+def apply_invalidation(app, topic: str, key: str | None) -> None:
+    for handler in app.extensions.get("invalidation_handlers", {}).get(topic, []):
+        try:
+            handler(app, key)
+        except Exception as e:
+            print(f"Ошибка при сбросе кэша {topic}: {e}")
+
+
+def _apply_everything(app) -> None:
+    for topic in app.extensions.get("invalidation_handlers", {}):
+        apply_invalidation(app, topic, None)
+
+
+def queue_invalidation(session, topic: str, key=None) -> None:
+    """Запоминает сброс кэша до фиксации транзакции сессии (при откате он не нужен)"""
+
+    session.info.setdefault(_PENDING_KEY, set()).add((topic, None if key is None else str(key)))
+
+
+def publish_invalidation(topic: str, key=None) -> None:
+    """Сбрасывает кэш в своем процессе и рассылает сообщение остальным воркерам (вне транзакции)"""
+
+    publish_invalidations({(topic, None if key is None else str(key))})
+
+
+def publish_invalidations(items: set, app=None) -> None:
+    app = app or current_app._get_current_object()
+    for topic, key in items:
+        apply_invalidation(app, topic, key)
+
+    mode = app.extensions.get("invalidation_mode") or bus_mode(app)
+    if mode == "off":
+        return
+    origin = worker_origin(app)
+    try:
+        # Отдельное соединение: вызывается после фиксации, когда транзакция сессии уже закрыта
+        with db.engine.begin() as connection:
+            for topic, key in items:
+                if mode == "notify":
+                    payload = json.dumps({"origin": origin, "topic": topic, "key": key}, ensure_ascii=False)
+                    connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                       {"channel": CHANNEL, "payload": payload})
+                else:
+                    connection.execute(CacheInvalidation.__table__.insert().values(
+                        TOPIC=topic, CACHE_KEY=key, ORIGIN=origin, CREATED_AT=datetime.utcnow()))
+    except Exception as e:
+        # Другие воркеры увидят изменения по истечении времени жизни своих кэшей
+        print(f"Не удалось разослать сброс кэша другим воркерам: {e}")
+
+
+def _after_commit(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        publish_invalidations(pending)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class InvalidationListener(BackgroundJob):
+    """Поток воркера, принимающий сообщения о сбросе кэшей от других воркеров"""
+
+    name = "invalidation-listener"
+
+    def run(self, mode: str) -> None:
+        origin = worker_origin(self.app)
+        self.update(mode=mode, received=0, connected=False)
+        while not self.stopping:
+            try:
+                if mode == "notify":
+                    self._listen(origin)
+                else:
+                    self._poll(origin)
+            except Exception as e:
+                self.update(connected=False, last_error=str(e))
+                print(f"Канал сброса кэшей прерван, переподключение: {e}")
+                # Пока канала не было, сообщения могли потеряться
+                _apply_everything(self.app)
+                db.session.rollback()
+                if self.wait(self.app.config["INVALIDATION_RECONNECT_SECONDS"]):
+                    break
+
+    def _receive(self, origin: str, sender: str, topic: str, key: str | None) -> None:
+        if sender == origin:
+            return
+        apply_invalidation(self.app, topic, key)
+        self.update(received=self.status()["received"] + 1,
+                    last_received_at=datetime.now().isoformat(timespec="seconds"))
+
+    def _listen(self, origin: str) -> None:
+        # Свое соединение вне пула: LISTEN держит его все время работы воркера
+        engine = create_engine(db.engine.url, poolclass=NullPool)
+        try:
+            with engine.connect() as connection:
+                connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+                connection.exec_driver_sql(f"LISTEN {CHANNEL}")
+                raw = connection.connection.dbapi_connection
+                self.update(connected=True, last_error=None)
+                last_check = time.monotonic()
+                while not self.stopping:
+                    readable, _, _ = select.select([raw], [], [], 5)
+                    if not readable:
+                        # Обрыв простаивающего соединения иначе не заметить
+                        if time.monotonic() - last_check > 30:
+                            connection.exec_driver_sql("SELECT 1")
+                            last_check = time.monotonic()
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        message = json.loads(raw.notifies.pop(0).payload)
+                        self._receive(origin, message.get("origin"), message["topic"], message.get("key"))
+        finally:
+            engine.dispose()
+
+    def _poll(self, origin: str) -> None:
+        table = CacheInvalidation.__table__
+        interval = self.app.config["INVALIDATION_POLL_SECONDS"]
+        last_id = db.session.query(func.max(CacheInvalidation.id)).scalar() or 0
+        db.session.rollback()
+        last_cleanup = time.monotonic()
+        self.update(connected=True, last_error=None)
+        while not self.wait(interval):
+            rows = db.session.execute(
+                table.select().where(table.c.ID > last_id).order_by(table.c.ID)
+            ).all()
+            db.session.rollback()
+            for row in rows:
+                last_id = row.ID
+                self._receive(origin, row.ORIGIN, row.TOPIC, row.CACHE_KEY)
+
+            # Старые сообщения уже прочитаны всеми воркерами
+            if time.monotonic() - last_cleanup > 600:
+                cutoff = datetime.utcnow() - timedelta(hours=1)
+                CacheInvalidation.query.filter(CacheInvalidation.created_at < cutoff).delete()
+                db.session.commit()
+                last_cleanup = time.monotonic()
+
+
+def _start_listener() -> None:
+    app = current_app._get_current_object()
+    if app.extensions.get("invalidation_listener_started"):
+        return
+    app.extensions["invalidation_listener_started"] = True
+    get_job(app, InvalidationListener).start(mode=app.extensions["invalidation_mode"])
+
+
+def init_invalidation_bus(app) -> None:
+    """Подключает рассылку сброса кэшей после фиксации транзакций и прием сообщений в воркере"""
+
+    if not event.contains(db.session, "after_commit", _after_commit):
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
+
+    mode = bus_mode(app)
+    app.extensions["invalidation_mode"] = mode
+    if mode != "off":
+        # Поток запускается при первом запросе: уже в воркере после fork и не в командах flask CLI
+        app.before_request(_start_listener)
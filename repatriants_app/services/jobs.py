@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+
+class IoThrottle:
+    """Ограничивает скорость ввода-вывода (байт в секунду) для фоновых задач"""
+
+    def __init__(self, bytes_per_sec: int | None) -> None:
+        self.bytes_per_sec = bytes_per_sec or 0
+        self._started = time.monotonic()
+        self._consumed = 0
+
+    def consume(self, nbytes: int) -> None:
+        """Учитывает прочитанные/записанные байты и засыпает, если лимит превышен"""
+
+        if self.bytes_per_sec <= 0:
+            return
+
+        self._consumed += nbytes
+        expected_elapsed = self._consumed / self.bytes_per_sec
+        actual_elapsed = time.monotonic() - self._started
+        if expected_elapsed > actual_elapsed:
+            time.sleep(expected_elapsed - actual_elapsed)
+
+
+class BackgroundJob(ABC):
+    """Фоновая задача в отдельном потоке: один запуск за раз, прогресс и остановка"""
+
+    name = "job"
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._status = {"state": "idle"}
+
+    def start(self, **params) -> bool:
+        """Запускает задачу; возвращает False, если она уже выполняется"""
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+
+            self._stop_event.clear()
+            self._status = {
+                "state": "running",
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+                "finished_at": None,
+                "error": None,
+                "params": params,
+            }
+            self._thread = threading.Thread(
+                target=self._run_in_context, kwargs=params, name=self.name, daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        """Просит задачу остановиться после текущего шага"""
+
+        self._stop_event.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def update(self, **fields) -> None:
+        """Обновляет поля прогресса"""
+
+        with self._lock:
+            self._status.update(fields)
+
+    def status(self) -> dict:
+        """Возвращает снимок состояния задачи"""
+
+        with self._lock:
+            return dict(self._status)
+
+    def wait(self, seconds: float) -> bool:
+        """Пауза между шагами; возвращает True, если запрошена остановка"""
+
+        return self._stop_event.wait(seconds)
+
+    @abstractmethod
+    def run(self, **params) -> None:
+        """Работа задачи (в потоке, в контексте приложения); между шагами проверяет self.stopping"""
+
+    def _run_in_context(self, **params) -> None:
+        from ..extensions import db
+
+        with self.app.app_context():
+            try:
+                self.run(**params)
+                self.update(state="stopped" if self.stopping else "finished")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Ошибка фоновой задачи {self.name}: {traceback.format_exc()}")
+                self.update(state="failed", error=str(e))
+            finally:
+                db.session.remove()
+                self.update(finished_at=datetime.now().isoformat(timespec="seconds"))
+
+
+def get_job(app, job_class):
+    """Возвращает единственный экземпляр задачи для приложения"""
+
+    key = f"job:{job_class.name}"
+    job = app.extensions.get(key)
+    if job is None:
+        job = app.extensions.setdefault(key, job_class(app))
+    return job
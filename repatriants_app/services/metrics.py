@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..extensions import db
+
+
+# Метрики общие для процесса. При запуске под gunicorn значения воркеров собираются
+# через файлы в PROMETHEUS_MULTIPROC_DIR (см. gunicorn.conf.py)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    ["endpoint", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Суммарное время SQL-запросов за один HTTP-запрос",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов за один HTTP-запрос",
+    ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+STORAGE_IO_BYTES = Counter(
+    "storage_io_bytes_total",
+    "Объем чтения/записи файлов хранилища",
+    ["operation"],
+)
+STORAGE_IO_LATENCY = Histogram(
+    "storage_io_duration_seconds",
+    "Длительность операций с файлами хранилища",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Размер пула соединений с БД",
+    ["bind"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединений с БД, выданных из пула",
+    ["bind"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_storage_io(operation: str, size: int, seconds: float | None = None) -> None:
+    """Учитывает операцию с файлом хранилища (write/checksum/copy/serve/upload_chunk)"""
+
+    STORAGE_IO_BYTES.labels(operation).inc(size)
+    if seconds is not None:
+        STORAGE_IO_LATENCY.labels(operation).observe(seconds)
+
+
+@contextmanager
+def storage_timer(operation: str):
+    """Замеряет длительность блока; объем передается через result["size"]"""
+
+    result = {"size": 0}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        observe_storage_io(operation, result["size"], time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not has_request_context():
+        return
+    stats = g.get("db_stats")
+    if stats is None:
+        stats = g.db_stats = [0.0, 0]
+    stats[0] += time.perf_counter() - context.metrics_started
+    stats[1] += 1
+
+
+# Дочерние метрики по набору меток: labels() каждый раз проверяет и блокирует реестр
+_request_children: dict[tuple, tuple] = {}
+
+
+def _children_for(endpoint: str, method: str, status: str) -> tuple:
+    key = (endpoint, method, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children.setdefault(key, (
+            REQUEST_LATENCY.labels(endpoint, method, status),
+            REQUEST_DB_TIME.labels(endpoint),
+            REQUEST_DB_QUERIES.labels(endpoint),
+        ))
+    return children
+
+
+def _register_pool_gauges(app) -> None:
+    with app.app_context():
+        engines = db.engines
+    for bind_key, engine in engines.items():
+        bind = bind_key or "default"
+        pool = engine.pool
+        if hasattr(pool, "size"):
+            DB_POOL_SIZE.labels(bind).set(pool.size())
+        checked_out = DB_POOL_CHECKED_OUT.labels(bind)
+        event.listen(pool, "checkout", lambda *args, gauge=checked_out: gauge.inc())
+        event.listen(pool, "checkin", lambda *args, gauge=checked_out: gauge.dec())
+
+
+def init_metrics(app) -> None:
+    """Подключает замеры запросов, SQL и пула соединений к приложению"""
+
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _register_pool_gauges(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        # Несуществующие адреса (404 без маршрута) сводим в одну метку
+        latency, db_time, db_queries = _children_for(
+            request.endpoint or "unmatched", request.method, str(response.status_code)
+        )
+        latency.observe(time.perf_counter() - started)
+        stats = g.get("db_stats") or (0.0, 0)
+        db_time.observe(stats[0])
+        db_queries.observe(stats[1])
+        return response
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Возвращает метрики в текстовом формате Prometheus"""
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
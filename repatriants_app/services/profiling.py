@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .sql_diagnostics import call_site
+from .user_cache import get_current_user
+
+
+# Профилирование одного запроса по требованию администратора: заголовок "X-Profile: 1"
+# или параметр ?_profile=1. Запрос выполняется под cProfile, параллельно записываются
+# все SQL-запросы с длительностью; результат сохраняется в PROFILE_DIR (общая папка
+# для всех воркеров) и доступен на странице /admin/profiles
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ARG = "_profile"
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _profile_slots(app) -> threading.BoundedSemaphore:
+    slots = app.extensions.get("profile_slots")
+    if slots is None:
+        slots = app.extensions.setdefault(
+            "profile_slots", threading.BoundedSemaphore(app.config["PROFILE_MAX_CONCURRENT"])
+        )
+    return slots
+
+
+def _profile_requested() -> bool:
+    return request.headers.get(PROFILE_HEADER) == "1" or request.args.get(PROFILE_ARG) == "1"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and g.get("profile") is not None:
+        context.profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not has_request_context():
+        return
+    profile = g.get("profile")
+    started = getattr(context, "profile_started", None)
+    if profile is None or started is None:
+        return
+    text = repr(parameters)
+    profile["sql"].append({
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "call_site": call_site(_THIS_FILE),
+        "statement": statement,
+        "parameters": text if len(text) <= 500 else text[:500] + "...",
+    })
+
+
+def _start_profile():
+    if not _profile_requested() or session.get("role") != "ADMIN":
+        return None
+
+    # Роль в сессии могли изменить после входа - проверяем по пользователю (кэш сбрасывается при изменении)
+    user = get_current_user()
+    if not user or user.role != "ADMIN" or not user.is_active:
+        return None
+
+    if not _profile_slots(current_app).acquire(blocking=False):
+        g.profile_busy = True
+        return None
+
+    g.profile = {"sql": [], "user": user.username, "started": time.perf_counter()}
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+    return None
+
+
+def _finish_profile(response):
+    if g.pop("profile_busy", False):
+        response.headers["X-Profile-Status"] = "busy"
+        return response
+
+    profiler = g.get("profiler")
+    if profiler is None:
+        return response
+    profiler.disable()
+
+    profile = g.profile
+    profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    folder = current_app.config["PROFILE_DIR"]
+    os.makedirs(folder, exist_ok=True)
+    profiler.dump_stats(os.path.join(folder, f"{profile_id}.prof"))
+
+    sql_time_ms = sum(item["duration_ms"] for item in profile["sql"])
+    metadata = {
+        "id": profile_id,
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "user": profile["user"],
+        "pid": os.getpid(),
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "total_ms": round((time.perf_counter() - profile["started"]) * 1000, 1),
+        "sql_count": len(profile["sql"]),
+        "sql_time_ms": round(sql_time_ms, 1),
+        "sql": profile["sql"],
+    }
+    with open(os.path.join(folder, f"{profile_id}.json"), "w", encoding="utf-8") as output:
+        json.dump(metadata, output, ensure_ascii=False)
+    _remove_old_profiles(folder, current_app.config["PROFILE_KEEP"])
+
+    print(f"Профиль запроса {metadata['path']} сохранен: {profile_id} "
+          f"({metadata['total_ms']} мс, SQL {metadata['sql_count']} шт. / {metadata['sql_time_ms']} мс)")
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _release_profile_slot(exc):
+    # Выполняется и при необработанной ошибке, когда after_request не вызывается
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        g.pop("profile", None)
+        _profile_slots(current_app).release()
+
+
+def _remove_old_profiles(folder: str, keep: int) -> None:
+    profiles = sorted(name[:-5] for name in os.listdir(folder) if name.endswith(".json"))
+    for profile_id in (profiles[:-keep] if keep else []):
+        for extension in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(folder, profile_id + extension))
+            except OSError:
+                pass
+
+
+def init_profiling(app) -> None:
+    """Включает профилирование запросов по требованию, если PROFILING_ENABLED = True"""
+
+    if not app.config["PROFILING_ENABLED"]:
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_release_profile_slot)
+
+
+def _profile_path(profile_id: str, extension: str) -> str | None:
+    # Идентификатор приходит из URL - не даем выйти за пределы папки
+    if not profile_id.replace("_", "").isalnum():
+        return None
+    path = os.path.join(current_app.config["PROFILE_DIR"], profile_id + extension)
+    return path if os.path.exists(path) else None
+
+
+def list_profiles() -> list[dict]:
+    """Сохраненные профили (новые первыми), без списка SQL"""
+
+    folder = current_app.config["PROFILE_DIR"]
+    if not os.path.isdir(folder):
+        return []
+    result = []
+    for name in sorted(os.listdir(folder), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(folder, name), encoding="utf-8") as source:
+                metadata = json.load(source)
+        except (OSError, ValueError):
+            continue
+        metadata.pop("sql", None)
+        result.append(metadata)
+    return result
+
+
+def load_profile(profile_id: str, sort: str = "cumulative", limit: int = 60) -> dict | None:
+    """Метаданные, SQL и текстовая сводка pstats для страницы просмотра"""
+
+    json_path = _profile_path(profile_id, ".json")
+    prof_path = _profile_path(profile_id, ".prof")
+    if json_path is None or prof_path is None:
+        return None
+    with open(json_path, encoding="utf-8") as source:
+        metadata = json.load(source)
+
+    if sort not in ("cumulative", "tottime", "ncalls"):
+        sort = "cumulative"
+    output = io.StringIO()
+    stats = pstats.Stats(prof_path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    metadata["stats"] = output.getvalue()
+    metadata["sql"] = sorted(metadata["sql"], key=lambda item: item["duration_ms"], reverse=True)
+    return metadata
+
+
+def profile_file(profile_id: str) -> str | None:
+    """Путь к файлу .prof для скачивания (открывается в snakeviz, pstats)"""
+
+    return _profile_path(profile_id, ".prof")
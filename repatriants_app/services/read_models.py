@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import NamedTuple
+
+from ..extensions import db
+from ..models import Repatriant
+
+
+# Строки для списков (страница поиска, живой поиск, очередь, таблицы отчетов). Спискам нужны
+# около десятка столбцов MAIN, а полная сущность Repatriant - это 40+ атрибутов, включая
+# двоичные FILE/PHOTO/FILE_JIL, плюс учет в identity map и отслеживание изменений.
+# Здесь выбираются только нужные столбцы в неизменяемые кортежи с теми же именами
+# атрибутов, что у модели, поэтому шаблоны списков работают с ними без изменений.
+# Для редактирования и карточки по-прежнему загружается модель
+
+
+class RepatriantRow(NamedTuple):
+    """Репатриант в списке: поля, которые показывают списки и отчеты"""
+
+    id: int
+    kod: str | None
+    f_hist: str | None
+    f: str | None
+    i: str | None
+    o: str | None
+    sex: str | None
+    date_r: date | None
+    strana_proj: str | None
+    from_loc: str | None
+    rep_status: date | None
+    rep_status_expires: date | None
+    avatar_path: str | None
+
+    @property
+    def full_name(self) -> str:
+        return " ".join(part for part in (self.f, self.i, self.o) if part)
+
+    def to_dict(self) -> dict:
+        """Поля для JSON (даты - в ISO 8601)"""
+
+        return {name: value.isoformat() if isinstance(value, date) else value
+                for name, value in self._asdict().items()}
+
+
+REPATRIANT_ROW_COLUMNS = tuple(getattr(Repatriant, name) for name in RepatriantRow._fields)
+
+
+def repatriant_rows(query) -> list[RepatriantRow]:
+    """Строки списка по запросу Repatriant.query (фильтры, сортировка, limit сохраняются)"""
+
+    return [RepatriantRow._make(row) for row in query.with_entities(*REPATRIANT_ROW_COLUMNS)]
+
+
+def paginate_repatriant_rows(query, order_by: list, page: int, per_page: int):
+    """paginate() по запросу Repatriant.query, элементы страницы - строки списка"""
+
+    result = query.with_entities(*REPATRIANT_ROW_COLUMNS).order_by(*order_by).paginate(
+        page=page, per_page=per_page, error_out=False)
+    result.items = [RepatriantRow._make(row) for row in result.items]
+    return result
+
+
+def repatriant_rows_by_id(ids) -> dict[int, RepatriantRow]:
+    """Строки списка по ID одним запросом"""
+
+    if not ids:
+        return {}
+    rows = db.session.query(*REPATRIANT_ROW_COLUMNS).filter(Repatriant.id.in_(ids))
+    return {row.id: RepatriantRow._make(row) for row in rows}
+
+
+def records_with_repatriants(model, limit: int) -> list[tuple]:
+    """Последние записи отдела (model) с репатриантом в виде строки списка: [(запись, RepatriantRow)]"""
+
+    rows = db.session.query(model, *REPATRIANT_ROW_COLUMNS).join(
+        Repatriant, model.repatriant_id == Repatriant.id
+    ).order_by(model.created_at.desc()).limit(limit)
+    return [(row[0], RepatriantRow._make(row[1:])) for row in rows]
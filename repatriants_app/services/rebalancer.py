@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+
+from ..extensions import db
+from ..models import StoredFile
+from .jobs import BackgroundJob, IoThrottle
+from .metrics import storage_timer
+from .storage import COPY_CHUNK_SIZE, file_checksum
+
+
+# Временный суффикс копии во время переноса (такие файлы не раздаются и не переносятся)
+TEMP_SUFFIX = ".rebalance"
+
+
+def get_disk_usage(app) -> list[dict]:
+    """Возвращает заполнение каждого диска хранения"""
+
+    usage = []
+    for disk in app.config["STORAGE_DISKS"]:
+        try:
+            total, used, free = shutil.disk_usage(disk["path"])
+            device = os.stat(disk["path"]).st_dev
+        except OSError as e:
+            print(f"Ошибка проверки диска {disk['name']}: {e}")
+            continue
+        usage.append({
+            "name": disk["name"],
+            "path": disk["path"],
+            "device": device,
+            "total": total,
+            "used": used,
+            "free": free,
+        })
+    return usage
+
+
+def list_disk_files(disk_path: str) -> list[os.DirEntry]:
+    """Возвращает файлы в корне диска хранения (без временных копий)"""
+
+    try:
+        entries = list(os.scandir(disk_path))
+    except OSError:
+        return []
+    return [
+        entry for entry in entries
+        if entry.is_file() and not entry.name.endswith(TEMP_SUFFIX) and not entry.name.endswith(".part")
+    ]
+
+
+def plan_rebalance(app, target_ratio: float | None = None, tolerance: float | None = None) -> dict:
+    """Составляет план переносов: с переполненных дисков на недозаполненные"""
+
+    if tolerance is None:
+        tolerance = app.config["REBALANCE_TOLERANCE"]
+
+    # Диски на одном физическом устройстве не имеет смысла выравнивать между собой
+    disks = []
+    seen_devices = set()
+    for disk in get_disk_usage(app):
+        if disk["device"] in seen_devices:
+            continue
+        seen_devices.add(disk["device"])
+        disks.append(disk)
+
+    if len(disks) < 2:
+        return {"target_ratio": None, "moves": [], "bytes": 0}
+
+    if target_ratio is None:
+        target_ratio = sum(d["used"] for d in disks) / sum(d["total"] for d in disks)
+
+    # Сколько байт диск должен отдать (> 0) или может принять (< 0)
+    for disk in disks:
+        disk["excess"] = disk["used"] - int(target_ratio * disk["total"])
+        disk["threshold"] = int(tolerance * disk["total"])
+
+    sources = [d for d in disks if d["excess"] > d["threshold"]]
+    targets = [d for d in disks if d["excess"] < 0]
+
+    moves = []
+    for source in sources:
+        # Сначала переносим самые старые файлы - к ним реже обращаются
+        files = sorted(list_disk_files(source["path"]), key=lambda entry: entry.stat().st_mtime)
+        to_shed = source["excess"]
+        for entry in files:
+            if to_shed <= 0:
+                break
+            size = entry.stat().st_size
+            target = min(targets, key=lambda d: d["excess"], default=None)
+            if target is None:
+                break
+            if target["excess"] + size > 0:
+                # Файл не помещается в свободную долю диска-приемника - пробуем следующие, меньшие
+                continue
+            moves.append({
+                "file_name": entry.name,
+                "source": source["path"],
+                "target": target["path"],
+                "size": size,
+            })
+            target["excess"] += size
+            to_shed -= size
+
+    return {
+        "target_ratio": round(target_ratio, 4),
+        "moves": moves,
+        "bytes": sum(move["size"] for move in moves),
+    }
+
+
+def copy_with_throttle(source_path: str, target_path: str, throttle: IoThrottle) -> None:
+    """Копирует файл блоками с ограничением скорости и сбросом на диск"""
+
+    with storage_timer("copy") as io, open(source_path, "rb") as src, open(target_path, "wb") as dst:
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            io["size"] += len(chunk)
+            throttle.consume(len(chunk))
+        dst.flush()
+        os.fsync(dst.fileno())
+    shutil.copystat(source_path, target_path)
+
+
+def move_file(file_name: str, source: str, target: str, throttle: IoThrottle) -> bool:
+    """Переносит один файл между дисками, не прерывая его раздачу.
+
+    Порядок: копия под временным именем -> проверка -> атомарное переименование ->
+    переключение записи каталога под блокировкой строки. Исходный файл удаляется
+    позже (см. StorageRebalancer), поэтому уже начатые скачивания не обрываются.
+    """
+
+    source_path = os.path.join(source, file_name)
+    target_path = os.path.join(target, file_name)
+    temp_path = target_path + TEMP_SUFFIX
+
+    if not os.path.exists(source_path) or os.path.exists(target_path):
+        return False
+
+    # Запись каталога должна существовать до копирования: по ней ловим параллельное удаление
+    record = StoredFile.query.filter_by(file_name=file_name).first()
+    if record is None:
+        record = StoredFile(file_name=file_name, disk_path=source, size=os.path.getsize(source_path))
+        db.session.add(record)
+        db.session.commit()
+    elif record.disk_path != source:
+        return False
+
+    expected_checksum = record.checksum or file_checksum(source_path, throttle)
+
+    try:
+        copy_with_throttle(source_path, temp_path, throttle)
+        if file_checksum(temp_path, throttle) != expected_checksum:
+            raise OSError(f"контрольная сумма копии не совпадает: {file_name}")
+        os.replace(temp_path, target_path)
+    except OSError as e:
+        print(f"Ошибка копирования {file_name}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+    # Переключаем каталог, только если файл не удалили и не перенесли за время копирования
+    record = StoredFile.query.filter_by(file_name=file_name).with_for_update().first()
+    if record is None or record.disk_path != source:
+        db.session.rollback()
+        os.remove(target_path)
+        return False
+
+    record.disk_path = target
+    record.size = os.path.getsize(target_path)
+    record.checksum = expected_checksum
+    db.session.commit()
+    return True
+
+
+class StorageRebalancer(BackgroundJob):
+    """Фоновый перенос файлов между STORAGE_DISKS к целевому заполнению"""
+
+    name = "storage_rebalancer"
+
+    def run(self, target_ratio=None, tolerance=None) -> None:
+        config = self.app.config
+        plan = plan_rebalance(self.app, target_ratio, tolerance)
+        self.update(
+            target_ratio=plan["target_ratio"],
+            files_total=len(plan["moves"]),
+            bytes_total=plan["bytes"],
+            files_done=0,
+            bytes_done=0,
+            files_skipped=0,
+            current_file=None,
+        )
+
+        throttle = IoThrottle(config["REBALANCE_MAX_BYTES_PER_SEC"])
+        pending_deletes = []
+        files_done = bytes_done = files_skipped = 0
+
+        for move in plan["moves"]:
+            if self.stopping:
+                break
+
+            self.update(current_file=move["file_name"])
+            if move_file(move["file_name"], move["source"], move["target"], throttle):
+                files_done += 1
+                bytes_done += move["size"]
+                pending_deletes.append((time.monotonic(), os.path.join(move["source"], move["file_name"])))
+            else:
+                files_skipped += 1
+
+            self.update(files_done=files_done, bytes_done=bytes_done, files_skipped=files_skipped)
+            pending_deletes = self._delete_sources(pending_deletes)
+
+            if self.wait(config["REBALANCE_PAUSE_SECONDS"]):
+                break
+
+        # Дожидаемся окончания периода ожидания, чтобы убрать все исходные копии, и после остановки:
+        # каталог уже указывает на новый диск, и ни следующий план, ни проверка целостности их не удалят.
+        # Остановка только отменяет повторные попытки для файлов, которые удалить не удалось
+        self.update(current_file=None, pending_deletes=len(pending_deletes))
+        while pending_deletes:
+            pending_deletes = self._delete_sources(pending_deletes, retry=not self.stopping)
+            self.update(pending_deletes=len(pending_deletes))
+            if pending_deletes:
+                time.sleep(1)
+
+    def _delete_sources(self, pending: list, retry: bool = True) -> list:
+        """Удаляет исходные копии, для которых истек период ожидания"""
+
+        grace = self.app.config["REBALANCE_DELETE_GRACE_SECONDS"]
+        still_pending = []
+        for moved_at, path in pending:
+            if time.monotonic() - moved_at < grace:
+                still_pending.append((moved_at, path))
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # В Windows открытый на чтение файл удалить нельзя - попробуем позже
+                if not retry:
+                    print(f"Не удалось удалить исходную копию {path}, она осталась на диске: {e}")
+                    continue
+                print(f"Не удалось удалить исходную копию {path}: {e}")
+                still_pending.append((time.monotonic(), path))
+        return still_pending
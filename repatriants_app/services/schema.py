@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+
+from ..extensions import db
+
+
+# Доработка схемы существующей базы: create_all создает только новые таблицы, а столбцы
+# и индексы, добавленные в модели позже, нужно добавить в уже созданные таблицы.
+# Вызывается из flask init-db (перед запуском воркеров)
+
+
+def _invalid_indexes(connection) -> set[str]:
+    """Имена недействительных индексов PostgreSQL (pg_index.indisvalid = false) в текущей схеме"""
+
+    if connection.dialect.name != "postgresql":
+        return set()
+    return set(connection.exec_driver_sql("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace
+    """).scalars())
+
+
+def upgrade_schema() -> list[str]:
+    """Добавляет в существующие таблицы недостающие столбцы и индексы моделей; возвращает список изменений"""
+
+    engine = db.engine
+    preparer = engine.dialect.identifier_preparer
+    inspector = inspect(engine)
+    changes = []
+
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"Столбец {table.name}.{column.name} NOT NULL без значения по умолчанию: добавьте вручную")
+                    continue
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                )
+                changes.append(f"{table.name}.{column.name}")
+
+    # Индексы на заполненных таблицах PostgreSQL строятся без блокировки записи (CONCURRENTLY),
+    # поэтому вне транзакции
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        invalid = _invalid_indexes(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in invalid:
+                    # Прерванное или неудачное построение CONCURRENTLY оставляет индекс с тем же именем,
+                    # который запросы не используют: удаляем и строим заново
+                    print(f"Индекс {index.name} недействителен (прерванное построение), перестраивается")
+                    connection.exec_driver_sql(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {preparer.quote(index.name)}"
+                    )
+                elif index.name in existing:
+                    continue
+                ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+                if engine.dialect.name == "postgresql":
+                    ops = index.dialect_options["postgresql"]["ops"] or {}
+                    if any(op.startswith("gin_trgm") for op in ops.values()):
+                        connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                    ddl = ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+                connection.exec_driver_sql(ddl)
+                changes.append(index.name)
+    return changes
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+
+from ..extensions import db
+from ..models import (
+    HousingDepartmentRecord,
+    HousingRecord,
+    Repatriant,
+    ScrubFinding,
+    SocialHelpRecord,
+    StoredFile,
+)
+from .jobs import BackgroundJob, IoThrottle
+from .rebalancer import copy_with_throttle
+from .storage import file_checksum, locate_file
+
+
+def _file_name_from_path(path) -> str | None:
+    """Извлекает имя файла из пути documents/... или avatars/..."""
+
+    if isinstance(path, dict):
+        path = path.get("path")
+    if not path or not isinstance(path, str):
+        return None
+    if path.startswith("documents/") or path.startswith("avatars/"):
+        return path.split("/", 1)[1]
+    return None
+
+
+def iter_referenced_files():
+    """Перебирает имена файлов, на которые ссылаются записи в базе данных"""
+
+    for documents_path, avatar_path in db.session.query(Repatriant.documents_path, Repatriant.avatar_path).yield_per(1000):
+        for path in (documents_path, avatar_path):
+            file_name = _file_name_from_path(path)
+            if file_name:
+                yield file_name
+
+    # В записях отделов пути хранятся JSON-массивом строк или объектов {"path", "name"}
+    for model in (HousingRecord, SocialHelpRecord, HousingDepartmentRecord):
+        query = db.session.query(model.documents_path).filter(model.documents_path.isnot(None))
+        for (documents_path,) in query.yield_per(1000):
+            try:
+                documents = json.loads(documents_path)
+            except (json.JSONDecodeError, TypeError):
+                continue
+            for document in documents or []:
+                file_name = _file_name_from_path(document)
+                if file_name:
+                    yield file_name
+
+
+def restore_from_backup(app, record: StoredFile, throttle: IoThrottle) -> bool:
+    """Восстанавливает файл с BACKUP_DISK, если там есть неповрежденная копия"""
+
+    backup_path = os.path.join(app.config["BACKUP_DISK"], record.file_name)
+    if not os.path.exists(backup_path):
+        return False
+
+    if record.checksum:
+        if file_checksum(backup_path, throttle) != record.checksum:
+            return False
+    elif record.size is not None and os.path.getsize(backup_path) != record.size:
+        return False
+
+    target_path = os.path.join(record.disk_path, record.file_name)
+    temp_path = target_path + ".restore"
+    try:
+        # Блоками с ограничением скорости, как перенос между дисками: восстановление большого
+        # скана не должно занимать диск целиком
+        copy_with_throttle(backup_path, temp_path, throttle)
+        os.replace(temp_path, target_path)
+    except OSError as e:
+        print(f"Ошибка восстановления {record.file_name} с резервного диска: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+class StorageScrubber(BackgroundJob):
+    """Фоновая проверка наличия, размера и контрольной суммы файлов по каталогу"""
+
+    name = "storage_scrubber"
+
+    def run(self, repair=True) -> None:
+        config = self.app.config
+        run_started_at = datetime.utcnow()
+        throttle = IoThrottle(config["SCRUB_IO_BYTES_PER_SEC"])
+        self.update(run_started_at=run_started_at.isoformat(timespec="seconds"), files_checked=0, problems=0, repaired=0)
+
+        files_checked = problems = repaired = 0
+
+        # Файлы, на которые есть ссылки, но которых нет в каталоге (сохранены до его появления)
+        known = {name for (name,) in db.session.query(StoredFile.file_name)}
+        for file_name in set(iter_referenced_files()) - known:
+            if self.stopping:
+                return
+            disk_path = locate_file(file_name, self.app)
+            if disk_path is None:
+                self._report(run_started_at, file_name, None, "missing", "Файл упоминается в базе, но не найден ни на одном диске")
+                problems += 1
+                self.update(problems=problems)
+                continue
+            # Первая проверка: запоминаем размер и контрольную сумму как эталон
+            full_path = os.path.join(disk_path, file_name)
+            db.session.add(StoredFile(
+                file_name=file_name,
+                disk_path=disk_path,
+                size=os.path.getsize(full_path),
+                checksum=file_checksum(full_path, throttle),
+            ))
+            db.session.commit()
+
+        last_id = 0
+        while not self.stopping:
+            # Идем по каталогу порциями, не держа транзакцию открытой во время чтения файлов
+            batch = StoredFile.query.filter(StoredFile.id > last_id).order_by(StoredFile.id).limit(100).all()
+            if not batch:
+                break
+            db.session.expunge_all()
+            db.session.commit()
+
+            for record in batch:
+                if self.stopping:
+                    break
+                last_id = record.id
+                problem = self._check(run_started_at, record, throttle, repair)
+                files_checked += 1
+                if problem:
+                    problems += 1
+                    if problem.repaired:
+                        repaired += 1
+                self.update(files_checked=files_checked, problems=problems, repaired=repaired)
+                if self.wait(config["SCRUB_PAUSE_SECONDS"]):
+                    break
+
+    def _check(self, run_started_at, record: StoredFile, throttle: IoThrottle, repair: bool):
+        """Проверяет один файл каталога, возвращает находку или None"""
+
+        full_path = os.path.join(record.disk_path, record.file_name)
+
+        if not os.path.exists(full_path):
+            disk_path = locate_file(record.file_name, self.app)
+            if disk_path is not None:
+                # Файл на другом диске (например, перенесен вручную) - исправляем каталог
+                old_disk_path = record.disk_path
+                self._update_record(record, disk_path=disk_path)
+                return self._report(run_started_at, record.file_name, old_disk_path, "relocated", f"Найден на {disk_path}", repaired=True)
+            problem = "missing"
+            details = "Файл отсутствует на диске"
+        else:
+            size = os.path.getsize(full_path)
+            if record.size is not None and size != record.size:
+                problem = "size_mismatch"
+                details = f"Ожидалось {record.size} байт, на диске {size}"
+            else:
+                checksum = file_checksum(full_path, throttle)
+                if record.checksum is None:
+                    # Эталон еще не записан - запоминаем текущее состояние
+                    self._update_record(record, size=size, checksum=checksum)
+                    return None
+                if checksum == record.checksum:
+                    return None
+                problem = "checksum_mismatch"
+                details = "Контрольная сумма не совпадает с каталогом"
+
+        restored = repair and restore_from_backup(self.app, record, throttle)
+        if restored:
+            details += "; восстановлен с резервного диска"
+        return self._report(run_started_at, record.file_name, record.disk_path, problem, details, repaired=restored)
+
+    def _update_record(self, record: StoredFile, **fields) -> None:
+        """Обновляет запись каталога (объект отсоединен от сессии на время чтения файлов)"""
+
+        StoredFile.query.filter_by(id=record.id).update(fields)
+        db.session.commit()
+        for key, value in fields.items():
+            setattr(record, key, value)
+
+    def _report(self, run_started_at, file_name, disk_path, problem, details, repaired=False) -> ScrubFinding:
+        print(f"Проверка хранилища: {file_name} - {problem} ({details})")
+        finding = ScrubFinding(
+            run_started_at=run_started_at,
+            file_name=file_name,
+            disk_path=disk_path,
+            problem=problem,
+            details=details,
+            repaired=repaired,
+        )
+        db.session.add(finding)
+        db.session.commit()
+        return finding
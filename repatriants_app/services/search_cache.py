@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy import event
+
+from ..extensions import db
+from ..models import Child, FamilyMember, HousingDepartmentRecord, Repatriant
+from .invalidation import queue_invalidation, register_invalidation_handler
+from .read_models import paginate_repatriant_rows, repatriant_rows_by_id
+
+
+# Кэш результатов страницы /search: одинаковые запросы сотрудников (те же фильтры, роль
+# и страница) не выполняют повторно регулярные выражения и подсчет общего числа.
+# Хранятся только ID найденных репатриантов и общее число, строки списка загружаются по
+# первичному ключу. Кэш очищается после фиксации транзакции, изменившей данные, по которым ищут,
+# во всех воркерах (через шину сброса кэшей, см. invalidation.py)
+
+WATCHED_MODELS = (Repatriant, Child, FamilyMember, HousingDepartmentRecord)
+
+TOPIC = "search"
+
+
+class SearchCache:
+    """LRU-кэш результатов поиска с ограниченным временем жизни записей (общий для потоков воркера)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Номер поколения; увеличивается при каждой очистке"""
+
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, generation: int) -> None:
+        with self._lock:
+            # Данные изменились, пока выполнялся запрос: результат мог устареть
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+class IdPagination(Pagination):
+    """Страница результатов, собранная по сохраненным в кэше ID (тот же интерфейс, что у paginate)"""
+
+    def _query_items(self) -> list:
+        ids = self._query_args["ids"]
+        if not ids:
+            return []
+        by_id = repatriant_rows_by_id(ids)
+        return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+    def _query_count(self) -> int:
+        return self._query_args["total"]
+
+
+def get_search_cache(app) -> SearchCache | None:
+    if not app.config["SEARCH_CACHE_ENABLED"]:
+        return None
+    cache = app.extensions.get("search_cache")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "search_cache",
+            SearchCache(app.config["SEARCH_CACHE_MAX_ENTRIES"], app.config["SEARCH_CACHE_TTL_SECONDS"]),
+        )
+    return cache
+
+
+def search_cache_key(role: str, page: int, params: dict) -> tuple:
+    """Ключ кэша: роль (от нее зависит сортировка), страница и непустые параметры поиска"""
+
+    normalized = tuple(sorted(
+        (name, " ".join(value.split()))
+        for name, value in params.items()
+        if value and value.strip()
+    ))
+    return role, page, normalized
+
+
+def cached_paginate(key: tuple, query, order_by: list, page: int, per_page: int = 20):
+    """paginate() для запроса поиска с сохранением ID найденных записей в кэше.
+
+    Элементы страницы - строки списка RepatriantRow, а не сущности Repatriant.
+    """
+
+    cache = get_search_cache(current_app)
+    if cache is None:
+        return paginate_repatriant_rows(query, order_by, page, per_page)
+
+    cached = cache.get(key)
+    if cached is not None:
+        ids, total = cached
+        return IdPagination(page=page, per_page=per_page, error_out=False, ids=ids, total=total)
+
+    generation = cache.generation
+    result = paginate_repatriant_rows(query, order_by, page, per_page)
+    cache.put(key, ([item.id for item in result.items], result.total), generation)
+    return result
+
+
+def invalidate_search_cache(app=None) -> None:
+    """Очищает кэш поиска текущего процесса"""
+
+    app = app or current_app
+    cache = app.extensions.get("search_cache")
+    if cache is not None:
+        cache.clear()
+
+
+def _after_flush(session, flush_context) -> None:
+    for obj in session.new | session.deleted:
+        if isinstance(obj, WATCHED_MODELS):
+            queue_invalidation(session, TOPIC)
+            return
+    for obj in session.dirty:
+        if isinstance(obj, WATCHED_MODELS) and session.is_modified(obj):
+            queue_invalidation(session, TOPIC)
+            return
+
+
+def _do_orm_execute(orm_execute_state) -> None:
+    # Массовые Query.update()/delete() (например, удаление детей при редактировании анкеты)
+    # не проходят через flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ in WATCHED_MODELS for mapper in orm_execute_state.all_mappers):
+        queue_invalidation(orm_execute_state.session, TOPIC)
+
+
+def init_search_cache(app) -> None:
+    """Подключает очистку кэша поиска при изменении данных (в этом и в остальных воркерах)"""
+
+    register_invalidation_handler(app, TOPIC, lambda app, key: invalidate_search_cache(app))
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "do_orm_execute", _do_orm_execute)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from ..extensions import db
+from ..models import UserSession
+
+
+# Сессии на сервере: в cookie только случайный идентификатор, содержимое - в хранилище
+# (таблица USER_SESSIONS или память процесса для проверок). Cookie выдается один раз при
+# создании сессии; запись в хранилище - только если содержимое сессии изменилось.
+# Все сессии пользователя можно завершить одной операцией (revoke_user_sessions)
+
+_serializer = TaggedJSONSerializer()
+
+
+def _sid_hash(sid: str) -> str:
+    # В хранилище - хэш: по содержимому таблицы нельзя войти под чужой сессией
+    return hashlib.sha256(sid.encode()).hexdigest()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Содержимое сессии; modified выставляется при любом изменении"""
+
+    def __init__(self, initial=None, sid: str | None = None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.loaded_user_id = self.get("user_id")
+        self.modified = False
+
+
+class MemorySessionStore:
+    """Сессии в памяти процесса (для проверок и одного процесса разработки)"""
+
+    def __init__(self):
+        self._sessions: dict = {}
+        self._lock = threading.Lock()
+
+    def load(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or entry[2] < datetime.utcnow():
+                return None
+            return _serializer.loads(entry[0])
+
+    def save(self, key: str, data: dict, user_id, expires_at: datetime, new: bool) -> bool:
+        with self._lock:
+            if not new and key not in self._sessions:
+                return False
+            self._sessions[key] = (_serializer.dumps(data), user_id, expires_at)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def delete_user(self, user_id: int) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._sessions.items() if entry[1] == user_id]
+            for key in keys:
+                del self._sessions[key]
+            return len(keys)
+
+
+class DatabaseSessionStore:
+    """Сессии в таблице USER_SESSIONS основной БД (общие для всех воркеров)"""
+
+    table = UserSession.__table__
+
+    def load(self, key: str) -> dict | None:
+        # Отдельное соединение с основной БД: сессия открывается до маршрута и не должна
+        # читаться с реплики или попадать в транзакцию db.session
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                db.select(self.table.c.DATA).where(
+                    self.table.c.ID == key, self.table.c.EXPIRES_AT > datetime.utcnow()
+                )
+            ).first()
+        return _serializer.loads(row.DATA) if row else None
+
+    def save(self, key: str, data: dict, user_id, expires_at: datetime, new: bool) -> bool:
+        now = datetime.utcnow()
+        values = {"USER_ID": user_id, "DATA": _serializer.dumps(data), "UPDATED_AT": now, "EXPIRES_AT": expires_at}
+        with db.engine.begin() as connection:
+            if not new:
+                # Завершенная (удаленная) сессия не должна восстановиться при сохранении
+                result = connection.execute(self.table.update().where(self.table.c.ID == key).values(**values))
+                return result.rowcount > 0
+            connection.execute(self.table.insert().values(ID=key, CREATED_AT=now, **values))
+            # Новые сессии создаются при входе - заодно удаляем истекшие
+            connection.execute(self.table.delete().where(self.table.c.EXPIRES_AT < now))
+        return True
+
+    def delete(self, key: str) -> None:
+        with db.engine.begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.ID == key))
+
+    def delete_user(self, user_id: int) -> int:
+        with db.engine.begin() as connection:
+            return connection.execute(self.table.delete().where(self.table.c.USER_ID == user_id)).rowcount
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request) -> ServerSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.load(_sid_hash(sid))
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession()
+
+    def save_session(self, app, session: ServerSession, response) -> None:
+        name = self.get_cookie_name(app)
+        cookie_options = {
+            "domain": self.get_cookie_domain(app),
+            "path": self.get_cookie_path(app),
+            "secure": self.get_cookie_secure(app),
+            "samesite": self.get_cookie_samesite(app),
+            "httponly": self.get_cookie_httponly(app),
+        }
+        response.vary.add("Cookie")
+
+        if not session:
+            # Выход: сессия очищена - удаляем ее из хранилища и cookie
+            if session.modified and session.sid:
+                self.store.delete(_sid_hash(session.sid))
+                response.delete_cookie(name, **cookie_options)
+            return
+        if not session.modified:
+            return
+
+        user_id = session.get("user_id")
+        new = session.sid is None
+        if not new and user_id != session.loaded_user_id:
+            # Вход или смена пользователя: новый идентификатор (защита от фиксации сессии)
+            self.store.delete(_sid_hash(session.sid))
+            new = True
+        if new:
+            session.sid = secrets.token_urlsafe(32)
+
+        expires_at = datetime.utcnow() + timedelta(hours=app.config["SESSION_LIFETIME_HOURS"])
+        if not self.store.save(_sid_hash(session.sid), dict(session), user_id, expires_at, new):
+            # Сессию завершил администратор, пока выполнялся запрос
+            response.delete_cookie(name, **cookie_options)
+            return
+        if new:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session), **cookie_options)
+
+
+def init_sessions(app) -> None:
+    """Подключает хранилище сессий SESSION_BACKEND ("cookie" - стандартные сессии Flask в cookie)"""
+
+    backend = app.config["SESSION_BACKEND"]
+    if backend == "cookie":
+        return
+    store = MemorySessionStore() if backend == "memory" else DatabaseSessionStore()
+    app.extensions["session_store"] = store
+    app.session_interface = ServerSessionInterface(store)
+
+
+def revoke_user_sessions(app, user_id: int) -> int | None:
+    """Завершает все сессии пользователя; None, если сессии хранятся в cookie (завершить нельзя)"""
+
+    store = app.extensions.get("session_store")
+    if store is None:
+        return None
+    return store.delete_user(user_id)
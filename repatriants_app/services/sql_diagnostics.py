@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Режим диагностики SQL для разработки и тестового стенда: число запросов на HTTP-запрос,
+# повторяющиеся запросы из одного места кода (N+1) и журнал медленных запросов
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+_lock = threading.Lock()
+_recent_requests: deque = deque(maxlen=200)
+_repeated_queries: deque = deque(maxlen=200)
+_slow_queries: deque = deque(maxlen=200)
+
+
+def call_site(*skip_files: str) -> str:
+    """Ближайшая к SQL строка кода приложения, откуда был выполнен запрос
+    (skip_files - модули со слушателями SQL, которые тоже лежат в пакете)"""
+
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PACKAGE_DIR) and filename != _THIS_FILE and filename not in skip_files:
+            return f"{os.path.relpath(filename, os.path.dirname(_PACKAGE_DIR))}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "<вне приложения>"
+
+
+def _short(value, limit: int = 500) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.diagnostics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not has_request_context():
+        return
+
+    elapsed_ms = (time.perf_counter() - context.diagnostics_started) * 1000
+    site = call_site()
+
+    diagnostics = g.get("sql_diagnostics")
+    if diagnostics is None:
+        diagnostics = g.sql_diagnostics = {"count": 0, "time_ms": 0.0, "shapes": Counter()}
+    diagnostics["count"] += 1
+    diagnostics["time_ms"] += elapsed_ms
+    diagnostics["shapes"][(site, statement)] += 1
+
+    if elapsed_ms >= current_app.config["SLOW_QUERY_THRESHOLD_MS"]:
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "route": request.endpoint,
+            "path": request.full_path,
+            "duration_ms": round(elapsed_ms, 1),
+            "call_site": site,
+            "statement": statement,
+            "parameters": _short(parameters),
+        }
+        print(f"Медленный SQL ({entry['duration_ms']} мс) в {entry['route']} из {site}: "
+              f"{' '.join(statement.split())[:300]} параметры={entry['parameters']}")
+        with _lock:
+            _slow_queries.append(entry)
+
+
+def _summarize_request(response):
+    diagnostics = g.get("sql_diagnostics")
+    if diagnostics is None:
+        return response
+
+    threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+    repeated = [
+        {"call_site": site, "count": count, "statement": statement}
+        for (site, statement), count in diagnostics["shapes"].most_common()
+        if count >= threshold
+    ]
+
+    summary = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "route": request.endpoint,
+        "path": request.full_path,
+        "status": response.status_code,
+        "queries": diagnostics["count"],
+        "db_time_ms": round(diagnostics["time_ms"], 1),
+        "repeated": len(repeated),
+    }
+    with _lock:
+        _recent_requests.append(summary)
+        for item in repeated:
+            _repeated_queries.append({**item, "route": request.endpoint, "path": request.full_path, "at": summary["at"]})
+
+    for item in repeated:
+        print(f"Возможный N+1 в {request.endpoint}: {item['count']} одинаковых запросов из {item['call_site']}: "
+              f"{' '.join(item['statement'].split())[:200]}")
+
+    response.headers["X-SQL-Diagnostics"] = (
+        f"queries={summary['queries']}; time_ms={summary['db_time_ms']}; repeated={summary['repeated']}"
+    )
+    return response
+
+
+def init_sql_diagnostics(app) -> None:
+    """Включает диагностику SQL, если SQL_DIAGNOSTICS = True (не для боевого режима)"""
+
+    if not app.config["SQL_DIAGNOSTICS"]:
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.after_request(_summarize_request)
+
+
+def get_sql_diagnostics() -> dict:
+    """Сводка для страницы администратора: последние запросы, повторы и медленные SQL"""
+
+    with _lock:
+        return {
+            "recent_requests": list(reversed(_recent_requests)),
+            "repeated_queries": list(reversed(_repeated_queries)),
+            "slow_queries": list(reversed(_slow_queries)),
+        }
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import shutil
 import uuid
@@ -7,6 +8,14 @@ import uuid
 from flask import current_app
 from werkzeug.utils import secure_filename
 
+from ..extensions import db
+from ..models import StoredFile
+from .metrics import storage_timer
+
+
+# Размер блока при копировании и подсчете контрольной суммы
+COPY_CHUNK_SIZE = 1024 * 1024
+
 
 def create_disk_folders(app) -> None:
     """Создает необходимые папки на дисках"""
@@ -84,26 +93,28 @@ def save_file(file, folder: str, prefix: str = "") -> str | None:
         app = current_app
 
         if folder in ["documents", "avatars"]:
-            best_disk_path = get_best_disk(app)
-            upload_path = best_disk_path
+            # Постоянные файлы - в настроенное хранилище (диски D/E или объектное хранилище)
+            from .storage_backends import get_storage_backend
+
             relative_path = f"{folder}/{unique_filename}"
-            print(f"Выбран диск: {best_disk_path}")
+            get_storage_backend(app).save(file.stream, unique_filename)
+            print(f"✓ Файл сохранен в хранилище: {relative_path}")
         else:
             upload_path = os.path.join(app.config["UPLOAD_FOLDER"], folder)
             relative_path = os.path.join(folder, unique_filename)
             print(f"Используем старую папку: {upload_path}")
 
-        os.makedirs(upload_path, exist_ok=True)
-        print(f"Папка создана/проверена: {upload_path}")
+            os.makedirs(upload_path, exist_ok=True)
+            print(f"Папка создана/проверена: {upload_path}")
 
-        file_path = os.path.join(upload_path, unique_filename)
-        print(f"Сохраняем файл по пути: {file_path}")
-        file.save(file_path)
+            file_path = os.path.join(upload_path, unique_filename)
+            print(f"Сохраняем файл по пути: {file_path}")
+            write_stream(file.stream, file_path)
 
-        if os.path.exists(file_path):
-            print(f"✓ Файл успешно сохранен: {file_path}")
-        else:
-            print(f"✗ ОШИБКА: Файл не найден после сохранения: {file_path}")
+            if os.path.exists(file_path):
+                print(f"✓ Файл успешно сохранен: {file_path}")
+            else:
+                print(f"✗ ОШИБКА: Файл не найден после сохранения: {file_path}")
 
         result_path = relative_path.replace("\\", "/")
         print(f"Возвращаем путь: {result_path}")
@@ -121,19 +132,10 @@ def delete_file(file_path: str | None) -> bool:
     app = current_app
 
     if file_path.startswith("documents/") or file_path.startswith("avatars/"):
-        filename = file_path.split("/")[1]
+        from .storage_backends import get_storage_backend
 
-        for disk in app.config["STORAGE_DISKS"]:
-            full_path = os.path.join(disk["path"], filename)
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                    print(f"Файл удален с {disk['name']}: {filename}")
-                    return True
-                except OSError as e:
-                    print(f"Ошибка удаления файла с {disk['name']}: {e}")
-                    continue
-        return False
+        filename = file_path.split("/")[1]
+        return get_storage_backend(app).delete(filename)
 
     normalized_path = file_path.replace("/", "\\")
     full_path = os.path.join(app.config["UPLOAD_FOLDER"], normalized_path)
@@ -145,3 +147,68 @@ def delete_file(file_path: str | None) -> bool:
             return False
 
     return False
+
+
+def write_stream(stream, full_path: str) -> tuple[int, str]:
+    """Записывает поток в файл, возвращает размер и SHA-256 содержимого"""
+
+    digest = hashlib.sha256()
+    size = 0
+    with storage_timer("write") as io, open(full_path, "wb") as out:
+        while True:
+            chunk = stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        io["size"] = size
+    return size, digest.hexdigest()
+
+
+def file_checksum(full_path: str, throttle=None) -> str:
+    """Считает SHA-256 файла (с необязательным ограничением скорости чтения)"""
+
+    digest = hashlib.sha256()
+    with storage_timer("checksum") as io, open(full_path, "rb") as src:
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            io["size"] += len(chunk)
+            if throttle is not None:
+                throttle.consume(len(chunk))
+    return digest.hexdigest()
+
+
+def register_stored_file(file_name: str, disk_path: str, size: int | None = None, checksum: str | None = None) -> StoredFile:
+    """Добавляет или обновляет запись каталога (коммит - вместе с основной транзакцией)"""
+
+    record = StoredFile.query.filter_by(file_name=file_name).first()
+    if record is None:
+        record = StoredFile(file_name=file_name, disk_path=disk_path)
+        db.session.add(record)
+    record.disk_path = disk_path
+    record.size = size
+    record.checksum = checksum
+    return record
+
+
+def locate_file(file_name: str, app=None) -> str | None:
+    """Возвращает корневую папку диска, на котором лежит файл"""
+
+    if app is None:
+        app = current_app
+
+    # Быстрый путь: каталог знает, где лежит файл
+    record = StoredFile.query.filter_by(file_name=file_name).first()
+    if record is not None and os.path.exists(os.path.join(record.disk_path, file_name)):
+        return record.disk_path
+
+    # Файлы, сохраненные до появления каталога, или каталог устарел - ищем на всех дисках
+    for disk in app.config["STORAGE_DISKS"]:
+        if os.path.exists(os.path.join(disk["path"], file_name)):
+            return disk["path"]
+
+    return None
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from flask import current_app, redirect, send_from_directory
+
+from ..models import StoredFile
+from .metrics import observe_storage_io, storage_timer
+from .storage import COPY_CHUNK_SIZE, get_best_disk, locate_file, register_stored_file, write_stream
+
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища файлов documents/ и avatars/.
+
+    Файлы адресуются по имени (doc_1_ab12cd34.pdf) - оно уникально во всем хранилище.
+    """
+
+    @abstractmethod
+    def save(self, stream, file_name: str) -> tuple[int, str]:
+        """Сохраняет поток под именем file_name, возвращает размер и SHA-256"""
+
+    @abstractmethod
+    def open(self, file_name: str):
+        """Открывает файл на чтение (бинарный файловый объект)"""
+
+    @abstractmethod
+    def stream(self, file_name: str):
+        """Возвращает Flask-ответ для скачивания файла"""
+
+    @abstractmethod
+    def delete(self, file_name: str) -> bool:
+        """Удаляет файл, возвращает True, если он существовал"""
+
+    @abstractmethod
+    def stat(self, file_name: str) -> dict | None:
+        """Возвращает размер и время изменения файла или None, если файла нет"""
+
+
+class LocalDiskBackend(StorageBackend):
+    """Локальные диски из STORAGE_DISKS с выбором наименее заполненного"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    def save(self, stream, file_name: str) -> tuple[int, str]:
+        disk_path = get_best_disk(self.app)
+        os.makedirs(disk_path, exist_ok=True)
+        size, checksum = write_stream(stream, os.path.join(disk_path, file_name))
+        register_stored_file(file_name, disk_path, size, checksum)
+        return size, checksum
+
+    def open(self, file_name: str):
+        disk_path = locate_file(file_name, self.app)
+        if disk_path is None:
+            raise FileNotFoundError(file_name)
+        return open(os.path.join(disk_path, file_name), "rb")
+
+    def stream(self, file_name: str):
+        disk_path = locate_file(file_name, self.app)
+        if disk_path is None:
+            return None
+        response = send_from_directory(disk_path, file_name)
+        # Файл отдается потоком после выхода из обработчика - учитываем только объем
+        observe_storage_io("serve", response.content_length or 0)
+        return response
+
+    def delete(self, file_name: str) -> bool:
+        # Сначала убираем запись из каталога, чтобы перенос файла между дисками
+        # не "воскресил" удаленный файл
+        StoredFile.query.filter_by(file_name=file_name).delete()
+
+        # Во время переноса копия может временно лежать на двух дисках - удаляем все
+        deleted = False
+        for disk in self.app.config["STORAGE_DISKS"]:
+            full_path = os.path.join(disk["path"], file_name)
+            if os.path.exists(full_path):
+                try:
+                    os.remove(full_path)
+                    print(f"Файл удален с {disk['name']}: {file_name}")
+                    deleted = True
+                except OSError as e:
+                    print(f"Ошибка удаления файла с {disk['name']}: {e}")
+                    continue
+        return deleted
+
+    def stat(self, file_name: str) -> dict | None:
+        disk_path = locate_file(file_name, self.app)
+        if disk_path is None:
+            return None
+        st = os.stat(os.path.join(disk_path, file_name))
+        return {"size": st.st_size, "modified": datetime.fromtimestamp(st.st_mtime), "location": disk_path}
+
+
+class _HashingReader:
+    """Обертка над потоком: считает размер и SHA-256 по мере чтения"""
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+
+class S3Backend(StorageBackend):
+    """S3-совместимое объектное хранилище (AWS S3, MinIO и т.п.).
+
+    Загрузка идет потоком через multipart upload, скачивание - редиректом на
+    подписанную ссылку, поэтому байты файлов не проходят через воркеры Flask.
+    """
+
+    def __init__(self, app) -> None:
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise RuntimeError("Для STORAGE_BACKEND = 's3' требуется пакет boto3") from e
+
+        config = app.config
+        self.bucket = config["S3_BUCKET"]
+        self.prefix = config["S3_PREFIX"]
+        self.presign_expires = config["S3_PRESIGN_EXPIRES"]
+        self.presigned_downloads = config["S3_PRESIGNED_DOWNLOADS"]
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=config["S3_ENDPOINT_URL"],
+            aws_access_key_id=config["S3_ACCESS_KEY"],
+            aws_secret_access_key=config["S3_SECRET_KEY"],
+            region_name=config["S3_REGION"],
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config["S3_MULTIPART_CHUNK_SIZE"],
+            multipart_chunksize=config["S3_MULTIPART_CHUNK_SIZE"],
+        )
+
+    def _key(self, file_name: str) -> str:
+        return f"{self.prefix}{file_name}"
+
+    def save(self, stream, file_name: str) -> tuple[int, str]:
+        reader = _HashingReader(stream)
+        with storage_timer("write") as io:
+            self.client.upload_fileobj(reader, self.bucket, self._key(file_name), Config=self.transfer_config)
+            io["size"] = reader.size
+        return reader.size, reader.digest.hexdigest()
+
+    def open(self, file_name: str):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(file_name))["Body"]
+        except ClientError as e:
+            raise FileNotFoundError(file_name) from e
+
+    def stream(self, file_name: str):
+        if self.stat(file_name) is None:
+            return None
+
+        if self.presigned_downloads:
+            url = self.client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket, "Key": self._key(file_name)},
+                ExpiresIn=self.presign_expires,
+            )
+            return redirect(url)
+
+        # Проксирование через приложение (если клиенты не видят хранилище напрямую)
+        body = self.open(file_name)
+        mimetype = "application/pdf" if file_name.lower().endswith(".pdf") else None
+        return current_app.response_class(
+            body.iter_chunks(COPY_CHUNK_SIZE), mimetype=mimetype, direct_passthrough=True
+        )
+
+    def delete(self, file_name: str) -> bool:
+        existed = self.stat(file_name) is not None
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(file_name))
+        return existed
+
+    def stat(self, file_name: str) -> dict | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(file_name))
+        except ClientError:
+            return None
+        return {"size": head["ContentLength"], "modified": head["LastModified"], "location": self.bucket}
+
+
+STORAGE_BACKENDS = {
+    "local": LocalDiskBackend,
+    "s3": S3Backend,
+}
+
+
+def get_storage_backend(app=None) -> StorageBackend:
+    """Возвращает хранилище, выбранное в STORAGE_BACKEND (один экземпляр на приложение)"""
+
+    if app is None:
+        app = current_app
+
+    backend = app.extensions.get("storage_backend")
+    if backend is None:
+        backend_class = STORAGE_BACKENDS[app.config["STORAGE_BACKEND"]]
+        backend = app.extensions.setdefault("storage_backend", backend_class(app))
+    return backend
@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, Integer, String, Time, column, func, table, text
+
+from ..extensions import db
+from ..models import (
+    Child,
+    EventRecord,
+    FamilyMember,
+    HousingDepartmentRecord,
+    HousingQueue,
+    HousingRecord,
+    OtherRecord,
+    Repatriant,
+    SocialHelpRecord,
+    StoredFile,
+    User,
+)
+from ..utils.status import status_expiration_date
+from ..utils.text import parse_address, parse_birth_date
+from .storage import write_stream
+
+
+# Генератор синтетической базы для нагрузочных замеров и проверки производительности.
+# Пишет напрямую через Core (executemany пачками), поэтому значения сразу
+# приводятся к виду, который дали бы обработчики форм: верхний регистр для MAIN,
+# CHILDREN и FAMILY, нормализованная национальность в REZERV.
+
+BATCH_SIZE = 5000
+
+# Абхазо-абазинские фамилии одинаковы для мужчин и женщин
+ABKHAZ_SURNAMES = [
+    "АГРБА", "АРДЗИНБА", "ЛАКОБА", "ЧАЧБА", "АШУБА", "ГУМБА", "КВИЦИНИЯ", "БУТБА", "ЦУШБА",
+    "ХАГБА", "АРШБА", "ДЖЕНИЯ", "ШАМБА", "ТАРБА", "КВАРЧИЯ", "ЭШБА", "ЛАДАРИЯ", "ЦВИЖБА",
+    "АДЛЕЙБА", "АМИЧБА", "БЖАНИЯ", "ГАБНИЯ", "ДЖОПУА", "ЗУХБА", "КАПБА", "МАРГАНИЯ",
+    "ОТЫРБА", "САГАРИЯ", "ТАНИЯ", "ХАЛВАШ", "ЧАМАГУА", "ШИНКУБА", "АНКВАБ", "БАГАПШ",
+]
+# Фамилии с родовым окончанием: (мужская форма, женская форма)
+GENDERED_SURNAMES = [
+    ("ИВАНОВ", "ИВАНОВА"), ("ПЕТРОВ", "ПЕТРОВА"), ("КУЗНЕЦОВ", "КУЗНЕЦОВА"), ("СМИРНОВ", "СМИРНОВА"),
+    ("ШХАЛАХОВ", "ШХАЛАХОВА"), ("КАРДАНОВ", "КАРДАНОВА"), ("ТХАГАПСОЕВ", "ТХАГАПСОЕВА"),
+    ("ХАПАЙ", "ХАПАЙ"), ("ЖИРОВ", "ЖИРОВА"), ("ТАЗОВ", "ТАЗОВА"), ("ЛОЗОВ", "ЛОЗОВА"),
+    ("ДЗАПШБА", "ДЗАПШБА"), ("КОКОВ", "КОКОВА"), ("БЕРСИРОВ", "БЕРСИРОВА"),
+]
+MALE_NAMES = [
+    "АСЛАН", "АСТАМУР", "БЕСЛАН", "ДАУР", "АДГУР", "ТИМУР", "РУСЛАН", "АЛХАС", "САИД", "АХМЕД",
+    "МУХАММЕД", "ОМАР", "ИНАЛ", "ЛЕОН", "БАТАЛ", "КАН", "ЗАУР", "МУРАТ", "ЭРДОГАН", "ЯШАР",
+    "МЕХМЕТ", "АЛИ", "ХАСАН", "АДАМ", "РАФИК", "ГЕОРГИЙ", "ДМИТРИЙ", "ВИТАЛИЙ",
+]
+FEMALE_NAMES = [
+    "АМРА", "ГУНДА", "САРИЯ", "МАРИНА", "МАДИНА", "ФАТИМА", "АСИДА", "ХИБЛА", "ЛЕЙЛА", "ЗАРИНА",
+    "АЙШЕ", "НААЛА", "ЭСМА", "ЭЛИФ", "ЗЕЙНЕП", "НАДЕЖДА", "ЕЛЕНА", "ДИАНА", "СОНА", "ЭЛЬМИРА",
+]
+# Отчества есть не у всех: у репатриантов из Турции и арабских стран их обычно нет
+PATRONYMIC_BASES = ["АСЛАН", "БЕСЛАН", "ДАУР", "АДГУР", "ТИМУР", "РУСЛАН", "ЗАУР", "МУРАТ", "ИНАЛ", "ОМАР"]
+
+# Страна проживания / прибытия с весами, близкими к реальному распределению
+COUNTRIES = [
+    ("ТУРЦИЯ", 55), ("СИРИЯ", 15), ("РОССИЯ", 10), ("ИОРДАНИЯ", 5), ("ЕГИПЕТ", 3),
+    ("ГЕРМАНИЯ", 4), ("НИДЕРЛАНДЫ", 2), ("США", 2), ("ИЗРАИЛЬ", 2), ("УКРАИНА", 2),
+]
+CITIES = {
+    "ТУРЦИЯ": ["СТАМБУЛ", "АДАПАЗАРЫ", "ДЮЗДЖЕ", "БИЛЕДЖИК", "ЭСКИШЕХИР", "КАЙСЕРИ", "СИВАС", "БУРСА"],
+    "СИРИЯ": ["ДАМАСК", "ХАМА", "АЛЕППО", "ЭЛЬ-КУНЕЙТРА"],
+    "РОССИЯ": ["НАЛЬЧИК", "ЧЕРКЕССК", "МАЙКОП", "МОСКВА", "КРАСНОДАР"],
+    "ИОРДАНИЯ": ["АММАН", "ЗАРКА"],
+    "ЕГИПЕТ": ["КАИР", "АЛЕКСАНДРИЯ"],
+    "ГЕРМАНИЯ": ["БЕРЛИН", "КЕЛЬН"],
+    "НИДЕРЛАНДЫ": ["АМСТЕРДАМ", "РОТТЕРДАМ"],
+    "США": ["НЬЮ-ДЖЕРСИ", "НЬЮ-ЙОРК"],
+    "ИЗРАИЛЬ": ["КФАР-КАМА", "РЕХАНИЯ"],
+    "УКРАИНА": ["КИЕВ", "ХАРЬКОВ"],
+}
+NATIONALITIES = [("АБХАЗ", 60), ("АБАЗИН", 12), ("АДЫГ", 12), ("КАБАРДИНЕЦ", 8), ("УБЫХ", 3), ("РУССКИЙ", 5)]
+FAMILY_STATUSES = [("ЖЕНАТ/ЗАМУЖЕМ", 55), ("ХОЛОСТ/НЕ ЗАМУЖЕМ", 30), ("РАЗВЕДЕН(А)", 9), ("ВДОВЕЦ/ВДОВА", 6)]
+DOCUMENTS = [("ПАСПОРТ", 70), ("ВИД НА ЖИТЕЛЬСТВО", 20), ("ЗАГРАНПАСПОРТ", 10)]
+ABKHAZ_CITIES = ["СУХУМ", "ГАГРА", "ГУДАУТА", "НОВЫЙ АФОН", "ОЧАМЧЫРА", "ТКУАРЧАЛ", "ГУЛРЫПШ"]
+STREETS = ["АРДЗИНБА", "ЛАКОБА", "ЧАНБА", "ГУЛИА", "ЛЕОНА", "АЙДГЫЛАРА", "КОДОРСКОЕ ШОССЕ", "ЭШБА"]
+RELATIONS = [("СУПРУГ(А)", 50), ("МАТЬ", 20), ("ОТЕЦ", 12), ("БРАТ", 8), ("СЕСТРА", 8), ("ВНУК(ВНУЧКА)", 2)]
+
+HELP_TYPES = ["материальная помощь", "продуктовый набор", "оплата лечения", "оплата обучения", "другое"]
+CUSTOM_HELP_TYPES = ["помощь с переездом", "юридическая консультация", "бытовая техника"]
+EVENT_TYPES = ["культурное", "образовательное", "спортивное", "праздничное"]
+OTHER_CATEGORIES = ["обращение", "справка", "запрос документов", "прочее"]
+HOUSING_CATEGORIES = ["многодетная семья", "молодая семья", "пенсионер", "общая очередь"]
+HOUSING_ACQUISITIONS = ["ведомственное", "выкуплено", "передано"]
+LOG_ACTIONS = [
+    "ВХОД В СИСТЕМУ", "ВЫХОД ИЗ СИСТЕМЫ", "ОТРЕДАКТИРОВАН РЕПАТРИАНТ", "ДОБАВЛЕНА ЗАПИСЬ О СОЦИАЛЬНОЙ ПОМОЩИ",
+    "ДОБАВЛЕНА ЗАПИСЬ О МЕРОПРИЯТИИ", "ОБНОВЛЕНА ЗАПИСЬ ЖИЛИЩНОГО ОТДЕЛА", "ДОБАВЛЕНА ПРОЧАЯ ЗАПИСЬ",
+]
+
+# Пользователи для замеров: по одному на роль, пароль задается в команде
+BENCH_USERS = [
+    ("bench_admin", "ADMIN", "ЗАМЕРЫ АДМИНИСТРАТОР"),
+    ("bench_social", "SOCIAL_ADAPTATION", "ЗАМЕРЫ СОЦИАЛЬНЫЙ ОТДЕЛ"),
+    ("bench_housing", "HOUSING_DEPARTMENT", "ЗАМЕРЫ ЖИЛИЩНЫЙ ОТДЕЛ"),
+]
+
+# Минимальный корректный PDF; файл добивается комментарием до нужного размера
+_PDF_HEAD = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n"
+)
+_PDF_TAIL = b"\n%%EOF\n"
+
+
+def _weighted(rng: random.Random, choices: list[tuple[str, int]]) -> str:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _random_date(rng: random.Random, start: date, end: date) -> date:
+    return start + timedelta(days=rng.randint(0, max((end - start).days, 0)))
+
+
+def _person_name(rng: random.Random, male: bool) -> tuple[str, str, str | None]:
+    """Фамилия, имя и (не всегда) отчество в нужной форме"""
+
+    if rng.random() < 0.65:
+        surname = rng.choice(ABKHAZ_SURNAMES)
+    else:
+        surname = rng.choice(GENDERED_SURNAMES)[0 if male else 1]
+    name = rng.choice(MALE_NAMES if male else FEMALE_NAMES)
+    patronymic = None
+    if rng.random() < 0.6:
+        patronymic = rng.choice(PATRONYMIC_BASES) + ("ОВИЧ" if male else "ОВНА")
+    return surname, name, patronymic
+
+
+def dummy_pdf(size: int) -> bytes:
+    """Содержимое PDF-файла заданного размера (не меньше заголовка)"""
+
+    padding = max(size - len(_PDF_HEAD) - len(_PDF_TAIL) - 2, 0)
+    return _PDF_HEAD + b"%" + b"0" * padding + b"\n" + _PDF_TAIL
+
+
+class DatasetGenerator:
+    """Наполняет базу синтетическими данными заданного объема"""
+
+    def __init__(self, app, repatriants: int, log_rows: int = 0, files: int = 0, file_size: int = 256 * 1024,
+                 seed: int = 42, password: str = "bench") -> None:
+        self.app = app
+        self.repatriants = repatriants
+        self.log_rows = log_rows
+        self.files = files
+        self.file_size = file_size
+        self.rng = random.Random(seed)
+        self.password = password
+        self.today = date.today()
+        self.counts: dict[str, int] = {}
+
+    def _insert(self, model_or_table, rows: list[dict]) -> None:
+        if not rows:
+            return
+        table = getattr(model_or_table, "__table__", model_or_table)
+        db.session.execute(table.insert(), rows)
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+
+    def _next_id(self, column) -> int:
+        return (db.session.query(func.max(column)).scalar() or 0) + 1
+
+    def run(self, progress=print) -> dict[str, int]:
+        started = time.perf_counter()
+        with self.app.app_context():
+            user_ids = self._ensure_users()
+            document_paths = self._create_files(progress)
+            self._create_repatriants(user_ids, document_paths, progress)
+            self._create_log(user_ids, progress)
+        self.counts["seconds"] = int(time.perf_counter() - started)
+        return self.counts
+
+    def _ensure_users(self) -> list[int]:
+        ids = []
+        for username, role, full_name in BENCH_USERS:
+            user = User.query.filter_by(username=username).first()
+            if user is None:
+                user = User(username=username, role=role, full_name=full_name, is_active=True)
+                user.set_password(self.password)
+                db.session.add(user)
+                db.session.flush()
+            ids.append(user.id)
+        db.session.commit()
+        return ids
+
+    def _create_files(self, progress) -> list[str]:
+        """Пустые PDF на дисках хранения по кругу, с записью в каталоге STORED_FILES"""
+
+        if not self.files:
+            return []
+        if self.app.config["STORAGE_BACKEND"] != "local":
+            from .storage_backends import get_storage_backend
+
+            backend = get_storage_backend(self.app)
+        else:
+            backend = None
+
+        content = dummy_pdf(self.file_size)
+        disks = [disk["path"] for disk in self.app.config["STORAGE_DISKS"]]
+        paths, catalog = [], []
+        for index in range(self.files):
+            file_name = f"doc_synthetic_{uuid.uuid4().hex[:12]}.pdf"
+            if backend is not None:
+                backend.save(io.BytesIO(content), file_name)
+            else:
+                disk_path = disks[index % len(disks)]
+                os.makedirs(disk_path, exist_ok=True)
+                size, checksum = write_stream(io.BytesIO(content), os.path.join(disk_path, file_name))
+                catalog.append({"FILE_NAME": file_name, "DISK_PATH": disk_path, "SIZE": size, "CHECKSUM": checksum,
+                                "CREATED_AT": datetime.utcnow(), "UPDATED_AT": datetime.utcnow()})
+            paths.append(f"documents/{file_name}")
+            if len(catalog) >= BATCH_SIZE:
+                self._insert(StoredFile, catalog)
+                catalog = []
+                db.session.commit()
+                progress(f"Файлов: {index + 1}/{self.files}")
+        self._insert(StoredFile, catalog)
+        db.session.commit()
+        self.counts["files"] = self.files
+        return paths
+
+    def _repatriant_row(self, rep_id: int, document_paths: list[str]) -> dict:
+        rng = self.rng
+        male = rng.random() < 0.52
+        surname, name, patronymic = _person_name(rng, male)
+        country = _weighted(rng, COUNTRIES)
+        from_country = country if rng.random() < 0.85 else _weighted(rng, COUNTRIES)
+        rep_status = _random_date(rng, self.today - timedelta(days=8 * 365), self.today) if rng.random() < 0.8 else None
+        return {
+            "ID": rep_id,
+            "KOD": f"{rng.choice('АБВГД')}-{rep_id:06d}" if rng.random() < 0.9 else None,
+            "F": surname,
+            "I": name,
+            "O": patronymic,
+            "F_HIST": rng.choice(ABKHAZ_SURNAMES) if rng.random() < 0.3 else None,
+            "STRANA_PROJ": country,
+            "FROM_LOC": from_country,
+            "RESHENIE_KOMISSII": rng.random() < 0.7,
+            "DATE_R": _random_date(rng, date(1940, 1, 1), date(2005, 12, 31)),
+            "SEX": "МУЖ" if male else "ЖЕН",
+            "ROJD_LOC": rng.choice(CITIES[country]),
+            "SEM_POLOJ": _weighted(rng, FAMILY_STATUSES),
+            "REP_STATUS": rep_status,
+            "REP_STATUS_EXPIRES": status_expiration_date(rep_status),
+            "REP_STATUS_REG": rep_status,
+            "DATE_REGISTRATION": _random_date(rng, date(1993, 1, 1), self.today),
+            "DOP_INFO": rng.choice(["", "ВЛАДЕЕТ АБХАЗСКИМ ЯЗЫКОМ", "ТРЕБУЕТСЯ ПЕРЕВОДЧИК", "ВРАЧ", "ИНЖЕНЕР"]) or None,
+            "DOC_LICHN": _weighted(rng, DOCUMENTS),
+            "N_DOC_LICHN": f"{rng.randint(10, 99)} {rng.randint(1000000, 9999999)}",
+            "ADRES": f"{rng.choice(ABKHAZ_CITIES)}, УЛ. {rng.choice(STREETS)}, {rng.randint(1, 120)}",
+            "TEL": f"+7 940 {rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}",
+            "MAIL": f"user{rep_id}@example.org" if rng.random() < 0.4 else None,
+            "REZERV": _weighted(rng, NATIONALITIES),
+            "DOCUMENTS_PATH": rng.choice(document_paths) if document_paths and rng.random() < 0.3 else None,
+        }
+
+    def _children_rows(self, rep_id: int, next_id: int, nationality: str, country: str) -> list[dict]:
+        rng = self.rng
+        # Распределение числа детей: чаще 0-2, многодетные семьи реже
+        count = rng.choices([0, 1, 2, 3, 4, 5, 6], weights=[30, 22, 24, 14, 6, 3, 1])[0]
+        rows = []
+        for offset in range(count):
+            male = rng.random() < 0.5
+            surname, name, patronymic = _person_name(rng, male)
+            born = _random_date(rng, date(1970, 1, 1), self.today)
+            # Год рождения в анкетах записан по-разному: полной датой или только годом
+            god_r = born.strftime("%d.%m.%YГ.") if rng.random() < 0.7 else str(born.year)
+            birth_year, birth_date = parse_birth_date(god_r)
+            rows.append({
+                "ID_CHILD": next_id + offset,
+                "LIST_ID": rep_id,
+                "STEP_ROD": "СЫН" if male else "ДОЧЬ",
+                "FIO": " ".join(part for part in (surname, name, patronymic) if part),
+                "GOD_R": god_r,
+                "BIRTH_YEAR": birth_year,
+                "BIRTH_DATE": birth_date,
+                "MESTO_R": rng.choice(CITIES[country]),
+                "GRAJDANSTVO": rng.choice(["АБХАЗИЯ", country]),
+                "NACIONALNOST": nationality,
+                "LIVES_WITH_PARENT": rng.random() < 0.6,
+            })
+        return rows
+
+    def _family_rows(self, rep_id: int, next_id: int, nationality: str, country: str) -> list[dict]:
+        rng = self.rng
+        count = rng.choices([0, 1, 2, 3], weights=[35, 40, 18, 7])[0]
+        rows = []
+        for offset in range(count):
+            relation = _weighted(rng, RELATIONS)
+            male = relation in ("ОТЕЦ", "БРАТ") or (relation == "СУПРУГ(А)" and rng.random() < 0.5)
+            surname, name, patronymic = _person_name(rng, male)
+            rows.append({
+                "ID_FAMILY": next_id + offset,
+                "LIST_ID": rep_id,
+                "STEP_ROD": relation,
+                "FIO": " ".join(part for part in (surname, name, patronymic) if part),
+                "GOD_R": rng.randint(1930, 2005),
+                "GRAJDANSTVO": rng.choice(["АБХАЗИЯ", country]),
+                "NACIONALNOST": nationality,
+                "ADRES": f"{rng.choice(ABKHAZ_CITIES)}, УЛ. {rng.choice(STREETS)}, {rng.randint(1, 120)}",
+                "LIVES_WITH_PARENT": rng.random() < 0.5,
+            })
+        return rows
+
+    def _record_rows(self, rep_id: int, user_ids: list[int], document_paths: list[str]) -> dict:
+        """Записи социального и жилищного отделов и очередь для одного репатрианта"""
+
+        rng = self.rng
+        admin_id, social_id, housing_id = user_ids
+        now = datetime.utcnow()
+
+        def created():
+            return now - timedelta(days=rng.randint(0, 5 * 365), seconds=rng.randint(0, 86400))
+
+        def documents():
+            if not document_paths or rng.random() > 0.4:
+                return None
+            return json.dumps(rng.sample(document_paths, min(len(document_paths), rng.randint(1, 3))))
+
+        rows = {"housing": [], "social": [], "events": [], "other": [], "department": [], "queue": []}
+        for _ in range(rng.choices([0, 1, 2], weights=[75, 20, 5])[0]):
+            start = _random_date(rng, self.today - timedelta(days=6 * 365), self.today)
+            rows["housing"].append({
+                "REPATRIANT_ID": rep_id, "CONTRACT_NUMBER": f"Д-{rng.randint(1, 99999)}",
+                "ADDRESS": f"{rng.choice(ABKHAZ_CITIES)}, {rng.choice(STREETS)}, {rng.randint(1, 120)}, {rng.randint(1, 80)}",
+                "START_DATE": start, "END_DATE": start + timedelta(days=rng.choice([180, 365, 730])),
+                "COST": rng.randint(5, 40) * 1000, "DOCUMENTS_PATH": documents(), "NOTES": None,
+                "CREATED_AT": created(), "CREATED_BY": social_id, "IS_DELETED": rng.random() < 0.03,
+            })
+        for _ in range(rng.choices([0, 1, 2, 3, 5], weights=[50, 25, 12, 8, 5])[0]):
+            help_type = rng.choice(HELP_TYPES)
+            rows["social"].append({
+                "REPATRIANT_ID": rep_id, "HELP_TYPE": help_type,
+                "CUSTOM_HELP_TYPE": rng.choice(CUSTOM_HELP_TYPES) if help_type == "другое" else None,
+                "RESPONSIBLE": "СОЦИАЛЬНЫЙ ОТДЕЛ", "HELP_DATE": _random_date(rng, date(2015, 1, 1), self.today),
+                "AMOUNT": str(rng.randint(1, 50) * 1000), "DOCUMENTS_PATH": documents(), "DESCRIPTION": None,
+                "CREATED_AT": created(), "CREATED_BY": social_id, "IS_DELETED": rng.random() < 0.03,
+            })
+        for _ in range(rng.choices([0, 1, 2], weights=[70, 22, 8])[0]):
+            start = _random_date(rng, date(2015, 1, 1), self.today)
+            rows["events"].append({
+                "REPATRIANT_ID": rep_id, "EVENT_NAME": rng.choice(["ДЕНЬ РЕПАТРИАНТА", "КУРСЫ АБХАЗСКОГО ЯЗЫКА", "ЭКСКУРСИЯ"]),
+                "EVENT_START_DATE": start, "EVENT_END_DATE": start + timedelta(days=rng.randint(0, 10)),
+                "EVENT_LOCATION": rng.choice(ABKHAZ_CITIES), "EVENT_TYPE": rng.choice(EVENT_TYPES),
+                "EVENT_AMOUNT": rng.randint(0, 20) * 500, "DESCRIPTION": None,
+                "CREATED_AT": created(), "CREATED_BY": social_id, "IS_DELETED": False,
+            })
+        if rng.random() < 0.15:
+            rows["other"].append({
+                "REPATRIANT_ID": rep_id, "TITLE": "ОБРАЩЕНИЕ", "RECORD_DATE": _random_date(rng, date(2015, 1, 1), self.today),
+                "CATEGORY": rng.choice(OTHER_CATEGORIES), "CONTENT": "Синтетическая запись",
+                "CREATED_AT": created(), "CREATED_BY": social_id, "IS_DELETED": False,
+            })
+        if rng.random() < 0.3:
+            received = rng.random() < 0.4
+            rows["department"].append({
+                "REPATRIANT_ID": rep_id, "CATEGORY": rng.choice(HOUSING_CATEGORIES), "RECEIVED_HOUSING": received,
+                "HOUSING_TYPE": rng.choice(["ведомственное", "частное"]) if received else None,
+                "HOUSING_ACQUISITION": rng.choice(HOUSING_ACQUISITIONS) if received else None,
+                "ADDRESS": (f"{rng.choice(ABKHAZ_CITIES)}, {rng.choice(STREETS)}, {rng.randint(1, 120)}, {rng.randint(1, 80)}"
+                            if received else None),
+                "HAS_WARRANT": received and rng.random() < 0.7,
+                "REPAIR_AMOUNT": rng.randint(0, 30) * 10000 if received else None,
+                "DOCUMENTS_PATH": documents(), "NOTES": None,
+                "PROTOCOL_NUMBER": f"{rng.randint(1, 300)}/{rng.randint(2015, self.today.year)}",
+                "CREATED_AT": created(), "CREATED_BY": housing_id, "IS_DELETED": False,
+            })
+            # Части адреса для поиска заполняет обработчик ORM, а здесь строки вставляются напрямую
+            record = rows["department"][-1]
+            record.update({f"ADDRESS_{kind.upper()}": value for kind, value in parse_address(record["ADDRESS"]).items()})
+            if not received and rng.random() < 0.7:
+                queue = HousingQueue(has_children=rng.random() < 0.6, has_work=rng.random() < 0.5,
+                                     has_law_violations=rng.random() < 0.05, added_at=created())
+                rows["queue"].append({
+                    "REPATRIANT_ID": rep_id, "HAS_CHILDREN": queue.has_children, "HAS_WORK": queue.has_work,
+                    "HAS_LAW_VIOLATIONS": queue.has_law_violations, "TOTAL_SCORE": queue.calculate_score(),
+                    "ADDED_AT": queue.added_at, "ADDED_BY": housing_id, "IS_ACTIVE": True,
+                })
+        return rows
+
+    def _create_repatriants(self, user_ids: list[int], document_paths: list[str], progress) -> None:
+        rep_id = self._next_id(Repatriant.id)
+        child_id = self._next_id(Child.id_child)
+        family_id = self._next_id(FamilyMember.id_family)
+        tables = {
+            "housing": HousingRecord, "social": SocialHelpRecord, "events": EventRecord, "other": OtherRecord,
+            "department": HousingDepartmentRecord, "queue": HousingQueue,
+        }
+
+        created = 0
+        while created < self.repatriants:
+            batch = min(BATCH_SIZE, self.repatriants - created)
+            main_rows, children, family = [], [], []
+            records = {key: [] for key in tables}
+            for _ in range(batch):
+                row = self._repatriant_row(rep_id, document_paths)
+                main_rows.append(row)
+                child_rows = self._children_rows(rep_id, child_id, row["REZERV"], row["STRANA_PROJ"])
+                children.extend(child_rows)
+                child_id += len(child_rows)
+                family_rows = self._family_rows(rep_id, family_id, row["REZERV"], row["STRANA_PROJ"])
+                family.extend(family_rows)
+                family_id += len(family_rows)
+                for key, items in self._record_rows(rep_id, user_ids, document_paths).items():
+                    records[key].extend(items)
+                rep_id += 1
+
+            self._insert(Repatriant, main_rows)
+            self._insert(Child, children)
+            self._insert(FamilyMember, family)
+            for key, model in tables.items():
+                self._insert(model, records[key])
+            db.session.commit()
+            created += batch
+            progress(f"Репатриантов: {created}/{self.repatriants}")
+
+        self._renumber_queue()
+
+    def _renumber_queue(self) -> None:
+        """Позиции в очереди по убыванию балла, как после пересчета в жилищном отделе"""
+
+        active = (HousingQueue.query.filter_by(is_active=True)
+                  .order_by(HousingQueue.total_score.desc(), HousingQueue.added_at)
+                  .with_entities(HousingQueue.id).all())
+        if not active:
+            return
+        table = HousingQueue.__table__
+        db.session.execute(
+            table.update().where(table.c.ID == db.bindparam("queue_id")).values(QUEUE_POSITION=db.bindparam("position")),
+            [{"queue_id": row.id, "position": position} for position, row in enumerate(active, 1)],
+        )
+        db.session.commit()
+
+    def _create_log(self, user_ids: list[int], progress) -> None:
+        if not self.log_rows:
+            return
+        rng = self.rng
+        # На пустой базе таблицы LOG нет: модель для нее не заведена
+        db.session.execute(text("""
+            CREATE TABLE IF NOT EXISTS "LOG" (
+                "ID_LOG" INTEGER PRIMARY KEY,
+                "LIST_ID" INTEGER,
+                "USER_NAME" VARCHAR(500),
+                "DATE_IZM" DATE,
+                "TIME_IZM" TIME
+            )
+        """))
+        next_id = (db.session.execute(text('SELECT MAX("ID_LOG") FROM "LOG"')).scalar() or 0) + 1
+        max_rep_id = db.session.query(func.max(Repatriant.id)).scalar() or 1
+        usernames = [user.username for user in User.query.filter(User.id.in_(user_ids)).all()]
+        # Типизированные столбцы: дата и время передаются драйверу в формате конкретной СУБД
+        log_table = table("LOG", column("ID_LOG", Integer), column("LIST_ID", Integer), column("USER_NAME", String),
+                          column("DATE_IZM", Date), column("TIME_IZM", Time))
+
+        written = 0
+        while written < self.log_rows:
+            batch = min(BATCH_SIZE * 4, self.log_rows - written)
+            rows = []
+            for _ in range(batch):
+                moment = datetime.now() - timedelta(seconds=rng.randint(0, 2 * 365 * 86400))
+                action = rng.choice(LOG_ACTIONS)
+                rows.append({
+                    "ID_LOG": next_id,
+                    "LIST_ID": None if action.startswith(("ВХОД", "ВЫХОД")) else rng.randint(1, max_rep_id),
+                    "USER_NAME": f"{rng.choice(usernames)}: {action}",
+                    "DATE_IZM": moment.date(),
+                    "TIME_IZM": moment.time().replace(microsecond=0),
+                })
+                next_id += 1
+            db.session.execute(log_table.insert(), rows)
+            db.session.commit()
+            written += batch
+            if written % (BATCH_SIZE * 40) == 0 or written == self.log_rows:
+                progress(f"Строк LOG: {written}/{self.log_rows}")
+        self.counts["LOG"] = written
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from ..extensions import db
+from ..models import UploadSession
+from .metrics import storage_timer
+from .storage import COPY_CHUNK_SIZE, allowed_file, delete_file, file_checksum, get_best_disk, register_stored_file
+
+
+# Суффикс недокачанного файла на диске хранения
+PART_SUFFIX = ".part"
+
+
+class UploadError(Exception):
+    """Ошибка поблочной загрузки с HTTP-статусом для ответа API"""
+
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _part_path(upload: UploadSession) -> str:
+    return os.path.join(upload.disk_path, upload.file_name + PART_SUFFIX)
+
+
+def init_upload(user_id: int, filename: str, total_size: int, checksum: str, folder: str = "documents", prefix: str = "upload") -> UploadSession:
+    """Создает сессию загрузки и пустой .part-файл на выбранном диске"""
+
+    if folder not in ("documents", "avatars"):
+        raise UploadError("Недопустимая папка назначения")
+    if not filename or not allowed_file(filename):
+        raise UploadError("Недопустимый тип файла")
+    if not isinstance(total_size, int) or total_size <= 0:
+        raise UploadError("Не указан размер файла")
+    if total_size > current_app.config["UPLOAD_MAX_FILE_SIZE"]:
+        raise UploadError("Файл слишком большой", 413)
+    if not checksum or not re.fullmatch(r"[0-9a-fA-F]{64}", checksum):
+        raise UploadError("Не указана контрольная сумма SHA-256")
+
+    cleanup_stale_uploads()
+
+    name, ext = os.path.splitext(secure_filename(filename))
+    prefix = secure_filename(prefix) or "upload"
+    disk_path = get_best_disk()
+    if shutil.disk_usage(disk_path).free < total_size:
+        raise UploadError("Недостаточно места на дисках хранения", 507)
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        original_name=filename,
+        folder=folder,
+        file_name=f"{prefix}_{uuid.uuid4().hex[:8]}{ext.lower()}",
+        disk_path=disk_path,
+        total_size=total_size,
+        checksum=checksum.lower(),
+        received_bytes=0,
+        status="uploading",
+    )
+    os.makedirs(disk_path, exist_ok=True)
+    open(_part_path(upload), "wb").close()
+
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def get_upload(upload_id: str, user_id: int) -> UploadSession:
+    """Возвращает сессию загрузки текущего пользователя"""
+
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != user_id:
+        raise UploadError("Загрузка не найдена", 404)
+    return upload
+
+
+def sync_offset(upload: UploadSession, commit: bool = True) -> int:
+    """Сверяет принятый объем с фактическим размером .part-файла (после сбоя процесса)"""
+
+    if upload.status != "uploading":
+        return upload.received_bytes
+    try:
+        actual = os.path.getsize(_part_path(upload))
+    except OSError:
+        actual = 0
+    if actual != upload.received_bytes:
+        upload.received_bytes = min(actual, upload.total_size)
+        if commit:
+            db.session.commit()
+    return upload.received_bytes
+
+
+def _lock_upload(upload: UploadSession) -> None:
+    """Блокирует строку загрузки до конца транзакции и перечитывает ее.
+
+    Параллельный запрос к той же загрузке (повтор блока, завершение) ждет коммита и видит
+    уже новое смещение, а не пишет в тот же .part-файл одновременно.
+    """
+
+    db.session.refresh(upload, with_for_update=True)
+
+
+def append_chunk(upload: UploadSession, offset: int, stream, content_length: int | None) -> int:
+    """Дописывает блок с позиции offset прямо в .part-файл на диске, возвращает новый offset"""
+
+    if content_length is None:
+        raise UploadError("Не указан размер блока (Content-Length)", 411)
+    if content_length > current_app.config["UPLOAD_CHUNK_MAX_BYTES"]:
+        raise UploadError("Блок слишком большой", 413)
+
+    # Проверка смещения и запись блока - под блокировкой строки (снимается коммитом ниже)
+    _lock_upload(upload)
+    try:
+        if upload.status != "uploading":
+            raise UploadError("Загрузка уже завершена", 409)
+        current = sync_offset(upload, commit=False)
+        if offset != current:
+            # Клиент должен продолжить с позиции, которую сервер реально принял
+            raise UploadError(f"Ожидалось смещение {current}", 409)
+        if offset + content_length > upload.total_size:
+            raise UploadError("Блок выходит за пределы заявленного размера файла")
+    except UploadError:
+        db.session.rollback()
+        raise
+
+    written = 0
+    with storage_timer("upload_chunk") as io, open(_part_path(upload), "r+b") as part:
+        part.seek(offset)
+        part.truncate()
+        while written < content_length:
+            chunk = stream.read(min(COPY_CHUNK_SIZE, content_length - written))
+            if not chunk:
+                break
+            part.write(chunk)
+            written += len(chunk)
+        part.flush()
+        io["size"] = written
+        os.fsync(part.fileno())
+
+    upload.received_bytes = offset + written
+    db.session.commit()
+    if written != content_length:
+        raise UploadError(f"Блок получен не полностью, принято до смещения {upload.received_bytes}", 400)
+    return upload.received_bytes
+
+
+def complete_upload(upload: UploadSession) -> str:
+    """Проверяет SHA-256 всего файла и переименовывает .part в итоговый файл"""
+
+    _lock_upload(upload)
+    if upload.status != "uploading":
+        db.session.rollback()
+        return upload.relative_path
+
+    part_path = _part_path(upload)
+    if sync_offset(upload, commit=False) != upload.total_size:
+        db.session.rollback()
+        raise UploadError(f"Файл загружен не полностью ({upload.received_bytes} из {upload.total_size} байт)", 409)
+
+    checksum = file_checksum(part_path)
+    if checksum != upload.checksum:
+        # Содержимое повреждено - начинаем загрузку заново с нуля
+        open(part_path, "wb").close()
+        upload.received_bytes = 0
+        db.session.commit()
+        raise UploadError("Контрольная сумма не совпадает, загрузите файл заново", 422)
+
+    final_path = os.path.join(upload.disk_path, upload.file_name)
+    if current_app.config["STORAGE_BACKEND"] == "local":
+        os.replace(part_path, final_path)
+        register_stored_file(upload.file_name, upload.disk_path, upload.total_size, checksum)
+    else:
+        # Для объектного хранилища диск служит буфером: отправляем собранный файл и удаляем его
+        from .storage_backends import get_storage_backend
+
+        with open(part_path, "rb") as part:
+            get_storage_backend().save(part, upload.file_name)
+        os.remove(part_path)
+
+    upload.status = "completed"
+    db.session.commit()
+    return upload.relative_path
+
+
+def abort_upload(upload: UploadSession) -> None:
+    """Отменяет незавершенную загрузку и удаляет .part-файл"""
+
+    if upload.status == "uploading":
+        try:
+            os.remove(_part_path(upload))
+        except FileNotFoundError:
+            pass
+    db.session.delete(upload)
+    db.session.commit()
+
+
+def claim_uploaded_file(path: str | None, user_id: int) -> str | None:
+    """Привязывает завершенную загрузку пользователя к записи, возвращает путь к файлу.
+
+    Коммит - вместе с основной транзакцией записи.
+    """
+
+    if not path or "/" not in path:
+        return None
+    folder, file_name = path.split("/", 1)
+    upload = UploadSession.query.filter_by(file_name=file_name, folder=folder, user_id=user_id, status="completed").first()
+    if upload is None:
+        return None
+    upload.status = "attached"
+    return upload.relative_path
+
+
+def claim_uploaded_files(paths: list[str], user_id: int) -> list[str]:
+    """Привязывает несколько завершенных загрузок, пропуская чужие и незавершенные"""
+
+    claimed = []
+    for path in paths:
+        claimed_path = claim_uploaded_file(path, user_id)
+        if claimed_path:
+            claimed.append(claimed_path)
+    return claimed
+
+
+def claim_named_uploads(form_data, user_id: int) -> list[dict]:
+    """Привязывает загрузки из полей uploaded_documents/uploaded_document_names формы.
+
+    Возвращает документы в формате записей жилищного отдела: {"path", "name"}.
+    """
+
+    paths = form_data.getlist("uploaded_documents")
+    names = form_data.getlist("uploaded_document_names")
+    documents = []
+    for index, path in enumerate(paths):
+        claimed_path = claim_uploaded_file(path, user_id)
+        if claimed_path:
+            documents.append({
+                "path": claimed_path,
+                "name": names[index].strip() if index < len(names) else ""
+            })
+    return documents
+
+
+def cleanup_stale_uploads() -> None:
+    """Удаляет брошенные загрузки старше UPLOAD_SESSION_TTL_HOURS: незавершенные (.part-файл)
+    и завершенные, но так и не прикрепленные к записи (файл в хранилище и запись каталога)"""
+
+    threshold = datetime.utcnow() - timedelta(hours=current_app.config["UPLOAD_SESSION_TTL_HOURS"])
+    stale = UploadSession.query.filter(
+        UploadSession.status.in_(("uploading", "completed")),
+        UploadSession.updated_at < threshold
+    ).limit(50).all()
+    for upload in stale:
+        if upload.status == "completed":
+            delete_file(upload.relative_path)
+        else:
+            try:
+                os.remove(_part_path(upload))
+            except OSError:
+                pass
+        db.session.delete(upload)
+    if stale:
+        db.session.commit()
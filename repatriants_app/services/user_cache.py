@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from flask import current_app, g, session
+
+from ..models import User
+from ..utils.db import use_primary
+from .invalidation import queue_invalidation, register_invalidation_handler
+
+
+# Текущий пользователь для проверок доступа и журнала: загружается один раз за запрос
+# (g.current_user), между запросами хранится в кэше воркера на USER_CACHE_TTL_SECONDS.
+# Отключение и удаление пользователя сбрасывают его запись во всех воркерах, поэтому
+# доступ прекращается сразу, без обращения к базе на каждом запросе
+
+TOPIC = "user"
+
+
+class CachedUser:
+    """Снимок полей пользователя, не привязанный к сессии SQLAlchemy"""
+
+    __slots__ = ("id", "username", "full_name", "role", "is_active")
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.full_name = user.full_name
+        self.role = user.role
+        self.is_active = user.is_active
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    """Пользователи по ID с ограниченным временем жизни записей (общий для потоков воркера)"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        """Возвращает (найден, пользователь или None для удаленного)"""
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                return False, None
+            return True, entry[1]
+
+    def put(self, user_id: int, user: CachedUser | None) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), user)
+
+    def forget(self, user_id: int | None = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def _user_cache(app) -> UserCache:
+    cache = app.extensions.get("user_cache")
+    if cache is None:
+        cache = app.extensions.setdefault("user_cache", UserCache(app.config["USER_CACHE_TTL_SECONDS"]))
+    return cache
+
+
+def load_user(user_id: int) -> CachedUser | None:
+    """Пользователь по ID из кэша воркера или из основной БД"""
+
+    cache = _user_cache(current_app)
+    found, user = cache.get(user_id)
+    if not found:
+        # Только что отключенный пользователь не должен прочитаться с отстающей реплики
+        with use_primary():
+            record = User.query.get(user_id)
+        user = CachedUser(record) if record else None
+        cache.put(user_id, user)
+    return user
+
+
+def get_current_user() -> CachedUser | None:
+    """Пользователь текущей сессии (один раз за запрос); None, если не вошел или удален"""
+
+    if "current_user" not in g:
+        user_id = session.get("user_id")
+        g.current_user = load_user(user_id) if user_id is not None else None
+    return g.current_user
+
+
+def forget_user(db_session, user_id: int) -> None:
+    """Сбрасывает пользователя в кэшах всех воркеров после фиксации транзакции"""
+
+    queue_invalidation(db_session, TOPIC, user_id)
+    g.pop("current_user", None)
+
+
+def _on_invalidation(app, key) -> None:
+    _user_cache(app).forget(None if key is None else int(key))
+
+
+def init_user_cache(app) -> None:
+    register_invalidation_handler(app, TOPIC, _on_invalidation)
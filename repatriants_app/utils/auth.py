@@ -3,9 +3,9 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import flash, redirect, session, url_for
+from flask import current_app, flash, redirect, session, url_for
 
-from ..models import User
+from ..services.user_cache import get_current_user
 
 
 def login_required(f):
@@ -16,16 +16,26 @@ def login_required(f):
         if "user_id" not in session:
             return redirect(url_for("login"))
 
-        # Проверяем, не истекла ли сессия (24 часа)
-        if "last_activity" in session:
-            last_activity = datetime.fromisoformat(session["last_activity"])
-            if datetime.now() - last_activity > timedelta(hours=24):
-                session.clear()
-                flash("Сессия истекла. Пожалуйста, войдите снова.", "warning")
-                return redirect(url_for("login"))
+        # Отключенный или удаленный пользователь теряет доступ сразу
+        user = get_current_user()
+        if not user or not user.is_active:
+            session.clear()
+            flash("Учетная запись отключена. Обратитесь к администратору.", "error")
+            return redirect(url_for("login"))
+
+        # Проверяем, не истекла ли сессия (SESSION_LIFETIME_HOURS без активности)
+        now = datetime.now()
+        last_activity = datetime.fromisoformat(session["last_activity"]) if "last_activity" in session else None
+        if last_activity and now - last_activity > timedelta(hours=current_app.config["SESSION_LIFETIME_HOURS"]):
+            session.clear()
+            flash("Сессия истекла. Пожалуйста, войдите снова.", "warning")
+            return redirect(url_for("login"))
 
-        # Обновляем время последней активности
-        session["last_activity"] = datetime.now().isoformat()
+        # Обновляем время последней активности не чаще SESSION_ACTIVITY_UPDATE_SECONDS:
+        # каждое изменение сессии - это запись в хранилище сессий (или новая cookie)
+        interval = current_app.config["SESSION_ACTIVITY_UPDATE_SECONDS"]
+        if last_activity is None or (now - last_activity).total_seconds() >= interval:
+            session["last_activity"] = now.isoformat()
         return f(*args, **kwargs)
 
     return decorated_function
@@ -39,8 +49,12 @@ def admin_required(f):
         if "user_id" not in session:
             return redirect(url_for("login"))
 
-        user = User.query.get(session["user_id"])
-        if not user or user.role != "ADMIN":
+        user = get_current_user()
+        if not user or not user.is_active:
+            session.clear()
+            flash("Учетная запись отключена. Обратитесь к администратору.", "error")
+            return redirect(url_for("login"))
+        if user.role != "ADMIN":
             flash("Недостаточно прав для доступа к этой странице.", "error")
             return redirect(url_for("dashboard"))
 
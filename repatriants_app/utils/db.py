@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, flash, g, has_request_context, redirect, url_for
+from sqlalchemy import event, text
+
+from ..extensions import db
+
+
+def _apply_statement_timeout(session, transaction, connection) -> None:
+    """Ограничивает время выполнения запросов в транзакции (только PostgreSQL, только в запросах HTTP)"""
+
+    if not has_request_context():
+        return
+    set_statement_timeout(connection, g.get("statement_timeout_ms", current_app.config["STATEMENT_TIMEOUT_MS"]))
+
+
+def set_statement_timeout(connection, timeout_ms: int) -> None:
+    """Лимит времени запросов до конца текущей транзакции соединения (только PostgreSQL)"""
+
+    if connection.dialect.name != "postgresql":
+        return
+    # SET LOCAL действует до конца транзакции и не переходит к следующему владельцу соединения из пула
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def register_session_events() -> None:
+    """Подключает обработчики событий сессии SQLAlchemy (однократно)"""
+
+    if not event.contains(db.session, "after_begin", _apply_statement_timeout):
+        event.listen(db.session, "after_begin", _apply_statement_timeout)
+
+
+def report_slots(app) -> threading.BoundedSemaphore:
+    """Места для одновременно формируемых отчетов (потоковые выгрузки занимают их сами до конца ответа)"""
+
+    slots = app.extensions.get("report_slots")
+    if slots is None:
+        slots = app.extensions.setdefault(
+            "report_slots", threading.BoundedSemaphore(app.config["REPORT_MAX_CONCURRENCY"])
+        )
+    return slots
+
+
+def report_query(f):
+    """Декоратор для отчетов и выгрузок: увеличенный лимит времени запросов и ограничение
+    числа одновременно формируемых отчетов, чтобы они не занимали все соединения пула"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        app = current_app._get_current_object()
+        slots = report_slots(app)
+        if not slots.acquire(timeout=app.config["REPORT_QUEUE_TIMEOUT_SECONDS"]):
+            flash("Сервер занят формированием других отчетов. Повторите попытку позже.", "warning")
+            return redirect(url_for("admin_reports"))
+
+        g.statement_timeout_ms = app.config["REPORT_STATEMENT_TIMEOUT_MS"]
+        if db.session().in_transaction():
+            # Транзакция уже начата до отчета (загрузка пользователя в admin_required), и after_begin
+            # выставил в ней обычный лимит: отчет продолжит ее, поэтому лимит меняется на месте
+            set_statement_timeout(db.session.connection(), g.statement_timeout_ms)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.pop("statement_timeout_ms", None)
+            slots.release()
+
+    return decorated_function
+
+
+def read_replica(f):
+    """Декоратор для маршрутов, которые только читают данные: чтение идет с реплики,
+    если она настроена, доступна и отстает не больше REPLICA_MAX_LAG_SECONDS"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.pop("use_replica", None)
+
+    return decorated_function
+
+
+@contextmanager
+def use_primary():
+    """Временно направляет все запросы на основную БД (внутри маршрута с read_replica)"""
+
+    previous = g.pop("use_replica", None)
+    try:
+        yield
+    finally:
+        if previous is not None:
+            g.use_replica = previous
+
+
+_replica_lock = threading.Lock()
+
+
+def check_replica(engine) -> float:
+    """Возвращает отставание реплики в секундах (исключение, если она недоступна)"""
+
+    with engine.connect() as connection:
+        if connection.dialect.name != "postgresql":
+            connection.execute(text("SELECT 1"))
+            return 0.0
+        lag = connection.execute(text("""
+            SELECT CASE WHEN pg_is_in_recovery()
+                        THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                        ELSE 0 END
+        """)).scalar()
+        return float(lag or 0)
+
+
+def get_replica_engine():
+    """Возвращает движок реплики или None, если читать нужно с основной БД.
+
+    Результат проверки кэшируется на REPLICA_CHECK_INTERVAL_SECONDS в пределах процесса.
+    """
+
+    app = current_app._get_current_object()
+    if "replica" not in app.config["SQLALCHEMY_BINDS"]:
+        return None
+
+    state = app.extensions.setdefault("replica_state", {"checked_at": None, "usable": False, "lag": None})
+    now = time.monotonic()
+    if state["checked_at"] is None or now - state["checked_at"] >= app.config["REPLICA_CHECK_INTERVAL_SECONDS"]:
+        # Проверяет один поток, остальные пока используют предыдущий результат
+        if _replica_lock.acquire(blocking=state["checked_at"] is None):
+            try:
+                engine = db.engines["replica"]
+                try:
+                    lag = check_replica(engine)
+                    usable = lag <= app.config["REPLICA_MAX_LAG_SECONDS"]
+                    if not usable:
+                        print(f"Реплика отстает на {lag:.0f} с, чтение идет с основной БД")
+                except Exception as e:
+                    lag = None
+                    usable = False
+                    print(f"Реплика недоступна, чтение идет с основной БД: {e}")
+                state.update(checked_at=time.monotonic(), usable=usable, lag=lag)
+            finally:
+                _replica_lock.release()
+
+    return db.engines["replica"] if state["usable"] else None
+
+
+def get_pool_status(app) -> list[dict]:
+    """Возвращает заполнение пулов соединений (основная БД и дополнительные привязки)"""
+
+    status = []
+    with app.app_context():
+        engines = db.engines
+        for bind_key, engine in engines.items():
+            pool = engine.pool
+            entry = {"bind": bind_key or "default", "pool": type(pool).__name__}
+            if hasattr(pool, "checkedout"):
+                entry.update({
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "max_overflow": getattr(pool, "_max_overflow", None),
+                })
+                capacity = entry["size"] + max(entry["max_overflow"] or 0, 0)
+                entry["usage_percent"] = round(entry["checked_out"] / capacity * 100, 1) if capacity else None
+            status.append(entry)
+    return status
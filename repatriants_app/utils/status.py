@@ -1,12 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
+# Статус репатрианта действует 5 лет с даты получения
+STATUS_VALID_DAYS = 5 * 365
 
-def check_repatriant_status(rep_status_date):
-    """Проверяет статус репатрианта и возвращает информацию о его состоянии"""
+
+def status_expiration_date(rep_status_date) -> date | None:
+    """Дата истечения статуса (хранится в MAIN.REP_STATUS_EXPIRES, заполняется при записи)"""
 
     if not rep_status_date:
+        return None
+    return rep_status_date + timedelta(days=STATUS_VALID_DAYS)
+
+
+def status_by_expiration(expiration_date, today: date | None = None):
+    """Состояние статуса по дате истечения (None - статус не указан)"""
+
+    if not expiration_date:
         return {
             "status": "not_set",
             "color": "gray",
@@ -15,9 +26,7 @@ def check_repatriant_status(rep_status_date):
             "days_left": None,
         }
 
-    # Вычисляем дату истечения (5 лет с даты получения статуса)
-    expiration_date = rep_status_date + timedelta(days=5 * 365)  # 5 лет
-    today = datetime.now().date()
+    today = today or datetime.now().date()
 
     if today > expiration_date:
         # Статус истек
@@ -39,3 +48,26 @@ def check_repatriant_status(rep_status_date):
         "is_expired": False,
         "days_left": days_left,
     }
+
+
+def check_repatriant_status(rep_status_date):
+    """Проверяет статус репатрианта и возвращает информацию о его состоянии"""
+
+    return status_by_expiration(status_expiration_date(rep_status_date))
+
+
+def check_repatriant_statuses(repatriants) -> dict:
+    """Статусы всех репатриантов страницы за один вызов: {id: как у check_repatriant_status}.
+
+    Принимает сущности Repatriant или строки списка; берет готовую дату истечения
+    (rep_status_expires), если она есть, и одну текущую дату на всю страницу.
+    """
+
+    today = datetime.now().date()
+    statuses = {}
+    for repatriant in repatriants:
+        expiration_date = getattr(repatriant, "rep_status_expires", None)
+        if expiration_date is None:
+            expiration_date = status_expiration_date(repatriant.rep_status)
+        statuses[repatriant.id] = status_by_expiration(expiration_date, today)
+    return statuses
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import re
+from datetime import date
+
 
 def normalize_nationality_value(value: str | None) -> str | None:
     """Нормализует значение национальности (преобразует женский род в мужской).
@@ -89,3 +92,112 @@ def uppercase_string_fields(target, exclude_fields=None) -> None:
                         setattr(target, attr_name, value.upper())
                     except (AttributeError, TypeError, ValueError):
                         continue
+
+
+_FULL_DATE_RE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+_YEAR_RE = re.compile(r"(?<!\d)(\d{4})(?!\d)")
+
+
+def parse_birth_date(value) -> tuple[int | None, date | None]:
+    """Год и дата рождения из свободного текста GOD_R ("04.05.2001Г.", "2001", "2001 Г.").
+
+    Дата возвращается, только если указана полностью; год вне 1900-2100 считается ошибкой ввода.
+    """
+
+    if value is None:
+        return None, None
+    text = str(value).strip()
+
+    match = _FULL_DATE_RE.search(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        if 1900 <= year <= 2100:
+            try:
+                return year, date(year, month, day)
+            except ValueError:
+                return year, None
+
+    match = _YEAR_RE.search(text)
+    if match and 1900 <= int(match.group(1)) <= 2100:
+        return int(match.group(1)), None
+    return None, None
+
+
+# Обозначения в начале частей адреса ("г. Сухум", "ул. Лакоба", "д. 5", "кв. 12")
+_ADDRESS_PREFIXES = {
+    "city": ("Г", "ГОР", "ГОРОД", "С", "СЕЛО", "ПГТ", "ПОС", "ПОСЕЛОК"),
+    "street": ("УЛ", "УЛИЦА", "ПР", "ПР-Т", "ПРОСПЕКТ", "ПЕР", "ПЕРЕУЛОК", "ПЛ", "ПЛОЩАДЬ", "НАБ",
+               "НАБЕРЕЖНАЯ", "ТУП", "ТУПИК", "ПРОЕЗД", "Ш", "ШОССЕ", "МКР", "МИКРОРАЙОН"),
+    "house": ("Д", "ДОМ"),
+    "apartment": ("КВ", "КВАРТИРА"),
+}
+_ADDRESS_PREFIX_RE = {
+    kind: re.compile(r"^(?:%s)(?:\.\s*|\s+)" % "|".join(re.escape(word) for word in words))
+    for kind, words in _ADDRESS_PREFIXES.items()
+}
+ADDRESS_PARTS = ("city", "street", "house", "apartment")
+
+
+def normalize_address_part(value, kind: str) -> str | None:
+    """Часть адреса для поиска: верхний регистр, без обозначения ("ул.", "д."), Ё -> Е.
+
+    Номера дома и квартиры - без пробелов ("5 А" -> "5А").
+    """
+
+    if value is None:
+        return None
+    text = " ".join(str(value).upper().replace("Ё", "Е").split()).strip(" .")
+    text = _ADDRESS_PREFIX_RE[kind].sub("", text).strip(" .")
+    if kind in ("house", "apartment"):
+        text = text.replace(" ", "")
+    return text or None
+
+
+def parse_address(value) -> dict[str, str | None]:
+    """Город, улица, дом и квартира из строки ADDRESS ("Сухум, ул. Лакоба, д. 5, кв. 12").
+
+    Части с обозначением ("кв. 12") попадают на свое место, остальные - по порядку
+    (город, улица, дом, квартира), как их записывает форма.
+    """
+
+    parsed = dict.fromkeys(ADDRESS_PARTS)
+    if not value:
+        return parsed
+    unlabeled = []
+    for part in str(value).split(","):
+        text = " ".join(part.upper().replace("Ё", "Е").split()).strip(" .")
+        if not text:
+            # Пропущенная часть ("Сухум, , 12") сохраняет порядок остальных
+            unlabeled.append(None)
+            continue
+        kind = next((kind for kind in ADDRESS_PARTS if _ADDRESS_PREFIX_RE[kind].match(text)), None)
+        if kind and parsed[kind] is None:
+            parsed[kind] = normalize_address_part(text, kind)
+        else:
+            unlabeled.append(text)
+    free = [kind for kind in ADDRESS_PARTS if parsed[kind] is None]
+    for kind, text in zip(free, unlabeled):
+        parsed[kind] = normalize_address_part(text, kind)
+    return parsed
+
+
+# Обозначения, которые format_address добавляет к частям без своего обозначения
+_ADDRESS_LABELS = {"street": "ул.", "house": "д.", "apartment": "кв."}
+
+
+def format_address(city=None, street=None, house=None, apartment=None) -> str | None:
+    """Строка ADDRESS из частей, введенных в форме ("Сухум, ул. Лакоба, д. 5, кв. 12").
+
+    Улица, дом и квартира записываются с обозначением, поэтому parse_address возвращает
+    те же части и при пропущенных полях (адрес села без улицы: "Лыхны, д. 5").
+    """
+
+    parts = []
+    for kind, value in zip(ADDRESS_PARTS, (city, street, house, apartment)):
+        text = " ".join(str(value or "").replace(",", " ").split())
+        if not text:
+            continue
+        if kind in _ADDRESS_LABELS and not _ADDRESS_PREFIX_RE[kind].match(text.upper().replace("Ё", "Е")):
+            text = f"{_ADDRESS_LABELS[kind]} {text}"
+        parts.append(text)
+    return ", ".join(parts) or None
@@ -0,0 +1,12 @@
+"""Точка входа WSGI для боевого запуска: gunicorn -c gunicorn.conf.py wsgi:app
+
+Таблицы здесь не создаются - это делает отдельная команда перед запуском:
+flask --app wsgi init-db
+"""
+
+from __future__ import annotations
+
+from repatriants_app import create_app
+
+
+app = create_app()